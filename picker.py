@@ -1,37 +1,93 @@
 import os
 import sys
+import time
+import logging
+import types
 import importlib
+import collections
 from maya import OpenMayaUI, cmds
-from shiboken2 import wrapInstance
-from PySide2 import QtCore, QtWidgets, QtUiTools, QtGui
+from maya.api import OpenMaya
+from shiboken2 import wrapInstance, isValid
+from PySide2 import QtCore, QtWidgets, QtGui
 from functools import partial
 
+import picker_blend
+import picker_cache
+import picker_canvas
+import picker_guard
+import picker_handles
+import picker_images
+import picker_jobs
+import picker_key
+import picker_library
+import picker_loader
+import picker_mirror
+import picker_operations
+import picker_pose
+import picker_session
+import picker_snap
+import picker_stats
+import picker_undo
+from picker_index import ControlIndex
+
+
+logger = logging.getLogger(__name__)
 
 char_name = 'Hulk'
+highlight_style = 'color: black; background-color: white;'
+selected_style = 'border: 2px solid white;'
+action_names = ['bind_pose', 'flip_pose', 'mirror_pose', 'snap_fk_ik', 'bake_fk_ik', 'select_control',
+                'select_control_list', 'select_all_controls', 'select_body_controls', 'select_face_controls',
+                'key_all_controls', 'key_body_controls', 'key_face_controls', 'vis_controls', 'vis_geometries',
+                'save_pose', 'apply_pose', 'flip_animation', 'mirror_animation', 'begin_pose_blend',
+                'finish_pose_blend']
+
+# The warm picker window kept hidden between reopens, shared by the reloads of this module
+shared = sys.modules.get('picker_window_shared')
+if shared is None:
+    shared = types.ModuleType('picker_window_shared')
+    shared.picker_window = None
+    shared.source_key = None
+    sys.modules['picker_window_shared'] = shared
 
 
 class Picker(QtWidgets.QWidget):
-    def __init__(self, scale_factor):
+    def __init__(self, scale_factor, render_mode='widgets', warm=False):
+        """
+        :param scale_factor: float
+        :param render_mode: str, 'widgets' builds a button per control, 'canvas' draws them in a single widget
+        :param warm: bool, closing only hides the window so it can be shown again without being built
+        """
         maya_main_window_ptr = OpenMayaUI.MQtUtil.mainWindow()
         maya_main_window = wrapInstance(int(maya_main_window_ptr), QtWidgets.QWidget)
         super(Picker, self).__init__(maya_main_window)
 
         self.setWindowTitle('{} Picker'.format(char_name))
         self.setObjectName('{}PickerWindow'.format(char_name))
-        self.ui_path_value = r'{}\picker.ui'.format(os.path.dirname(__file__))
+        self.ui_path_value = os.path.join(os.path.dirname(__file__), 'picker.ui')
+        self.render_mode = render_mode
+        self.warm = warm
 
         self.width_default = 750
         self.height_default = 675
         self.setWindowFlags(QtCore.Qt.Window)
-        self.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        if not warm:
+            self.setAttribute(QtCore.Qt.WA_DeleteOnClose)
 
         # Load the UI from path
-        self.ui_widget = self.loadUiWidget(self.ui_path_value, maya_main_window)
-        self.load_icon()
-        self.load_images()
+        self.startup_timings = collections.OrderedDict()
+        startup_time = time.time()
+        if self.render_mode == 'canvas':
+            # The tabs are drawn by the canvas, so their buttons are not built
+            ui_path = picker_canvas.get_shell_ui_path(self.ui_path_value)
+        else:
+            ui_path = self.ui_path_value
+        self.ui_widget = self.loadUiWidget(ui_path, maya_main_window)
+        self.ui_children, self.ui_widgets = picker_loader.get_children(self.ui_widget)
+        self.image_loader = picker_images.ImageLoader(self)
 
         # Drag and drop functionality
-        self.tab_widget = self.findChild(QtWidgets.QTabWidget, 'tab_window')
+        self.tab_widget = self.ui_widgets.get('tab_window')
         self.rubber_band = QtWidgets.QRubberBand(QtWidgets.QRubberBand.Rectangle, self)
 
         self.drag_selection = None
@@ -40,423 +96,795 @@ class Picker(QtWidgets.QWidget):
         self.alt_point = None
         self.delta = None
         self.widget_styles_dict = dict()
-        for widget in self.ui_widget.findChildren(QtWidgets.QPushButton):
-            if widget.objectName().endswith('_ctr'):
+        for widget in self.ui_children:
+            if isinstance(widget, QtWidgets.QPushButton) and widget.objectName().endswith('_ctr'):
                 widget_style = widget.styleSheet()
                 self.widget_styles_dict[widget] = widget_style
-
-        # Scale the whole window
-        self.setMinimumSize(self.width_default * scale_factor, self.height_default * scale_factor)
-        self.setMaximumSize(self.width_default * scale_factor, self.height_default * scale_factor)
-        for child_widget in self.ui_widget.findChildren(QtWidgets.QWidget):
-            child_widget.setGeometry(child_widget.x() * scale_factor, child_widget.y() * scale_factor,
-                                     child_widget.width() * scale_factor, child_widget.height() * scale_factor)
-        self.ui_widget.setFixedSize(self.ui_widget.size() * scale_factor)
+        self.control_widgets = dict((widget.objectName(), widget) for widget in self.widget_styles_dict)
+        self.highlighted_widgets = set()
+        self.selected_widgets = set()
+
+        # Spatial index of the controls, rebuilt when the scale or the layout changes
+        self.picker_tab = self.ui_widgets['picker_tab']
+        self.control_index = None
+        self.control_index_dirty = True
+
+        # Scale the whole window, the geometries of picker.ui are kept to scale it again
+        start_time = time.time()
+        self.scale_factor = None
+        self.ui_geometries = [(x, x.geometry()) for x in self.ui_children]
+        self.ui_size = self.ui_widget.size()
+        self.apply_scale(scale_factor)
+        self.startup_timings['scale'] = time.time() - start_time
+
+        # The actions are recorded by the stats recorder when it is enabled
+        self.action_recorder = picker_stats.get_recorder()
+        self.stats_panel = None
+        self.pose_library_panel = None
+        self.pose_blend_panel = None
+        self.pose_blend = None
+        for action_name in action_names:
+            setattr(self, action_name,
+                    self.action_recorder.wrap(action_name, getattr(self, action_name), self.get_namespace))
+
+        self.canvases = dict()
+        if self.render_mode == 'canvas':
+            self.build_canvases(scale_factor)
+
+        # Backgrounds are decoded at the scaled size of their labels
+        start_time = time.time()
+        self.load_icon()
+        self.load_images()
+        self.startup_timings['images'] = time.time() - start_time
 
         ###################
         # Connect buttons #
         ###################
+        start_time = time.time()
+        # The actions are connected through lambdas, the clicked signal would pass its checked state to the
+        # arguments of the recorded actions
         # Pose
-        bind_pose_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'bindPose_pushButton')[0]
-        bind_pose_pb.clicked.connect(self.bind_pose)
+        bind_pose_pb = self.ui_widgets['bindPose_pushButton']
+        bind_pose_pb.clicked.connect(lambda: self.bind_pose())
 
-        flip_pose_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'flipPose_pushButton')[0]
-        flip_pose_pb.clicked.connect(self.flip_pose)
+        flip_pose_pb = self.ui_widgets['flipPose_pushButton']
+        flip_pose_pb.clicked.connect(lambda: self.flip_pose())
 
-        mirror_pose_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'mirrorPose_pushButton')[0]
-        mirror_pose_pb.clicked.connect(self.mirror_pose)
+        mirror_pose_pb = self.ui_widgets['mirrorPose_pushButton']
+        mirror_pose_pb.clicked.connect(lambda: self.mirror_pose())
 
         # Visibilities
-        vis_controls_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'visControls_pushButton')[0]
-        vis_controls_pb.clicked.connect(self.vis_controls)
+        vis_controls_pb = self.ui_widgets['visControls_pushButton']
+        vis_controls_pb.clicked.connect(lambda: self.vis_controls())
 
-        vis_geometries_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'visGeometries_pushButton')[0]
-        vis_geometries_pb.clicked.connect(self.vis_geometries)
+        vis_geometries_pb = self.ui_widgets['visGeometries_pushButton']
+        vis_geometries_pb.clicked.connect(lambda: self.vis_geometries())
 
         # Selections
-        select_all_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'selectAll_pushButton')[0]
-        select_all_pb.clicked.connect(self.select_all_controls)
+        select_all_pb = self.ui_widgets['selectAll_pushButton']
+        select_all_pb.clicked.connect(lambda: self.select_all_controls())
 
-        select_body_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'selectBody_pushButton')[0]
-        select_body_pb.clicked.connect(self.select_body_controls)
+        select_body_pb = self.ui_widgets['selectBody_pushButton']
+        select_body_pb.clicked.connect(lambda: self.select_body_controls())
 
-        select_face_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'selectFace_pushButton')[0]
-        select_face_pb.clicked.connect(self.select_face_controls)
+        select_face_pb = self.ui_widgets['selectFace_pushButton']
+        select_face_pb.clicked.connect(lambda: self.select_face_controls())
 
         # Keys
-        key_all_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'keyAll_pushButton')[0]
-        key_all_pb.clicked.connect(self.key_all_controls)
+        key_all_pb = self.ui_widgets['keyAll_pushButton']
+        key_all_pb.clicked.connect(lambda: self.key_all_controls())
 
-        key_body_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'keyBody_pushButton')[0]
-        key_body_pb.clicked.connect(self.key_body_controls)
+        key_body_pb = self.ui_widgets['keyBody_pushButton']
+        key_body_pb.clicked.connect(lambda: self.key_body_controls())
 
-        key_face_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'keyFace_pushButton')[0]
-        key_face_pb.clicked.connect(self.key_face_controls)
+        key_face_pb = self.ui_widgets['keyFace_pushButton']
+        key_face_pb.clicked.connect(lambda: self.key_face_controls())
 
         # Controls
-        for widget in self.ui_widget.findChildren(QtWidgets.QPushButton):
-            if widget.objectName().endswith('_ctr'):
-                widget.clicked.connect(partial(self.select_control, widget.objectName()))
-                widget.setToolTip(widget.objectName())
+        for widget in self.widget_styles_dict:
+            widget.clicked.connect(lambda checked=False, control_name=widget.objectName():
+                                   self.select_control(control_name))
+            widget.setToolTip(widget.objectName())
 
         # Snap
-        arm_snap_l_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'armSnap_l_pushButton')[0]
-        arm_snap_l_pb.clicked.connect(partial(self.snap_fk_ik, 'arm', 'l'))
+        self.action_callbacks = {'armSnap_l_pushButton': partial(self.snap_fk_ik, 'arm', 'l'),
+                                 'armSnap_r_pushButton': partial(self.snap_fk_ik, 'arm', 'r'),
+                                 'legSnap_l_pushButton': partial(self.snap_fk_ik, 'leg', 'l'),
+                                 'legSnap_r_pushButton': partial(self.snap_fk_ik, 'leg', 'r')}
+        for action_name, action_callback in self.action_callbacks.items():
+            if action_name in self.ui_widgets:
+                self.ui_widgets[action_name].clicked.connect(lambda checked=False, callback=action_callback: callback())
 
-        arm_snap_r_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'armSnap_r_pushButton')[0]
-        arm_snap_r_pb.clicked.connect(partial(self.snap_fk_ik, 'arm', 'r'))
-
-        leg_snap_l_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'legSnap_l_pushButton')[0]
-        leg_snap_l_pb.clicked.connect(partial(self.snap_fk_ik, 'leg', 'l'))
-
-        leg_snap_r_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'legSnap_r_pushButton')[0]
-        leg_snap_r_pb.clicked.connect(partial(self.snap_fk_ik, 'leg', 'r'))
-        
         # Set namespace
-        namespace_pb = self.ui_widget.findChildren(QtWidgets.QPushButton, 'namespace_pushButton')[0]
-        self.namespace_le = self.ui_widget.findChildren(QtWidgets.QLineEdit, 'namespace_lineEdit')[0]
+        namespace_pb = self.ui_widgets['namespace_pushButton']
+        self.namespace_le = self.ui_widgets['namespace_lineEdit']
         namespace_pb.clicked.connect(self.set_namespace)
 
+        # Selection sync, the Maya selection changes are coalesced in a single update per frame
+        self.selection_callback_id = None
+        self.selection_timer = QtCore.QTimer(self)
+        self.selection_timer.setSingleShot(True)
+        self.selection_timer.timeout.connect(self.sync_selection)
+        self.selection_frame_interval = int(1000 / (QtWidgets.QApplication.primaryScreen().refreshRate() or 60))
+        self.selection_sync_stats = {'callbacks': 0, 'updates': 0, 'restyled': 0, 'total_time': 0.0,
+                                     'max_time': 0.0}
+        self.namespace_le.textChanged.connect(self.schedule_selection_sync)
+
+        self.build_tools_menu()
+        self.build_rig_session()
+        self.set_selection_sync(True)
+
+        self.startup_timings['signals'] = time.time() - start_time
+        self.startup_timings['total'] = time.time() - startup_time
+
+    def apply_scale(self, scale_factor):
+        """
+        Scale the window and the widgets of picker.ui from their original geometries
+        :param scale_factor: float
+        """
+        self.scale_factor = scale_factor
+        self.setMinimumSize(self.width_default * scale_factor, self.height_default * scale_factor)
+        self.setMaximumSize(self.width_default * scale_factor, self.height_default * scale_factor)
+        for child_widget, geometry in self.ui_geometries:
+            child_widget.setGeometry(geometry.x() * scale_factor, geometry.y() * scale_factor,
+                                     geometry.width() * scale_factor, geometry.height() * scale_factor)
+        self.ui_widget.setFixedSize(self.ui_size * scale_factor)
+        self.control_index = ControlIndex(cell_size=int(32 * scale_factor) or 1)
+        self.control_index_dirty = True
+
+    def set_scale_factor(self, scale_factor):
+        """
+        Rescale the existing widgets and decode the backgrounds at their new size
+        :param scale_factor: float
+        """
+        if scale_factor == self.scale_factor:
+            return
+        self.apply_scale(scale_factor)
+        for canvas in self.canvases.values():
+            canvas.default_zoom = scale_factor
+            canvas.reset_view()
+            if canvas.background_item:
+                self.image_loader.load(canvas, canvas.background_item.text, canvas.get_background_size())
+        self.load_images()
+
     def loadUiWidget(self, ui_file_name, parent=None):
-        loader = QtUiTools.QUiLoader()
-        ui_file = QtCore.QFile(ui_file_name)
-        ui_file.open(QtCore.QFile.ReadOnly)
-        ui = loader.load(ui_file, parent)
-        ui_file.close()
+        ui = picker_loader.load_ui(ui_file_name, parent, self.startup_timings)
 
         ui.setParent(self)
 
         return ui
 
-    def set_namespace(self):
-        selection = cmds.ls(selection=True)
-        namespace = None
-        if len(selection) >= 1:
-            selection = selection[0]
-            if ':' in selection:
-                namespace = '{}:'.format(':'.join(selection.split(':')[:-1]))
-            else:
-                namespace = ''
-        else:
-            namespace = ''
+    def build_tools_menu(self):
+        """
+        Add the tools button next to the namespace and fill its menu
+        """
+        self.tools_tb = QtWidgets.QToolButton()
+        self.tools_tb.setText('Tools')
+        self.tools_tb.setPopupMode(QtWidgets.QToolButton.InstantPopup)
+        self.tools_menu = QtWidgets.QMenu(self.tools_tb)
+        self.tools_tb.setMenu(self.tools_menu)
+        self.ui_widgets['namespace_layout'].insertWidget(1, self.tools_tb)
+
+        self.job_progress = picker_jobs.JobProgress()
+        self.ui_widgets['namespace_layout'].insertWidget(1, self.job_progress)
+
+        # Snap
+        bake_menu = self.tools_menu.addMenu('Bake FK/IK snap')
+        for label, limb_list in (('Arm L', [('arm', 'l')]), ('Arm R', [('arm', 'r')]),
+                                 ('Leg L', [('leg', 'l')]), ('Leg R', [('leg', 'r')]),
+                                 ('All limbs', [('arm', 'l'), ('arm', 'r'), ('leg', 'l'), ('leg', 'r')])):
+            bake_menu.addAction(label, lambda checked=False, limbs=limb_list: self.bake_fk_ik(limbs))
+        bake_menu.addSeparator()
+        self.keys_only_action = bake_menu.addAction('Keys only')
+        self.keys_only_action.setCheckable(True)
+
+        # Animation mirror
+        animation_menu = self.tools_menu.addMenu('Mirror animation')
+        animation_menu.addAction('Flip animation', lambda: self.flip_animation())
+        animation_menu.addAction('Mirror animation', lambda: self.mirror_animation())
+        animation_menu.addSeparator()
+        self.half_cycle_action = animation_menu.addAction('Half cycle offset')
+        self.half_cycle_action.setCheckable(True)
+        self.half_cycle_action.setToolTip('Shift the keys by half of the playback range, e.g. for walk cycles')
+
+        # Keys
+        self.smart_key_action = self.tools_menu.addAction('Smart key')
+        self.smart_key_action.setCheckable(True)
+        self.smart_key_action.setToolTip('Key only the channels changed since the last key or bind pose, '
+                                         'or that already have curves')
+
+        # Selection
+        self.selection_sync_action = self.tools_menu.addAction('Sync selection')
+        self.selection_sync_action.setCheckable(True)
+        self.selection_sync_action.setChecked(True)
+        self.selection_sync_action.toggled.connect(self.set_selection_sync)
+
+        # Poses
+        self.tools_menu.addSeparator()
+        self.tools_menu.addAction('Pose library...', self.show_pose_library_panel)
+        pose_blend_action = self.tools_menu.addAction('Pose blend...', self.show_pose_blend_panel)
+        if picker_blend.numpy is None:
+            pose_blend_action.setEnabled(False)
+            pose_blend_action.setToolTip('The pose blend needs numpy')
+
+        # Stats
+        self.tools_menu.addSeparator()
+        self.tools_menu.addAction('Action stats...', self.show_stats_panel)
+
+    def build_rig_session(self):
+        """
+        Add the rig list and the group action targets next to the namespace, and find the rigs of the scene
+        """
+        self.session = picker_session.RigSession(self)
+        self.session.rigs_changed.connect(self.fill_rig_list)
+        self.session.install_callbacks()
+
+        self.rig_cb = QtWidgets.QComboBox()
+        self.rig_cb.setToolTip('Active rig')
+        self.rig_cb.setMaximumHeight(20)
+        self.rig_cb.activated.connect(lambda index: self.set_active_rig(self.rig_cb.itemData(index)))
+
+        self.rigs_tb = QtWidgets.QToolButton()
+        self.rigs_tb.setText('Rigs')
+        self.rigs_tb.setToolTip('Rigs edited by the bind pose, key, select and visibility actions')
+        self.rigs_tb.setPopupMode(QtWidgets.QToolButton.InstantPopup)
+        self.rigs_menu = QtWidgets.QMenu(self.rigs_tb)
+        self.rigs_menu.aboutToShow.connect(self.fill_rigs_menu)
+        self.rigs_tb.setMenu(self.rigs_menu)
+
+        namespace_layout = self.ui_widgets['namespace_layout']
+        index = namespace_layout.indexOf(self.ui_widgets['namespace_pushButton'])
+        namespace_layout.insertWidget(index, self.rigs_tb)
+        namespace_layout.insertWidget(index, self.rig_cb)
+
+        self.active_namespace = self.get_namespace()
+        self.namespace_le.textChanged.connect(self.namespace_changed)
+        namespaces = self.session.refresh()
+        if namespaces and not self.active_namespace and '' not in namespaces:
+            self.set_active_rig(namespaces[0])
+
+    def fill_rig_list(self, namespaces):
+        """
+        :param namespaces: list
+        """
+        self.rig_cb.blockSignals(True)
+        self.rig_cb.clear()
+        for namespace in namespaces:
+            self.rig_cb.addItem(namespace or ':', namespace)
+        self.rig_cb.setCurrentIndex(self.rig_cb.findData(self.get_namespace()))
+        self.rig_cb.blockSignals(False)
+
+    def fill_rigs_menu(self):
+        self.rigs_menu.clear()
+        self.rigs_menu.addAction('All rigs', partial(self.set_rig_targets, True))
+        self.rigs_menu.addAction('Active rig only', partial(self.set_rig_targets, False))
+        self.rigs_menu.addSeparator()
+        for namespace in self.session.get_namespaces():
+            action = self.rigs_menu.addAction(namespace or ':')
+            action.setCheckable(True)
+            action.setChecked(self.session.get_state(namespace).targeted)
+            action.toggled.connect(partial(self.session.set_targeted, namespace))
+
+    def set_rig_targets(self, targeted):
+        """
+        :param targeted: bool, target every rig or none, the group actions then run on the active rig
+        """
+        for namespace in self.session.get_namespaces():
+            self.session.set_targeted(namespace, targeted)
 
+    def set_active_rig(self, namespace):
+        """
+        Drive another rig, only the namespace changes and the tab shown for the rig is restored
+        :param namespace: str
+        """
         self.namespace_le.setText(namespace)
+        self.picker_tab.setCurrentIndex(self.session.get_state(namespace).tab_index)
+
+    def namespace_changed(self, namespace):
+        self.session.get_state(self.active_namespace).tab_index = self.picker_tab.currentIndex()
+        self.active_namespace = namespace
+        self.rig_cb.blockSignals(True)
+        self.rig_cb.setCurrentIndex(self.rig_cb.findData(namespace))
+        self.rig_cb.blockSignals(False)
+
+    def get_target_namespaces(self):
+        """
+        :return: list, namespaces of the rigs the group actions run on
+        """
+        return self.session.get_targets(self.get_namespace())
+
+    def build_canvases(self, scale_factor):
+        """
+        Fill the tabs with a canvas that draws the controls of picker.ui
+        :param scale_factor: float
+        """
+        canvas_layout = picker_canvas.parse_layout(self.ui_path_value)
+        for tab_name, items in canvas_layout.items():
+            tab = self.ui_widgets[tab_name]
+            tab_layout = QtWidgets.QVBoxLayout(tab)
+            tab_layout.setContentsMargins(0, 0, 0, 0)
+
+            canvas = picker_canvas.PickerCanvas(items, scale_factor, tab)
+            canvas.control_clicked.connect(self.select_control)
+            canvas.controls_selected.connect(self.select_control_list)
+            canvas.action_clicked.connect(self.run_action)
+            tab_layout.addWidget(canvas)
+            self.canvases[tab_name] = canvas
+
+            if canvas.background_item:
+                self.image_loader.load(canvas, canvas.background_item.text, canvas.get_background_size())
+
+    def show_stats_panel(self):
+        if self.stats_panel is None:
+            self.stats_panel = picker_stats.StatsPanel(self.action_recorder, self)
+        self.stats_panel.show()
+        self.stats_panel.raise_()
+
+    def show_pose_library_panel(self):
+        if self.pose_library_panel is None:
+            self.pose_library_panel = picker_library.PoseLibraryPanel(self, self)
+        self.pose_library_panel.show()
+        self.pose_library_panel.raise_()
+
+    def show_pose_blend_panel(self):
+        if self.pose_blend_panel is None:
+            self.pose_blend_panel = picker_blend.PoseBlendPanel(self, self)
+        self.pose_blend_panel.show()
+        self.pose_blend_panel.raise_()
+
+    def run_action(self, action_name):
+        """
+        Run the callback of a non control button
+        :param action_name: str
+        """
+        self.action_callbacks[action_name]()
+
+    def set_namespace(self):
+        self.session.refresh()
+        self.namespace_le.setText(picker_operations.get_selection_namespace())
 
     def get_namespace(self):
         return self.namespace_le.text()
 
     @staticmethod
-    def get_modifier():
+    def get_modifier(modifiers=None):
         """
         Get modifiers
+        :param modifiers: QtCore.Qt.KeyboardModifiers of the event, the current ones if None
         """
-        mod = cmds.getModifiers()
+        mod = modifiers if modifiers is not None else QtWidgets.QApplication.keyboardModifiers()
+        if mod == QtCore.Qt.NoModifier:
+            return None
         mod_value = None
-        if (mod & 1) > 0:
+        if mod & QtCore.Qt.ShiftModifier:
             mod_value = 'shift'
-        if (mod & 4) > 0:
+        if mod & QtCore.Qt.ControlModifier:
             mod_value = 'control'
-        if (mod & 8) > 0:
+        if mod & QtCore.Qt.AltModifier:
             mod_value = 'alt'
         return mod_value
 
+    def show_report(self, report):
+        """
+        Show the report of an action in the viewport and in the log
+        :param report: EditReport or str
+        """
+        logger.info(report)
+        cmds.inViewMessage(assistMessage=str(report), position='topCenter', fade=True)
+
     def bind_pose(self):
         """
-        Set the rig to the bind/skin pose
+        Set the targeted rigs to the bind/skin pose
+        :return: EditReport or None if the rigs are set by a chunked job
         """
+        namespaces = self.get_target_namespaces()
+        rig_controls = picker_operations.get_rig_controls(namespaces, 'all')
+        control_list = picker_operations.join_rig_controls(rig_controls)
+        self.action_recorder.add_controls(len(control_list))
+
+        # Large rigs gather the values in chunks and set them all at the end
+        engine = picker_pose.BindPoseEngine(control_list)
+
+        def finish_bind_pose():
+            with picker_guard.EditGuard('bind_pose'):
+                self.show_report(engine.commit())
+            # The smart key compares the channels to the bind pose, whether it is on or not
+            for namespace, rig_control_list in rig_controls:
+                picker_key.take_snapshot(namespace, rig_control_list)
+
+        if self.run_job('Bind pose', control_list, engine.gather, finish_bind_pose):
+            return
+
         cmds.undoInfo(openChunk=True)
         try:
-            namespace = self.get_namespace()
-
-            modules_grp = '{}modules_c_grp'.format(namespace)
-
-            control_list = [x for x in cmds.listRelatives(modules_grp, allDescendents=True)
-                            if x.endswith('_ctr')]
-
-            skin_pose_attr = 'skinPoseData'
-
-            for ctr in control_list:
-                user_attrs = cmds.listAttr(ctr, userDefined=True)
-                if user_attrs:
-                    for user_attr in cmds.listAttr(ctr, userDefined=True):
-                        try:
-                            user_attr_dv = cmds.attributeQuery(user_attr, node=ctr, listDefault=True)[0]
-                            cmds.setAttr('{}.{}'.format(ctr, user_attr), user_attr_dv)
-                        except:
-                            pass
-
-                for attr in 'trs':
-                    for axis in 'xyz':
-                        attr_value = 1 if attr == 's' else 0
-                        try:
-                            cmds.setAttr('{}.{}{}'.format(ctr, attr, axis), attr_value)
-                        except:
-                            pass
-
-                if cmds.attributeQuery(skin_pose_attr, node=ctr, exists=True):
-                    skin_pose_data = cmds.getAttr('{}.{}'.format(ctr, skin_pose_attr))
-                    skin_pose_data = skin_pose_data.split('[')[-1].split(']')[0].split(',')
-                    skin_pose_data = [float(x) for x in skin_pose_data]
-
-                    cmds.xform(ctr, objectSpace=True, matrix=skin_pose_data)
+            report = picker_operations.bind_pose(namespaces, snapshot=True)
+            self.show_report(report)
+            return report
         finally:
             cmds.undoInfo(closeChunk=True)
 
-    @staticmethod
-    def flip_pose():
+    def flip_pose(self):
         """
         Flip the pose for the controls selected
+        :return: EditReport
         """
         cmds.undoInfo(openChunk=True)
         try:
-            for ctr in cmds.ls(selection=True):
-                side = '_{}_'.format(ctr.split('_')[-2])
-                opposite_side = '_l_' if side == '_r_' else '_r_'
-                if side == '_c_':
-                    ctr_translate = cmds.xform(ctr, query=True, objectSpace=True, translation=True)
-                    ctr_rotate = cmds.xform(ctr, query=True, objectSpace=True, rotation=True)
-
-                    cmds.xform(ctr, objectSpace=True, rotation=(ctr_rotate[0], -ctr_rotate[1], -ctr_rotate[2]))
-                    cmds.xform(ctr, objectSpace=True, translation=(-ctr_translate[0], ctr_translate[1], ctr_translate[2]))
-
-                else:
-                    ctr_xform = cmds.xform(ctr, query=True, objectSpace=True, matrix=True)
-                    ctr_opposite_xform = cmds.xform(ctr.replace(side, opposite_side), query=True, objectSpace=True,
-                                                    matrix=True)
-
-                    cmds.xform(ctr.replace(side, opposite_side), objectSpace=True, matrix=ctr_xform)
-                    cmds.xform(ctr, objectSpace=True, matrix=ctr_opposite_xform)
-
-                user_attrs = cmds.listAttr(ctr, userDefined=True)
-                if user_attrs:
-                    for user_attr in cmds.listAttr(ctr, userDefined=True):
-                        try:
-                            attr_value = cmds.getAttr('{}.{}'.format(ctr, user_attr))
-                            attr_opposite_value = cmds.getAttr(
-                                '{}.{}'.format(ctr.replace(side, opposite_side), user_attr))
-
-                            cmds.setAttr('{}.{}'.format(ctr.replace(side, opposite_side), user_attr), attr_value)
-                            cmds.setAttr('{}.{}'.format(ctr, user_attr), attr_opposite_value)
-                        except:
-                            pass
+            picker_undo.count_commands()
+            selection = cmds.ls(selection=True)
+            self.action_recorder.add_controls(len(selection))
+
+            with picker_guard.EditGuard('flip_pose'):
+                report = picker_mirror.flip_pose(selection)
+            self.show_report(report)
+            return report
         finally:
             cmds.undoInfo(closeChunk=True)
 
-    @staticmethod
-    def mirror_pose():
+    def mirror_pose(self):
         """
         Mirror the pose for the controls selected
+        :return: EditReport
         """
         cmds.undoInfo(openChunk=True)
         try:
-            for ctr in cmds.ls(selection=True):
-                side = '_{}_'.format(ctr.split('_')[-2])
-                opposite_side = '_l_' if side == '_r_' else '_r_'
-
-                if side != '_c_':
-                    ctr_xform = cmds.xform(ctr, query=True, objectSpace=True, matrix=True)
-                    cmds.xform(ctr.replace(side, opposite_side), objectSpace=True, matrix=ctr_xform)
-
-                    user_attrs = cmds.listAttr(ctr, userDefined=True)
-                    if user_attrs:
-                        for user_attr in cmds.listAttr(ctr, userDefined=True):
-                            try:
-                                attr_value = cmds.getAttr('{}.{}'.format(ctr, user_attr))
-                                cmds.setAttr('{}.{}'.format(ctr.replace(side, opposite_side), user_attr), attr_value)
-                            except:
-                                pass
+            picker_undo.count_commands()
+            selection = cmds.ls(selection=True)
+            self.action_recorder.add_controls(len(selection))
+
+            with picker_guard.EditGuard('mirror_pose'):
+                report = picker_mirror.mirror_pose(selection)
+            self.show_report(report)
+            return report
         finally:
             cmds.undoInfo(closeChunk=True)
 
-    def snap_fk_ik(self, limb='arm', side='l'):
+    def get_animation_range(self):
         """
-        Snap fk ik
-        :param limb: str , arm or leg
-        :param side: str, "l" or "r"
+        Get the playback range and the time offset of the animation mirror
+        :return: tuple, (start frame, end frame, time offset)
+        """
+        picker_undo.count_commands(2)
+        start_frame = cmds.playbackOptions(query=True, minTime=True)
+        end_frame = cmds.playbackOptions(query=True, maxTime=True)
+        time_offset = (end_frame - start_frame) / 2.0 if self.half_cycle_action.isChecked() else 0.0
+        return start_frame, end_frame, time_offset
+
+    def flip_animation(self):
+        """
+        Flip the animation of the controls selected over the playback range
+        :return: EditReport
         """
         cmds.undoInfo(openChunk=True)
         try:
-            namespace = self.get_namespace()
-
-            end_name = 'hand' if limb == 'arm' else 'foot'
-
-            snap_info = {'start': {'fk_control': '{}up{}Fk_{}_ctr'.format(namespace, limb.capitalize(), side),
-                                   'ik_control': None,
-                                   'fk_snap': '{}up{}_{}_jnt'.format(namespace, limb.capitalize(), side),
-                                   'ik_snap': None,
-                                   'snap_xform': None
-                                   },
-                         'mid': {'fk_control': '{}low{}Fk_{}_ctr'.format(namespace, limb.capitalize(), side),
-                                 'ik_control': '{}{}PoleVector_{}_ctr'.format(namespace, limb, side),
-                                 'fk_snap': '{}low{}_{}_jnt'.format(namespace, limb.capitalize(), side),
-                                 'ik_snap': '{}{}PoleVector_{}_snap'.format(namespace, limb, side),
-                                 'snap_xform': None
-                                 },
-                         'end': {'fk_control': '{}{}{}Fk_{}_ctr'.format(namespace, end_name, limb.capitalize(), side),
-                                 'ik_control': '{}{}{}Ik_{}_ctr'.format(namespace, end_name, limb.capitalize(), side),
-                                 'fk_snap': '{}{}{}_{}_skn'.format(namespace, end_name, limb.capitalize(), side),
-                                 'ik_snap': '{}{}{}_{}_skn'.format(namespace, end_name, limb.capitalize(), side),
-                                 'snap_xform': None
-                                 }
-                         }
-
-            settings_control = '{}{}Settings_{}_ctr'.format(namespace, limb, side)
-
-            state = cmds.getAttr('{}{}.fkIk'.format(namespace, settings_control))  # 0 == Fk; 1 == Ik
-
-            snap_value = 'ik_snap' if state == 0 else 'fk_snap'
-            control_value = 'ik_control' if state == 0 else 'fk_control'
-
-            for key, values in snap_info.items():
-                if snap_info[key][control_value]:
-                    snap_info[key]['snap_xform'] = cmds.xform(snap_info[key][snap_value],
-                                                              query=True, worldSpace=True, matrix=True)
-
-            new_state = 1 if state == 0 else 0
-            cmds.setAttr('{}.fkIk'.format(settings_control), new_state)
-
-            for key, values in snap_info.items():
-                if snap_info[key][control_value]:
-                    cmds.xform(snap_info[key][control_value], worldSpace=True, matrix=snap_info[key]['snap_xform'])
+            picker_undo.count_commands()
+            selection = cmds.ls(selection=True)
+            self.action_recorder.add_controls(len(selection))
+
+            with picker_guard.EditGuard('flip_animation'):
+                report = picker_mirror.flip_animation(selection, *self.get_animation_range())
+            self.show_report(report)
+            return report
         finally:
             cmds.undoInfo(closeChunk=True)
 
-    def select_control(self, control_name):
+    def mirror_animation(self):
         """
-        Select the control with the namespace given
-        :param control_name: str
+        Mirror the animation of the controls selected over the playback range
+        :return: EditReport
         """
         cmds.undoInfo(openChunk=True)
         try:
-            namespace = self.get_namespace()
-
-            control_name = '{}{}'.format(namespace, control_name)
-
-            if self.get_modifier() == 'shift':
-                cmds.select(control_name, add=True)
-            elif self.get_modifier() == 'control':
-                cmds.select(control_name, deselect=True)
-            else:
-                cmds.select(control_name)
+            picker_undo.count_commands()
+            selection = cmds.ls(selection=True)
+            self.action_recorder.add_controls(len(selection))
+
+            with picker_guard.EditGuard('mirror_animation'):
+                report = picker_mirror.mirror_animation(selection, *self.get_animation_range())
+            self.show_report(report)
+            return report
         finally:
             cmds.undoInfo(closeChunk=True)
-    def select_control_list(self, control_list):
+
+    def save_pose(self, pose_name, selected_only=False):
         """
-        Select the control with the namespace given
-        :param control_list: list
+        Store the pose of the controls in the pose library
+        :param pose_name: str
+        :param selected_only: bool, only store the selected controls
+        """
+        namespace = self.get_namespace()
+
+        control_list = picker_library.get_pose_controls(namespace, selected_only)
+        self.action_recorder.add_controls(len(control_list))
+
+        pose = picker_library.capture_pose(namespace, control_list)
+        picker_library.get_library().add_pose(pose_name, pose)
+
+    def apply_pose(self, pose_name, selected_only=False):
+        """
+        Set a pose of the pose library
+        :param pose_name: str
+        :param selected_only: bool, only set the selected controls
+        :return: EditReport
         """
         cmds.undoInfo(openChunk=True)
         try:
             namespace = self.get_namespace()
-            control_list = ['{}{}'.format(namespace, control_name) for control_name in control_list]
 
-            if self.get_modifier() == 'shift':
-                cmds.select(control_list, add=True)
-            elif self.get_modifier() == 'control':
-                cmds.select(control_list, deselect=True)
-            else:
-                cmds.select(control_list)
+            pose = picker_library.get_library().get_pose(pose_name)
+            control_names = None
+            if selected_only:
+                control_list = picker_library.get_pose_controls(namespace, selected_only)
+                control_names = set(x[len(namespace):] for x in control_list)
+            self.action_recorder.add_controls(len(pose.control_names) if control_names is None else
+                                              len(control_names))
+
+            with picker_guard.EditGuard('apply_pose'):
+                report = picker_library.apply_pose(pose, namespace, control_names,
+                                                   'Apply pose {}'.format(pose_name))
+            self.show_report(report)
+            return report
         finally:
             cmds.undoInfo(closeChunk=True)
-    def select_all_controls(self):
+
+    def begin_pose_blend(self, pose_name=None, selected_only=True):
         """
-        Select all the controls in the scene with the namespace given
+        Read the start and target poses of the blend
+        :param pose_name: str, pose of the pose library, the bind pose if None
+        :param selected_only: bool, only blend the selected controls, all of them if none is selected
+        """
+        namespace = self.get_namespace()
+
+        control_list = picker_library.get_pose_controls(namespace, selected_only)
+        if not control_list:
+            control_list = picker_library.get_pose_controls(namespace)
+        self.action_recorder.add_controls(len(control_list))
+
+        pose = picker_library.get_library().get_pose(pose_name) if pose_name else None
+        self.pose_blend = picker_blend.PoseBlend(namespace, control_list, pose)
+        self.pose_blend.begin()
+
+    def set_pose_blend(self, weight):
+        """
+        Set the blended pose while the slider is dragged
+        :param weight: float, 0 is the start pose and 1 the target pose
         """
+        if self.pose_blend is not None:
+            self.pose_blend.set_weight(weight)
+
+    def finish_pose_blend(self, weight):
+        """
+        Set the blended pose as a single undo step
+        :param weight: float
+        :return: EditReport or None if no blend was begun
+        """
+        if self.pose_blend is None:
+            return
         cmds.undoInfo(openChunk=True)
         try:
-            namespace = self.get_namespace()
-            modules_grp = '{}modules_c_grp'.format(namespace)
-
-            cmds.select([x for x in cmds.listRelatives(modules_grp, allDescendents=True)
-                         if x.endswith('_ctr')])
+            with picker_guard.EditGuard('blend_pose'):
+                report = self.pose_blend.finish(weight)
+            self.show_report(report)
+            return report
         finally:
+            self.pose_blend = None
             cmds.undoInfo(closeChunk=True)
 
-    def select_body_controls(self):
+    def snap_fk_ik(self, limb='arm', side='l'):
         """
-        Select body the controls in the scene with the namespace given
+        Snap fk ik
+        :param limb: str , arm or leg
+        :param side: str, "l" or "r"
         """
         cmds.undoInfo(openChunk=True)
         try:
             namespace = self.get_namespace()
 
-            modules_grp = '{}bodyModules_c_grp'.format(namespace)
+            self.action_recorder.add_controls(1)
 
-            cmds.select([x for x in cmds.listRelatives(modules_grp, allDescendents=True)
-                         if x.endswith('_ctr')])
+            with picker_guard.EditGuard('snap_fk_ik'):
+                picker_snap.snap_fk_ik(namespace, limb, side)
         finally:
             cmds.undoInfo(closeChunk=True)
 
-    def select_face_controls(self):
+    def bake_fk_ik(self, limb_list):
         """
-        Select face the controls in the scene with the namespace given
+        Snap fk ik over the playback range
+        :param limb_list: list, [(limb, side), ...]
+        :return: EditReport
         """
         cmds.undoInfo(openChunk=True)
         try:
             namespace = self.get_namespace()
 
-            modules_grp = '{}faceModules_c_grp'.format(namespace)
+            picker_undo.count_commands(2)
+            start_frame = cmds.playbackOptions(query=True, minTime=True)
+            end_frame = cmds.playbackOptions(query=True, maxTime=True)
+            keys_only = self.keys_only_action.isChecked()
 
-            cmds.select([x for x in cmds.listRelatives(modules_grp, allDescendents=True)
-                         if x.endswith('_ctr')])
+            self.action_recorder.add_controls(len(limb_list))
+
+            with picker_guard.EditGuard('bake_fk_ik'):
+                report = picker_snap.bake_fk_ik(namespace, limb_list, start_frame, end_frame, keys_only)
+            self.show_report(report)
+            return report
         finally:
             cmds.undoInfo(closeChunk=True)
 
-    def key_all_controls(self):
+    def select_control(self, control_name, modifier=None):
         """
-        Key all the controls in the scene with the namespace given
+        Select the control with the namespace given
+        :param control_name: str
+        :param modifier: str, the current keyboard modifier if None
         """
         cmds.undoInfo(openChunk=True)
         try:
             namespace = self.get_namespace()
 
-            modules_grp = '{}modules_c_grp'.format(namespace)
+            self.action_recorder.add_controls(1)
 
-            cmds.setKeyframe([x for x in cmds.listRelatives(modules_grp, allDescendents=True)
-                              if x.endswith('_ctr')])
+            picker_operations.select_controls(namespace, control_name, modifier or self.get_modifier())
         finally:
             cmds.undoInfo(closeChunk=True)
 
-    def key_body_controls(self):
+    def select_control_list(self, control_list, modifier=None):
         """
-        Key body the controls in the scene with the namespace given
+        Select the control with the namespace given
+        :param control_list: list
+        :param modifier: str, the current keyboard modifier if None
         """
         cmds.undoInfo(openChunk=True)
         try:
             namespace = self.get_namespace()
 
-            modules_grp = '{}bodyModules_c_grp'.format(namespace)
+            self.action_recorder.add_controls(len(control_list))
 
-            cmds.setKeyframe([x for x in cmds.listRelatives(modules_grp, allDescendents=True)
-                              if x.endswith('_ctr')])
+            picker_operations.select_controls(namespace, control_list, modifier or self.get_modifier())
         finally:
             cmds.undoInfo(closeChunk=True)
 
+    def select_all_controls(self):
+        """
+        Select all the controls in the scene with the namespace given
+        """
+        self.select_group('all')
+
+    def select_body_controls(self):
+        """
+        Select body the controls in the scene with the namespace given
+        """
+        self.select_group('body')
+
+    def select_face_controls(self):
+        """
+        Select face the controls in the scene with the namespace given
+        """
+        self.select_group('face')
+
+    def key_all_controls(self):
+        """
+        Key all the controls in the scene with the namespace given
+        """
+        self.key_group('all')
+
+    def key_body_controls(self):
+        """
+        Key body the controls in the scene with the namespace given
+        """
+        self.key_group('body')
+
     def key_face_controls(self):
         """
         Key face the controls in the scene with the namespace given
         """
+        self.key_group('face')
+
+    def select_group(self, group):
+        """
+        Select the controls of a group of the targeted rigs, in chunks on large rigs
+        :param group: str, 'all', 'body' or 'face'
+        """
+        rig_controls = picker_operations.get_rig_controls(self.get_target_namespaces(), group)
+        control_list = picker_operations.join_rig_controls(rig_controls)
+        self.action_recorder.add_controls(len(control_list))
+
+        selected = list()
+
+        def select_chunk(chunk):
+            selection = OpenMaya.MSelectionList()
+            for ctr in chunk:
+                selection.add(ctr)
+            edit = picker_handles.SelectionEdit(selection, OpenMaya.MGlobal.kAddToList if selected
+                                                else OpenMaya.MGlobal.kReplaceList)
+            edit.doIt()
+            selected.extend(chunk)
+            return edit
+
+        if self.run_job('Select {}'.format(group), control_list, select_chunk):
+            return
+
         cmds.undoInfo(openChunk=True)
         try:
-            namespace = self.get_namespace()
+            picker_undo.count_commands()
+            cmds.select(control_list)
+        finally:
+            cmds.undoInfo(closeChunk=True)
+
+    def key_group(self, group):
+        """
+        Key the controls of a group of the targeted rigs, only the changed channels in smart key mode, in chunks on
+        large rigs
+        :param group: str, 'all', 'body' or 'face'
+        """
+        rig_controls = picker_operations.get_rig_controls(self.get_target_namespaces(), group)
+        control_list = picker_operations.join_rig_controls(rig_controls)
+        self.action_recorder.add_controls(len(control_list))
+        smart = self.smart_key_action.isChecked()
+
+        reports = list()
+
+        def key_chunk(chunk, key_edit=None):
+            report = picker_operations.key_rigs(picker_operations.split_rig_controls(chunk), smart, key_edit)
+            if report is not None:
+                reports.append(report)
+            return key_edit
+
+        def key_job_chunk(chunk):
+            return key_chunk(chunk, picker_key.KeyEdit())
 
-            modules_grp = '{}faceModules_c_grp'.format(namespace)
+        def finish_key():
+            if reports:
+                self.show_report(picker_pose.EditReport('Smart key', sum(x.set_count for x in reports),
+                                                        sum(x.skipped_count for x in reports),
+                                                        sum(x.elapsed for x in reports)))
 
-            cmds.setKeyframe([x for x in cmds.listRelatives(modules_grp, allDescendents=True)
-                              if x.endswith('_ctr')])
+        if self.run_job('Key {}'.format(group), control_list, key_job_chunk, finish_key):
+            return
+
+        cmds.undoInfo(openChunk=True)
+        try:
+            key_chunk(control_list)
+            finish_key()
         finally:
             cmds.undoInfo(closeChunk=True)
 
+    # JOBS
+    def run_job(self, name, control_list, process_chunk, finish=None):
+        """
+        Run an operation as a chunked job with progress if there are many controls
+        :param name: str
+        :param control_list: list
+        :param process_chunk: callable(chunk), returns the undo record of the edits it applied or None
+        :param finish: callable
+        :return: bool, False if the operation is small and the caller must run it
+        """
+        if len(control_list) < picker_jobs.job_threshold:
+            return False
+
+        job = picker_jobs.ChunkedJob(name, control_list, process_chunk, finish, self)
+        job.finished.connect(lambda completed: self.set_actions_enabled(True))
+        self.action_recorder.add_job(job)
+        # The edits of the job are reverted if it is cancelled, the actions must not change the same channels
+        self.set_actions_enabled(False)
+        self.job_progress.run(job)
+        return True
+
+    def set_actions_enabled(self, enabled):
+        for widget in self.ui_children:
+            if isinstance(widget, (QtWidgets.QAbstractButton, QtWidgets.QTabWidget)):
+                widget.setEnabled(enabled)
+        self.tools_tb.setEnabled(enabled)
+
     def vis_controls(self):
         """
         switch on/off controls visibilities
         """
         cmds.undoInfo(openChunk=True)
         try:
-            namespace = self.get_namespace()
+            namespaces = self.get_target_namespaces()
 
-            vis_controls_value = 0 if cmds.getAttr('{}general_c_ctr.visControls'.format(namespace)) else 1
-            cmds.setAttr('{}general_c_ctr.visControls'.format(namespace), vis_controls_value)
+            picker_operations.set_visibility(namespaces, 'controls')
+            self.action_recorder.add_controls(len(namespaces))
         finally:
             cmds.undoInfo(closeChunk=True)
 
@@ -466,23 +894,111 @@ class Picker(QtWidgets.QWidget):
         """
         cmds.undoInfo(openChunk=True)
         try:
-            namespace = self.get_namespace()
+            namespaces = self.get_target_namespaces()
 
-            vis_controls_value = 0 if cmds.getAttr('{}general_c_ctr.visGeometries'.format(namespace)) else 1
-            cmds.setAttr('{}general_c_ctr.visGeometries'.format(namespace), vis_controls_value)
+            picker_operations.set_visibility(namespaces, 'geometries')
+            self.action_recorder.add_controls(len(namespaces))
         finally:
             cmds.undoInfo(closeChunk=True)
 
+    # SELECTION SYNC
+    def set_selection_sync(self, enabled):
+        """
+        Turn on/off the highlight of the controls selected in Maya
+        :param enabled: bool
+        """
+        if enabled and self.selection_callback_id is None:
+            self.selection_callback_id = OpenMaya.MEventMessage.addEventCallback('SelectionChanged',
+                                                                                self.selection_changed)
+            self.schedule_selection_sync()
+        elif not enabled and self.selection_callback_id is not None:
+            OpenMaya.MMessage.removeCallback(self.selection_callback_id)
+            self.selection_callback_id = None
+            self.selection_timer.stop()
+            self.set_selected_controls(set())
+
+    def selection_changed(self, *args):
+        self.selection_sync_stats['callbacks'] += 1
+        self.schedule_selection_sync()
+
+    def schedule_selection_sync(self, *args):
+        if not self.selection_timer.isActive():
+            self.selection_timer.start(self.get_selection_sync_interval())
+
+    def get_selection_sync_interval(self):
+        """
+        Wait at least a frame, and longer if the last updates were slow so they never take most of the main thread
+        :return: int, milliseconds
+        """
+        updates = self.selection_sync_stats['updates']
+        average_time = self.selection_sync_stats['total_time'] / updates if updates else 0.0
+        return min(max(self.selection_frame_interval, int(average_time * 4000)), 250)
+
+    def sync_selection(self):
+        """
+        Highlight the controls selected in Maya
+        """
+        start_time = time.time()
+        namespace = self.get_namespace()
+        control_names = set()
+        picker_undo.count_commands()
+        for node in cmds.ls(selection=True) or list():
+            if node.startswith(namespace):
+                control_names.add(node[len(namespace):])
+
+        restyled = self.set_selected_controls(control_names)
+
+        elapsed = time.time() - start_time
+        self.selection_sync_stats['updates'] += 1
+        self.selection_sync_stats['restyled'] += restyled
+        self.selection_sync_stats['total_time'] += elapsed
+        self.selection_sync_stats['max_time'] = max(self.selection_sync_stats['max_time'], elapsed)
+
+    def set_selected_controls(self, control_names):
+        """
+        Set the controls shown as selected
+        :param control_names: set, control names without namespace
+        :return: int, number of controls restyled
+        """
+        for canvas in self.canvases.values():
+            canvas.set_selected_controls(control_names & set(canvas.controls))
+
+        widgets = set(self.control_widgets[x] for x in control_names if x in self.control_widgets)
+        changed = widgets ^ self.selected_widgets
+        self.selected_widgets = widgets
+        self.restyle_widgets(changed)
+        return len(changed)
+
+    def restyle_widgets(self, widgets):
+        """
+        Set the style of the controls given from their highlight and selection states
+        :param widgets: set
+        """
+        for widget in widgets:
+            if widget in self.highlighted_widgets:
+                widget.setStyleSheet(highlight_style)
+            elif widget in self.selected_widgets:
+                widget.setStyleSheet('{}\n{}'.format(self.widget_styles_dict[widget], selected_style))
+            else:
+                widget.setStyleSheet(self.widget_styles_dict[widget])
+
+    def closeEvent(self, event):
+        self.set_selection_sync(False)
+        self.session.remove_callbacks()
+        self.job_progress.cancel()
+        # The recorder is shared by the pickers of the session
+        self.action_recorder.set_enabled(False)
+        super(Picker, self).closeEvent(event)
+
     # Load images from the picker folder if not the backgrounds does not work
     def load_images(self):
         images_folder = r'{}/images'.format(os.path.dirname(__file__))
         image_list = [f for f in os.listdir(images_folder) if f.endswith(('.png', '.jpg', '.jpeg', '.gif'))]
         for i, image_file in enumerate(image_list):
             label_name = "{}_label".format(image_file.split('.')[0])
-            label = self.ui_widget.findChild(QtWidgets.QLabel, label_name)
+            label = self.ui_widgets.get(label_name)
             if label:
-                pixmap = QtGui.QPixmap(os.path.join(images_folder, image_file))
-                label.setPixmap(pixmap)
+                self.image_loader.load(label, os.path.join(images_folder, image_file), label.size())
 
     def load_icon(self):
         icon_path = r'{}/images/hiddenStrings.png'.format(os.path.dirname(__file__))
@@ -490,8 +1006,48 @@ class Picker(QtWidgets.QWidget):
         QtWidgets.QApplication.setWindowIcon(icon)
     
     # DRAG AND DROP METHODS
+    def rebuild_control_index(self):
+        """
+        Store the rect and the tab of every control in picker coordinates
+        """
+        self.control_index.build(self, self.widget_styles_dict.keys())
+        self.control_index_dirty = False
+
+    def get_rubber_band_controls(self):
+        """
+        Get the controls of the current tab under the rubber band
+        :return: set
+        """
+        if self.control_index_dirty:
+            self.rebuild_control_index()
+        tab_name = self.picker_tab.currentWidget().objectName()
+        return self.control_index.query(self.rubber_band.geometry(), tab_name)
+
+    def set_highlighted_widgets(self, widgets):
+        """
+        Restyle only the controls whose highlight state changed
+        :param widgets: set
+        """
+        changed = widgets ^ self.highlighted_widgets
+        self.highlighted_widgets = widgets
+        self.restyle_widgets(changed)
+
+    def resizeEvent(self, event):
+        self.control_index_dirty = True
+        super(Picker, self).resizeEvent(event)
+
+    def showEvent(self, event):
+        self.control_index_dirty = True
+        # A warm picker shown again gets back the callbacks removed when it was closed
+        if not self.session.callback_ids:
+            self.session.install_callbacks()
+            self.session.refresh()
+        if self.selection_sync_action.isChecked():
+            self.set_selection_sync(True)
+        super(Picker, self).showEvent(event)
+
     def mousePressEvent(self, event):
-        if event.button() == QtCore.Qt.LeftButton:
+        if event.button() == QtCore.Qt.LeftButton and not self.job_progress.is_running():
             self.origin = event.pos()
             self.drag_selection = QtCore.QRect(self.origin, QtCore.QSize())
             self.rubber_band.setGeometry(self.drag_selection)
@@ -506,6 +1062,9 @@ class Picker(QtWidgets.QWidget):
                 self.delta = None
 
     def mouseMoveEvent(self, event):
+        if self.origin is None:
+            return
+
         if event.modifiers() == QtCore.Qt.AltModifier:
             if self.alt_point is None:
                 self.source_geo = self.rubber_band.geometry()
@@ -518,51 +1077,65 @@ class Picker(QtWidgets.QWidget):
             self.drag_selection = QtCore.QRect(self.origin, event.pos()).normalized()
             self.rubber_band.setGeometry(self.drag_selection)
 
-        rubber_ban_pos = self.rubber_band.mapToGlobal(self.rubber_band.rect().topLeft())
-        rubber_ban_rect = QtCore.QRect(rubber_ban_pos, self.rubber_band.rect().size())
-        for widget, widget_style in self.widget_styles_dict.items():
-            widget_pos = widget.mapToGlobal(widget.rect().topLeft())
-            widget_rect = QtCore.QRect(widget_pos, widget.rect().size())
-            if rubber_ban_rect.intersects(widget_rect):
-                widget.setStyleSheet('color: black; background-color: white;')
-            else:
-                widget.setStyleSheet(widget_style)
+        self.set_highlighted_widgets(self.get_rubber_band_controls())
 
     def mouseReleaseEvent(self, event):
-        if event.button() == QtCore.Qt.LeftButton:
+        if event.button() == QtCore.Qt.LeftButton and self.origin is not None:
             self.rubber_band.hide()
-            tab_index = self.ui_widget.findChildren(QtWidgets.QTabWidget, 'picker_tab')[0].currentIndex()
-
-            control_list = list()
-
-            rubber_ban_pos = self.rubber_band.mapToGlobal(self.rubber_band.rect().topLeft())
-            rubber_ban_rect = QtCore.QRect(rubber_ban_pos, self.rubber_band.rect().size())
-            for widget, widget_style in self.widget_styles_dict.items():
-                widget_pos = widget.mapToGlobal(widget.rect().topLeft())
-                widget_rect = QtCore.QRect(widget_pos, widget.rect().size())
-                if rubber_ban_rect.intersects(widget_rect):
-                    parent_tab = widget
-                    while parent_tab.objectName() != 'body_tab' and parent_tab.objectName() != 'face_tab':
-                        parent_tab = parent_tab.parentWidget()
-                    widget.setStyleSheet(widget_style)
-
-                    if parent_tab.objectName() == 'body_tab' and tab_index == 0:
-                        control_list.append(widget.objectName())
-                    if parent_tab.objectName() == 'face_tab' and tab_index == 1:
-                        control_list.append(widget.objectName())
-
-            self.select_control_list(control_list)
-
-
-def openWindow(scale_factor):
-    main_window_ptr = OpenMayaUI.MQtUtil.mainWindow()
-    maya_main_window = wrapInstance(int(main_window_ptr), QtWidgets.QWidget)
-    all_maya_windows = maya_main_window.findChildren(QtWidgets.QWidget)
-
-    picker_window = [x for x in all_maya_windows if
-                     isinstance(x, QtWidgets.QWidget) and x.objectName() == '{}PickerWindow'.format(char_name)]
-    if picker_window:
-        picker_window[0].close()
+            selected_widgets = self.get_rubber_band_controls()
+            control_list = [widget.objectName() for widget in self.widget_styles_dict if widget in selected_widgets]
+            self.set_highlighted_widgets(set())
+
+            self.origin = None
+
+            self.select_control_list(control_list, self.get_modifier(event.modifiers()))
+
+
+def get_source_key():
+    """
+    Get the state of the files the picker is built from, a warm picker is rebuilt when it changes
+    :return: tuple
+    """
+    picker_folder = os.path.dirname(__file__)
+    images_folder = os.path.join(picker_folder, 'images')
+    image_stats = tuple(sorted((x.name, x.stat().st_mtime, x.stat().st_size) for x in os.scandir(images_folder)
+                               if x.is_file()))
+    return (picker_cache.get_file_hash(os.path.join(picker_folder, 'picker.ui')),
+            picker_cache.get_file_hash(__file__), image_stats)
+
+
+def closeWindow():
+    """
+    Close the picker and release it, also the warm one
+    """
+    picker_window = shared.picker_window
+    shared.picker_window = None
+    shared.source_key = None
+    if picker_window is not None and isValid(picker_window):
+        picker_window.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        picker_window.close()
+
+
+def openWindow(scale_factor, render_mode='widgets', warm=True):
+    """
+    Show the picker. A warm picker is only hidden when it is closed, so opening it again shows the same window,
+    rescaled if the scale changed. It is built again when the render mode, picker.ui or the images change
+    :param scale_factor: float
+    :param render_mode: str, 'widgets' or 'canvas'
+    :param warm: bool
+    :return: Picker
+    """
+    source_key = get_source_key()
+    picker_window = shared.picker_window
+    if (picker_window is not None and isValid(picker_window) and warm and picker_window.warm and
+            picker_window.render_mode == render_mode and shared.source_key == source_key):
+        picker_window.set_scale_factor(scale_factor)
+    else:
+        closeWindow()
+        picker_window = Picker(scale_factor, render_mode, warm)
+        shared.picker_window = picker_window
+        shared.source_key = source_key
 
-    picker_window = Picker(scale_factor)
     picker_window.show()
+    picker_window.raise_()
+    return picker_window
@@ -0,0 +1,248 @@
+"""
+Run picker operations over many scene files with a pool of mayapy workers:
+
+    mayapy picker_batch.py shots/*.ma --operations bind_pose vis_controls=1 key_all --workers 4 --save
+        --report batch_report.json
+
+Every file is opened in a worker, the operations run on every rig namespace of the scene, or the ones given,
+and the file is saved if requested. A failing file is reported and the batch goes on
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+
+scene_extensions = ('.ma', '.mb')
+# A file whose worker crashed is tried again in a new pool up to this number of attempts
+max_attempts = 2
+
+
+def run_bind_pose(namespace, value):
+    import picker_operations
+    return str(picker_operations.bind_pose(namespace))
+
+
+def run_key(group, smart=False):
+    def run_key_group(namespace, value):
+        import picker_operations
+        control_list = picker_operations.get_controls(namespace, group)
+        report = picker_operations.key_controls(namespace, control_list, smart)
+        return str(report) if report else '{} controls keyed'.format(len(control_list))
+    return run_key_group
+
+
+def run_visibility(vis_type):
+    def run_set_visibility(namespace, value):
+        import picker_operations
+        return picker_operations.set_visibility(namespace, vis_type, int(value) if value is not None else None)
+    return run_set_visibility
+
+
+def run_apply_pose(namespace, value):
+    import picker_guard
+    import picker_library
+    pose = picker_library.get_library().get_pose(value)
+    with picker_guard.EditGuard('apply_pose'):
+        return str(picker_library.apply_pose(pose, namespace, name='Apply pose {}'.format(value)))
+
+
+def run_write_manifest(namespace, value):
+    import picker_manifest
+    return picker_manifest.write_manifest(namespace)
+
+
+# {operation name: callable(namespace, value)}, the value is the text after '=' in the operation or None
+batch_operations = {'bind_pose': run_bind_pose,
+                    'key_all': run_key('all'),
+                    'key_body': run_key('body'),
+                    'key_face': run_key('face'),
+                    'smart_key_all': run_key('all', smart=True),
+                    'smart_key_body': run_key('body', smart=True),
+                    'smart_key_face': run_key('face', smart=True),
+                    'vis_controls': run_visibility('controls'),
+                    'vis_geometries': run_visibility('geometries'),
+                    'apply_pose': run_apply_pose,
+                    'write_manifest': run_write_manifest}
+
+
+def parse_operation(operation):
+    """
+    :param operation: str, 'name' or 'name=value'
+    :return: tuple, (name, value or None)
+    """
+    name, separator, value = operation.partition('=')
+    if name not in batch_operations:
+        raise ValueError('Unknown operation {}, the operations are {}'.format(name, ', '.join(batch_operations)))
+    return name, value if separator else None
+
+
+def initialize_worker():
+    """
+    Start Maya in the worker process
+    """
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+
+
+def save_scene(scene_path, output_folder=None):
+    from maya import cmds
+    if output_folder:
+        os.makedirs(output_folder, exist_ok=True)
+        cmds.file(rename=os.path.join(output_folder, os.path.basename(scene_path)))
+    file_type = 'mayaBinary' if scene_path.lower().endswith('.mb') else 'mayaAscii'
+    return cmds.file(save=True, force=True, type=file_type)
+
+
+def process_scene(scene_path, operations, namespaces=None, save=False, output_folder=None):
+    """
+    Open a scene and run the operations on its rigs, the errors are returned in the result
+    :param scene_path: str
+    :param operations: list, [(name, value), ...]
+    :param namespaces: list, the rigs of the scene if None
+    :param save: bool
+    :param output_folder: str, save in this folder instead of overwriting the scene
+    :return: dict
+    """
+    start_time = time.time()
+    result = {'scene': scene_path, 'status': 'ok', 'worker': os.getpid(), 'operations': list()}
+    try:
+        from maya import cmds
+        import picker_operations
+
+        cmds.file(scene_path, open=True, force=True, prompt=False)
+        result['open_time'] = time.time() - start_time
+
+        namespaces = namespaces if namespaces is not None else picker_operations.get_rig_namespaces()
+        result['namespaces'] = namespaces
+        for namespace in namespaces:
+            for name, value in operations:
+                operation_time = time.time()
+                operation_result = {'operation': name, 'value': value, 'namespace': namespace}
+                result['operations'].append(operation_result)
+                operation_result['result'] = batch_operations[name](namespace, value)
+                operation_result['time'] = time.time() - operation_time
+
+        if save or output_folder:
+            result['saved'] = save_scene(scene_path, output_folder)
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+        result['traceback'] = traceback.format_exc()
+
+    result['time'] = time.time() - start_time
+    return result
+
+
+def get_scene_files(paths, scene_list=None):
+    """
+    Get the scene files of the paths given, the folders are expanded to the scenes they contain
+    :param paths: list
+    :param scene_list: str, text file with a path per line
+    :return: list
+    """
+    paths = list(paths)
+    if scene_list:
+        with open(scene_list, 'r') as scene_list_file:
+            paths.extend(x.strip() for x in scene_list_file if x.strip())
+
+    scene_files = list()
+    for path in paths:
+        if os.path.isdir(path):
+            scene_files.extend(sorted(os.path.join(path, x) for x in os.listdir(path)
+                                      if x.lower().endswith(scene_extensions)))
+        else:
+            scene_files.append(path)
+    return scene_files
+
+
+def run_batch(scene_files, operations, namespaces=None, workers=4, save=False, output_folder=None):
+    """
+    Process the scenes in a pool of Maya workers
+    :param scene_files: list
+    :param operations: list, [(name, value), ...]
+    :param namespaces: list, the rigs of every scene if None
+    :param workers: int, 0 runs the scenes in this process
+    :param save: bool
+    :param output_folder: str
+    :return: list, result of every scene in the order given
+    """
+    results = dict()
+    if workers == 0:
+        initialize_worker()
+        for scene_path in scene_files:
+            results[scene_path] = process_scene(scene_path, operations, namespaces, save, output_folder)
+            print_result(results[scene_path])
+        return [results[x] for x in scene_files]
+
+    attempts = dict((x, 0) for x in scene_files)
+    pending = list(scene_files)
+    # Maya must not be forked
+    context = multiprocessing.get_context('spawn')
+    while pending:
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=initialize_worker) as executor:
+            futures = dict((executor.submit(process_scene, x, operations, namespaces, save, output_folder), x)
+                           for x in pending)
+            pending = list()
+            for future in as_completed(futures):
+                scene_path = futures[future]
+                try:
+                    results[scene_path] = future.result()
+                except BrokenProcessPool:
+                    attempts[scene_path] += 1
+                    if attempts[scene_path] < max_attempts:
+                        pending.append(scene_path)
+                        continue
+                    results[scene_path] = {'scene': scene_path, 'status': 'crashed',
+                                           'error': 'The worker process stopped'}
+                print_result(results[scene_path])
+
+    return [results[x] for x in scene_files]
+
+
+def print_result(result):
+    message = '{} {} {:.2f}s'.format(result['status'].upper(), result['scene'], result.get('time', 0.0))
+    if result.get('error'):
+        message += ' {}'.format(result['error'])
+    print(message)
+    sys.stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run picker operations over many scene files')
+    parser.add_argument('scenes', nargs='*', help='scene files or folders')
+    parser.add_argument('--scene-list', help='text file with a scene path per line')
+    parser.add_argument('--operations', nargs='+', required=True,
+                        help='operations in order, name or name=value: {}'.format(', '.join(batch_operations)))
+    parser.add_argument('--namespace', action='append', dest='namespaces',
+                        help='rig namespace, e.g. hulk:, every rig of the scene if not given')
+    parser.add_argument('--workers', type=int, default=max(1, min(4, os.cpu_count() or 1)),
+                        help='worker processes, 0 runs in this process')
+    parser.add_argument('--save', action='store_true', help='overwrite the scenes')
+    parser.add_argument('--output-folder', help='save the scenes in this folder')
+    parser.add_argument('--report', help='JSON report file')
+    args = parser.parse_args(argv)
+
+    operations = [parse_operation(x) for x in args.operations]
+    scene_files = get_scene_files(args.scenes, args.scene_list)
+
+    start_time = time.time()
+    results = run_batch(scene_files, operations, args.namespaces, args.workers, args.save, args.output_folder)
+    elapsed = time.time() - start_time
+
+    failed_count = len([x for x in results if x['status'] != 'ok'])
+    print('{} scenes, {} failed in {:.2f}s'.format(len(results), failed_count, elapsed))
+    if args.report:
+        with open(args.report, 'w') as report_file:
+            json.dump({'operations': args.operations, 'workers': args.workers, 'time': elapsed,
+                       'scenes': results}, report_file, indent=2)
+    return 1 if failed_count else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
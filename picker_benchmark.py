@@ -0,0 +1,276 @@
+"""
+Time the picker actions outside of Maya against the simulated rig of picker_fake_maya, under an offscreen Qt platform.
+The results are written as JSON with the times, the cmds call counts and the undo memory of every action and rig size:
+
+    python picker_benchmark.py --controls 500 5000 20000 --repeat 5 --output benchmark.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+
+import picker_fake_maya
+
+
+default_sizes = [500, 5000]
+# Rubber-band sweep, (start, end) corners in picker coordinates at scale 1
+rubber_band_sweep = ((20, 60), (380, 640))
+rubber_band_steps = 20
+pose_blend_steps = 30
+rescale_factor = 1.25
+
+
+def get_times_summary(times):
+    sorted_times = sorted(times)
+    return {'times_ms': [x * 1000.0 for x in times],
+            'first_ms': times[0] * 1000.0,
+            'min_ms': sorted_times[0] * 1000.0,
+            'median_ms': sorted_times[len(sorted_times) // 2] * 1000.0,
+            'max_ms': sorted_times[-1] * 1000.0}
+
+
+class PickerBenchmark(object):
+    """
+    Build a picker on the simulated rig and time its actions
+    """
+    def __init__(self, repeat=5, scale_factor=1.0, user_attr_count=3, namespace=''):
+        """
+        :param repeat: int, runs per action, the first one runs with cold caches
+        :param scale_factor: float
+        :param user_attr_count: int, numeric user attributes per control
+        :param namespace: str
+        """
+        self.repeat = repeat
+        self.scale_factor = scale_factor
+        self.user_attr_count = user_attr_count
+        self.namespace = namespace
+
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        self.scene = picker_fake_maya.install()
+
+        from PySide2 import QtCore, QtGui, QtWidgets
+        import shiboken2
+        self.QtCore = QtCore
+        self.QtGui = QtGui
+        self.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+        self.main_window = QtWidgets.QWidget()
+        picker_fake_maya.MQtUtil.main_window_ptr = shiboken2.getCppPointer(self.main_window)[0]
+
+        import picker
+        import picker_blend
+        import picker_manifest
+        import picker_mirror
+        import picker_registry
+        import picker_undo
+        self.picker_module = picker
+        self.picker_blend = picker_blend
+        self.picker_manifest = picker_manifest
+        self.picker_mirror = picker_mirror
+        self.picker_registry = picker_registry
+        self.picker_undo = picker_undo
+        self.picker = None
+
+    def get_cases(self):
+        """
+        :return: list, [(case name, setup callable or None, run callable), ...]
+        """
+        cmds = picker_fake_maya.cmds
+        picker = self.picker
+        registry = self.picker_registry.get_registry()
+
+        def select_group(group):
+            return lambda: cmds.select(registry.get_controls(self.namespace, group))
+
+        def select_side(side):
+            return lambda: cmds.select([x for x in registry.get_controls(self.namespace, 'all')
+                                        if '_{}_'.format(side) in x])
+
+        cases = [('bind_pose', None, picker.bind_pose),
+                 ('flip_pose', select_group('all'), picker.flip_pose),
+                 ('mirror_pose', select_side('l'), picker.mirror_pose),
+                 ('select_control', None, lambda: picker.select_control('head_c_ctr')),
+                 ('select_all_controls', None, picker.select_all_controls),
+                 ('select_body_controls', None, picker.select_body_controls),
+                 ('select_face_controls', None, picker.select_face_controls),
+                 ('key_all_controls', None, picker.key_all_controls),
+                 ('key_body_controls', None, picker.key_body_controls),
+                 ('key_face_controls', None, picker.key_face_controls),
+                 ('smart_key_all_controls', lambda: picker.smart_key_action.setChecked(True),
+                  self.smart_key_all_controls),
+                 ('snap_fk_ik_arm', None, lambda: picker.snap_fk_ik('arm', 'l')),
+                 ('snap_fk_ik_leg', None, lambda: picker.snap_fk_ik('leg', 'r')),
+                 ('rubber_band', self.reset_rubber_band, self.rubber_band),
+                 ('warm_reopen', self.close_picker, self.reopen_picker),
+                 ('rescale_reopen', self.close_picker, lambda: self.reopen_picker(rescale_factor))]
+        if self.picker_blend.numpy is not None:
+            cases.append(('pose_blend_drag', self.pose_controls, self.pose_blend_drag))
+        return cases
+
+    def pose_controls(self):
+        """
+        Move and rotate every control away from the bind pose
+        """
+        cmds = picker_fake_maya.cmds
+        for i, ctr in enumerate(self.picker_registry.get_registry().get_controls(self.namespace, 'all')):
+            cmds.setAttr('{}.translateY'.format(ctr), 1.0 + i % 5)
+            cmds.setAttr('{}.rotateX'.format(ctr), 0.1 * (i % 30))
+            cmds.setAttr('{}.rotateZ'.format(ctr), -0.05 * (i % 20))
+
+    def pose_blend_drag(self):
+        """
+        Drag the pose blend slider of all the controls halfway toward the bind pose
+        """
+        self.picker.begin_pose_blend(None, selected_only=False)
+        for step in range(1, pose_blend_steps + 1):
+            self.picker.set_pose_blend(0.5 * step / pose_blend_steps)
+        self.picker.finish_pose_blend(0.5)
+
+    def close_picker(self):
+        """
+        Close the warm picker, it is only hidden, at the scale of the benchmark
+        """
+        self.picker.close()
+        self.picker.set_scale_factor(self.scale_factor)
+        self.app.processEvents()
+
+    def reopen_picker(self, scale=1.0):
+        """
+        Open the picker again, the warm instance is shown instead of being built
+        :param scale: float, relative to the scale of the benchmark
+        """
+        picker = self.picker_module.openWindow(self.scale_factor * scale)
+        if picker is not self.picker:
+            raise RuntimeError('The warm picker was built again')
+        self.app.processEvents()
+
+    def smart_key_all_controls(self):
+        try:
+            self.picker.key_all_controls()
+        finally:
+            self.picker.smart_key_action.setChecked(False)
+
+    def reset_rubber_band(self):
+        self.picker.picker_tab.setCurrentIndex(0)
+        self.picker.control_index_dirty = True
+
+    def rubber_band(self):
+        """
+        Press, drag the rubber band over the body tab and release, as the mouse events do
+        """
+        QtCore = self.QtCore
+        QtGui = self.QtGui
+        (start_x, start_y), (end_x, end_y) = [(x * self.scale_factor, y * self.scale_factor)
+                                              for x, y in rubber_band_sweep]
+
+        def mouse_event(event_type, x, y, buttons):
+            return QtGui.QMouseEvent(event_type, QtCore.QPointF(x, y), QtCore.Qt.LeftButton, buttons,
+                                     QtCore.Qt.NoModifier)
+
+        self.picker.mousePressEvent(mouse_event(QtCore.QEvent.MouseButtonPress, start_x, start_y,
+                                                QtCore.Qt.LeftButton))
+        for step in range(1, rubber_band_steps + 1):
+            x = start_x + (end_x - start_x) * step / rubber_band_steps
+            y = start_y + (end_y - start_y) * step / rubber_band_steps
+            self.picker.mouseMoveEvent(mouse_event(QtCore.QEvent.MouseMove, x, y, QtCore.Qt.LeftButton))
+        self.picker.mouseReleaseEvent(mouse_event(QtCore.QEvent.MouseButtonRelease, end_x, end_y,
+                                                  QtCore.Qt.NoButton))
+
+    def run_case(self, setup, run):
+        """
+        Time an action, the cmds calls of the setup are not counted
+        :return: dict
+        """
+        times = list()
+        calls = list()
+        undo_sizes = list()
+        for i in range(self.repeat):
+            if setup:
+                setup()
+            self.scene.reset_calls()
+            undo_memory_size = self.picker_undo.undo_memory_size
+            start_time = time.perf_counter()
+            run()
+            # The actions on large rigs run as chunked jobs
+            while self.picker.job_progress.is_running():
+                self.app.processEvents()
+            times.append(time.perf_counter() - start_time)
+            calls.append(dict(self.scene.calls))
+            undo_sizes.append(self.picker_undo.undo_memory_size - undo_memory_size)
+            self.app.processEvents()
+
+        result = get_times_summary(times)
+        result['first_commands'] = calls[0]
+        result['commands'] = calls[-1]
+        result['command_total'] = sum(calls[-1].values())
+        result['undo_bytes'] = undo_sizes[-1]
+        return result
+
+    def run(self, control_count):
+        """
+        Build the rig and the picker and time every action
+        :param control_count: int
+        :return: list, [dict, ...]
+        """
+        self.scene.build_rig(control_count, self.namespace, self.user_attr_count)
+        self.picker_registry.get_registry().invalidate()
+        self.picker_mirror.mirror_tables.clear()
+        self.picker_manifest.manifests.clear()
+
+        start_time = time.perf_counter()
+        self.picker = self.picker_module.openWindow(self.scale_factor)
+        self.picker.namespace_le.setText(self.namespace)
+        self.app.processEvents()
+        results = [{'case': 'startup', 'controls': len(self.scene.get_controls()),
+                    'times_ms': [(time.perf_counter() - start_time) * 1000.0],
+                    'startup_ms': dict((x, y * 1000.0) for x, y in self.picker.startup_timings.items())}]
+
+        for case_name, setup, run in self.get_cases():
+            result = {'case': case_name, 'controls': len(self.scene.get_controls())}
+            result.update(self.run_case(setup, run))
+            results.append(result)
+
+        self.picker_module.closeWindow()
+        self.app.processEvents()
+        self.picker = None
+        return results
+
+
+def get_metadata(args):
+    return {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'scale_factor': args.scale_factor,
+            'user_attributes': args.user_attributes,
+            'namespace': args.namespace}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the picker actions against a simulated rig')
+    parser.add_argument('--controls', type=int, nargs='+', default=default_sizes,
+                        help='rig sizes, number of _ctr nodes')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per action')
+    parser.add_argument('--scale-factor', type=float, default=1.0)
+    parser.add_argument('--user-attributes', type=int, default=3, help='numeric user attributes per control')
+    parser.add_argument('--namespace', default='')
+    parser.add_argument('--output', help='JSON file, stdout if not given')
+    args = parser.parse_args(argv)
+
+    benchmark = PickerBenchmark(args.repeat, args.scale_factor, args.user_attributes, args.namespace)
+    results = list()
+    for control_count in args.controls:
+        results.extend(benchmark.run(control_count))
+
+    data = {'meta': get_metadata(args), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as json_file:
+            json.dump(data, json_file, indent=2)
+    else:
+        json.dump(data, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
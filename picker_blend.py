@@ -0,0 +1,396 @@
+"""
+Blend the controls from their current pose toward the bind pose or a library pose while a slider is dragged.
+The start and target poses are read once when the drag starts into arrays of translation, quaternion, scale and
+user values. Every tick interpolates the arrays and sets the changed plugs with a single modifier, the drag is
+committed as one undo step when the slider is released
+"""
+import math
+import time
+from maya.api import OpenMaya
+from PySide2 import QtCore, QtWidgets
+
+import picker_library
+import picker_pose
+import picker_undo
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Axes of every rotateOrder value, in the order the rotations are applied
+rotate_order_axes = [(0, 1, 2), (1, 2, 0), (2, 0, 1), (0, 2, 1), (1, 0, 2), (2, 1, 0)]
+bind_pose_name = 'Bind pose'
+tolerance = 1e-9
+
+
+def multiply_quaternions(a, b):
+    """
+    :param a: array, (N, 4) w x y z
+    :param b: array, (N, 4) w x y z
+    :return: array, (N, 4) rotation b then a
+    """
+    aw, ax, ay, az = a.T
+    bw, bx, by, bz = b.T
+    return numpy.stack([aw * bw - ax * bx - ay * by - az * bz,
+                        aw * bx + ax * bw + ay * bz - az * by,
+                        aw * by - ax * bz + ay * bw + az * bx,
+                        aw * bz + ax * by - ay * bx + az * bw], axis=1)
+
+
+def euler_to_quaternion(rotations, rotate_orders):
+    """
+    :param rotations: array, (N, 3) x y z rotations in radians
+    :param rotate_orders: array, (N,) rotateOrder values
+    :return: array, (N, 4)
+    """
+    quaternions = numpy.empty((len(rotations), 4))
+    half_angles = rotations * 0.5
+    for rotate_order in numpy.unique(rotate_orders):
+        mask = rotate_orders == rotate_order
+        quaternion = None
+        for axis in rotate_order_axes[rotate_order]:
+            axis_quaternion = numpy.zeros((numpy.count_nonzero(mask), 4))
+            axis_quaternion[:, 0] = numpy.cos(half_angles[mask, axis])
+            axis_quaternion[:, axis + 1] = numpy.sin(half_angles[mask, axis])
+            quaternion = axis_quaternion if quaternion is None else multiply_quaternions(axis_quaternion, quaternion)
+        quaternions[mask] = quaternion
+    return quaternions
+
+
+def quaternion_to_euler(quaternions, rotate_orders, reference):
+    """
+    Get the euler rotations of the quaternions, of the two solutions of every rotation the closest to the
+    reference rotations is returned
+    :param quaternions: array, (N, 4)
+    :param rotate_orders: array, (N,)
+    :param reference: array, (N, 3) x y z rotations in radians
+    :return: array, (N, 3)
+    """
+    w, x, y, z = quaternions.T
+    matrices = numpy.empty((len(quaternions), 3, 3))
+    matrices[:, 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+    matrices[:, 0, 1] = 2.0 * (x * y - w * z)
+    matrices[:, 0, 2] = 2.0 * (x * z + w * y)
+    matrices[:, 1, 0] = 2.0 * (x * y + w * z)
+    matrices[:, 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+    matrices[:, 1, 2] = 2.0 * (y * z - w * x)
+    matrices[:, 2, 0] = 2.0 * (x * z - w * y)
+    matrices[:, 2, 1] = 2.0 * (y * z + w * x)
+    matrices[:, 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+
+    rotations = numpy.empty((len(quaternions), 3))
+    for rotate_order in numpy.unique(rotate_orders):
+        mask = rotate_orders == rotate_order
+        i, j, k = rotate_order_axes[rotate_order]
+        sign = 1.0 if (j - i) % 3 == 1 else -1.0
+        m = matrices[mask]
+        first = numpy.arctan2(sign * m[:, k, j], m[:, k, k])
+        second = numpy.arcsin(numpy.clip(-sign * m[:, k, i], -1.0, 1.0))
+        third = numpy.arctan2(sign * m[:, j, i], m[:, i, i])
+
+        solutions = numpy.empty((2, len(first), 3))
+        solutions[0][:, [i, j, k]] = numpy.stack([first, second, third], axis=1)
+        solutions[1][:, [i, j, k]] = numpy.stack([first + math.pi, math.pi - second, third + math.pi], axis=1)
+        # Unwind every angle to the turn of the reference, then keep the closest solution
+        solutions += 2.0 * math.pi * numpy.round((reference[mask] - solutions) / (2.0 * math.pi))
+        distances = numpy.abs(solutions - reference[mask]).sum(axis=2)
+        rotations[mask] = numpy.where((distances[1] < distances[0])[:, None], solutions[1], solutions[0])
+    return rotations
+
+
+def slerp(start, target, weight):
+    """
+    :param start: array, (N, 4)
+    :param target: array, (N, 4)
+    :param weight: float
+    :return: array, (N, 4)
+    """
+    dot = (start * target).sum(axis=1)
+    target = numpy.where((dot < 0.0)[:, None], -target, target)
+    dot = numpy.abs(dot)
+
+    angles = numpy.arccos(numpy.clip(dot, -1.0, 1.0))
+    sin_angles = numpy.sin(angles)
+    # Close rotations are linearly interpolated
+    close = sin_angles < 1e-6
+    safe_sin = numpy.where(close, 1.0, sin_angles)
+    start_factors = numpy.where(close, 1.0 - weight, numpy.sin((1.0 - weight) * angles) / safe_sin)
+    target_factors = numpy.where(close, weight, numpy.sin(weight * angles) / safe_sin)
+    result = start * start_factors[:, None] + target * target_factors[:, None]
+    return result / numpy.linalg.norm(result, axis=1)[:, None]
+
+
+class PoseBlend(object):
+    """
+    Start and target values of the controls of a blend
+    """
+    def __init__(self, namespace, control_list, pose=None):
+        """
+        :param namespace: str
+        :param control_list: list
+        :param pose: picker_library.Pose, the bind pose if None
+        """
+        if numpy is None:
+            raise RuntimeError('The pose blend needs numpy')
+        self.namespace = namespace
+        self.control_list = control_list
+        self.pose = pose
+        self.weight = 0.0
+        self.skipped_count = 0
+
+        self.rotate_orders = None
+        self.start_transforms = None
+        self.target_transforms = None
+        self.start_quaternions = None
+        self.target_quaternions = None
+        self.transform_indices = None
+        self.start_values = None
+        self.target_values = None
+        self.rounded = None
+        self.plugs = list()
+        self.kinds = list()
+
+    def get_pose_targets(self):
+        """
+        :return: tuple, ({control name: 9 transform values}, {'control.attribute': value})
+        """
+        transforms = dict((x, self.pose.transforms[i * 9:i * 9 + 9]) for i, x in enumerate(self.pose.control_names))
+        return transforms, dict(zip(self.pose.channel_names, self.pose.channel_values))
+
+    def begin(self):
+        """
+        Read the start and target values of the controls, only the plugs free to change whose value changes are
+        kept
+        """
+        pose_transforms, pose_channels = self.get_pose_targets() if self.pose is not None else (dict(), dict())
+
+        selection = OpenMaya.MSelectionList()
+        for ctr in self.control_list:
+            selection.add(ctr)
+
+        transform_plugs = list()
+        start_transforms = list()
+        target_transforms = list()
+        rotate_orders = list()
+        joint_orients = list()
+        user_plugs = list()
+        user_start_values = list()
+        user_target_values = list()
+        for i, ctr in enumerate(self.control_list):
+            node = selection.getDependNode(i)
+            fn_node = OpenMaya.MFnDependencyNode(node)
+            control_name = ctr[len(self.namespace):]
+
+            plugs = [fn_node.findPlug(x, False) for x in picker_library.pose_transform_attrs]
+            start_values = [x.asDouble() for x in plugs]
+            joint_orient = None
+            if self.pose is not None:
+                target_values = list(pose_transforms.get(control_name, start_values))
+            else:
+                skin_pose_data, is_joint = picker_pose.get_bind_data(node, fn_node, ctr)[1:3]
+                if skin_pose_data and is_joint:
+                    # The rotation of the skin pose matrix includes the joint orient
+                    joint_orient = [fn_node.findPlug(x, False).asDouble() for x in picker_pose.joint_orient_attrs]
+                target_values = [x[1] for x in picker_pose.get_transform_targets(fn_node, skin_pose_data)[:9]]
+
+            transform_plugs.extend(plugs)
+            start_transforms.append(start_values)
+            target_transforms.append(target_values)
+            rotate_orders.append(fn_node.findPlug('rotateOrder', False).asInt())
+            joint_orients.append(joint_orient)
+
+            for attr_obj, kind, default in picker_pose.get_user_channels(fn_node, ctr):
+                plug = fn_node.findPlug(attr_obj, False)
+                start_value = plug.asDouble()
+                if self.pose is not None:
+                    channel_name = '{}.{}'.format(control_name, OpenMaya.MFnAttribute(attr_obj).name)
+                    target_value = pose_channels.get(channel_name, start_value)
+                else:
+                    target_value = default
+                if abs(target_value - start_value) <= tolerance:
+                    continue
+                if plug.isFreeToChange() != OpenMaya.MPlug.kFreeToChange:
+                    self.skipped_count += 1
+                    continue
+                user_plugs.append((plug, kind))
+                user_start_values.append(start_value)
+                user_target_values.append(target_value)
+
+        self.rotate_orders = numpy.array(rotate_orders, dtype=numpy.int64)
+        self.start_transforms = numpy.array(start_transforms, dtype=numpy.float64).reshape(-1, 9)
+        self.target_transforms = numpy.array(target_transforms, dtype=numpy.float64).reshape(-1, 9)
+        self.start_quaternions = euler_to_quaternion(self.start_transforms[:, 3:6], self.rotate_orders)
+        self.target_quaternions = euler_to_quaternion(self.target_transforms[:, 3:6], self.rotate_orders)
+
+        joint_rows = [i for i, x in enumerate(joint_orients) if x is not None]
+        if joint_rows:
+            orient_quaternions = euler_to_quaternion(numpy.array([joint_orients[x] for x in joint_rows]),
+                                                     numpy.zeros(len(joint_rows), dtype=numpy.int64))
+            orient_quaternions[:, 1:] *= -1.0
+            self.target_quaternions[joint_rows] = multiply_quaternions(orient_quaternions,
+                                                                       self.target_quaternions[joint_rows])
+            self.target_transforms[joint_rows, 3:6] = quaternion_to_euler(
+                self.target_quaternions[joint_rows], self.rotate_orders[joint_rows],
+                self.start_transforms[joint_rows, 3:6])
+
+        # Keep the changed channels, all the rotation channels of a control change together
+        changed = numpy.abs(self.target_transforms - self.start_transforms) > tolerance
+        changed[:, 3:6] = changed[:, 3:6].any(axis=1)[:, None]
+        transform_indices = list()
+        for index in numpy.flatnonzero(changed):
+            plug = transform_plugs[index]
+            if plug.isFreeToChange() != OpenMaya.MPlug.kFreeToChange:
+                self.skipped_count += 1
+                continue
+            transform_indices.append(index)
+            self.plugs.append(plug)
+            self.kinds.append('double')
+
+        self.transform_indices = numpy.array(transform_indices, dtype=numpy.int64)
+        self.plugs.extend(x[0] for x in user_plugs)
+        self.kinds.extend(x[1] for x in user_plugs)
+        self.start_values = numpy.array(user_start_values, dtype=numpy.float64)
+        self.target_values = numpy.array(user_target_values, dtype=numpy.float64)
+        self.rounded = numpy.array([x[1] != 'double' for x in user_plugs], dtype=bool)
+
+    def compute(self, weight):
+        """
+        Interpolate the plug values
+        :param weight: float, 0 is the start pose and 1 the target pose
+        :return: list, value of every plug
+        """
+        if weight <= 0.0:
+            transforms = self.start_transforms
+            values = self.start_values
+        elif weight >= 1.0:
+            transforms = self.target_transforms
+            values = self.target_values
+        else:
+            transforms = self.start_transforms + (self.target_transforms - self.start_transforms) * weight
+            quaternions = slerp(self.start_quaternions, self.target_quaternions, weight)
+            transforms[:, 3:6] = quaternion_to_euler(quaternions, self.rotate_orders, transforms[:, 3:6])
+            values = self.start_values + (self.target_values - self.start_values) * weight
+            values = numpy.where(self.rounded, numpy.round(values), values)
+        return numpy.concatenate([transforms.ravel()[self.transform_indices], values]).tolist()
+
+    def set_weight(self, weight):
+        """
+        Set the blended values, the change is not registered for undo
+        :param weight: float
+        """
+        if not self.plugs or weight == self.weight:
+            return
+        self.weight = weight
+        picker_undo.count_commands()
+        picker_pose.build_modifier(self.plugs, self.kinds, self.compute(weight)).doIt()
+
+    def finish(self, weight, name='Pose blend'):
+        """
+        Set the blended values as a single undoable edit, it must run inside the undo chunk of the caller
+        :param weight: float
+        :param name: str, name of the report
+        :return: EditReport
+        """
+        start_time = time.time()
+        # Go back to the start pose so the undo restores it
+        self.cancel()
+        set_count = 0
+        if self.plugs and weight > 0.0:
+            picker_undo.commit(picker_pose.PlugValueEdit(self.plugs, self.kinds, self.compute(weight)))
+            set_count = len(self.plugs)
+        return picker_pose.EditReport(name, set_count, self.skipped_count, time.time() - start_time)
+
+    def cancel(self):
+        """
+        Set the start values back
+        """
+        if self.plugs and self.weight != 0.0:
+            picker_undo.count_commands()
+            picker_pose.build_modifier(self.plugs, self.kinds, self.compute(0.0)).doIt()
+        self.weight = 0.0
+
+
+class PoseBlendPanel(QtWidgets.QDialog):
+    """
+    Target pose and blend slider, the slider moves are applied at most once per display refresh
+    """
+    def __init__(self, picker, parent=None):
+        super(PoseBlendPanel, self).__init__(parent)
+        self.setWindowTitle('Picker pose blend')
+        self.picker = picker
+        self.pending_weight = None
+
+        self.target_cb = QtWidgets.QComboBox()
+        self.selected_only_cb = QtWidgets.QCheckBox('Selected controls only')
+        self.selected_only_cb.setChecked(True)
+        self.selected_only_cb.setToolTip('All the controls are blended when none is selected')
+        self.weight_sl = QtWidgets.QSlider(QtCore.Qt.Horizontal)
+        self.weight_sl.setRange(0, 100)
+        self.weight_lb = QtWidgets.QLabel('0%')
+        self.weight_lb.setMinimumWidth(36)
+
+        screen = QtWidgets.QApplication.primaryScreen()
+        refresh_rate = screen.refreshRate() if screen is not None else 60.0
+        self.tick_timer = QtCore.QTimer(self)
+        self.tick_timer.setInterval(max(1, int(1000.0 / (refresh_rate or 60.0))))
+        self.tick_timer.timeout.connect(self.tick)
+
+        self.weight_sl.sliderPressed.connect(self.begin)
+        self.weight_sl.valueChanged.connect(self.set_pending_weight)
+        self.weight_sl.sliderReleased.connect(self.finish)
+
+        slider_layout = QtWidgets.QHBoxLayout()
+        slider_layout.addWidget(self.weight_sl)
+        slider_layout.addWidget(self.weight_lb)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.target_cb)
+        layout.addWidget(self.selected_only_cb)
+        layout.addLayout(slider_layout)
+        self.resize(280, 100)
+
+    def refresh(self):
+        current_name = self.target_cb.currentText()
+        self.target_cb.clear()
+        self.target_cb.addItems([bind_pose_name] + picker_library.get_library().get_pose_names())
+        index = self.target_cb.findText(current_name)
+        if index >= 0:
+            self.target_cb.setCurrentIndex(index)
+
+    def get_weight(self):
+        return self.weight_sl.value() / 100.0
+
+    def begin(self):
+        target_name = self.target_cb.currentText()
+        self.picker.begin_pose_blend(None if target_name == bind_pose_name else target_name,
+                                     self.selected_only_cb.isChecked())
+        self.pending_weight = self.get_weight()
+        self.tick_timer.start()
+
+    def set_pending_weight(self, value):
+        self.weight_lb.setText('{}%'.format(value))
+        self.pending_weight = value / 100.0
+        if not self.weight_sl.isSliderDown():
+            # Clicks on the slider groove and key presses are applied at once
+            self.begin()
+            self.finish()
+
+    def tick(self):
+        if self.pending_weight is not None:
+            self.picker.set_pose_blend(self.pending_weight)
+            self.pending_weight = None
+
+    def finish(self):
+        self.tick_timer.stop()
+        self.picker.finish_pose_blend(self.get_weight())
+        self.pending_weight = None
+        # The blended pose is the start pose of the next drag
+        self.weight_sl.blockSignals(True)
+        self.weight_sl.setValue(0)
+        self.weight_sl.blockSignals(False)
+        self.weight_lb.setText('0%')
+
+    def showEvent(self, event):
+        self.refresh()
+        super(PoseBlendPanel, self).showEvent(event)
@@ -0,0 +1,50 @@
+"""
+Folder of the picker caches and file hashes, without Qt so the UI-free operations can use them
+"""
+import os
+import stat
+import hashlib
+from maya import cmds
+
+
+file_hashes = dict()
+
+
+def get_cache_folder():
+    """
+    Get the folder of the picker caches in the Maya folder of the user, PICKER_CACHE_DIR overrides it.
+    It is created readable by the user only
+    :return: str
+    """
+    cache_folder = os.environ.get('PICKER_CACHE_DIR') or os.path.join(cmds.internalVar(userAppDir=True),
+                                                                     'picker_cache')
+    if not os.path.isdir(cache_folder):
+        os.makedirs(cache_folder, mode=0o700, exist_ok=True)
+    return cache_folder
+
+
+def is_private_folder(folder):
+    """
+    :param folder: str
+    :return: bool, True if the folder belongs to the user and the other users can not write in it
+    """
+    if not hasattr(os, 'getuid'):
+        return True
+    folder_stat = os.stat(folder)
+    return folder_stat.st_uid == os.getuid() and not folder_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def get_file_hash(file_path):
+    """
+    Get the hash of the file content, only read again when the mtime or the size change
+    :param file_path: str
+    :return: str
+    """
+    file_stat = os.stat(file_path)
+    file_key = (file_path, file_stat.st_mtime, file_stat.st_size)
+    file_hash = file_hashes.get(file_key)
+    if file_hash is None:
+        with open(file_path, 'rb') as f:
+            file_hash = hashlib.sha1(f.read()).hexdigest()[:16]
+        file_hashes[file_key] = file_hash
+    return file_hash
@@ -0,0 +1,381 @@
+"""
+Alternative rendering mode: one custom painted canvas per tab that draws the controls of picker.ui
+"""
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+from PySide2 import QtCore, QtWidgets, QtGui
+
+import picker_cache
+from picker_index import ControlIndex
+
+
+tab_names = ('body_tab', 'face_tab')
+highlight_color = QtGui.QColor('white')
+default_color = QtGui.QColor('gray')
+parsed_layouts = dict()
+
+
+class CanvasItem(object):
+    def __init__(self, name, kind, rect, color=None, text_color=None, text=''):
+        """
+        :param name: str, object name of the widget in picker.ui
+        :param kind: str, 'control', 'action', 'group' or 'image'
+        :param rect: QRect, in design coordinates of the tab
+        :param color: QColor
+        :param text_color: QColor
+        :param text: str, text, group title or image path
+        """
+        self.name = name
+        self.kind = kind
+        self.rect = rect
+        self.color = color
+        self.text_color = text_color
+        self.text = text
+
+
+def get_property(widget_element, property_name):
+    return widget_element.find("property[@name='{}']".format(property_name))
+
+
+def get_geometry(widget_element):
+    geometry = get_property(widget_element, 'geometry')
+    if geometry is None:
+        return None
+    rect = geometry.find('rect')
+    return QtCore.QRect(*[int(rect.find(x).text) for x in ('x', 'y', 'width', 'height')])
+
+
+def get_style_color(style_sheet, style_property):
+    """
+    Get a color from a style sheet
+    :param style_sheet: str
+    :param style_property: str, e.g. 'background-color'
+    :return: QColor or None
+    """
+    match = re.search(r'(?:^|[;\s]){}\s*:\s*([^;]+)'.format(style_property), style_sheet or '')
+    if match:
+        color = QtGui.QColor(match.group(1).strip().lower())
+        if color.isValid():
+            return color
+    return None
+
+
+def parse_widget(widget_element, offset, ui_folder, items):
+    """
+    Collect the canvas items of a widget and its children
+    :param widget_element: Element
+    :param offset: QPoint, position of the parent in tab coordinates
+    :param ui_folder: str, the image paths are relative to it
+    :param items: list, the items are appended to it
+    """
+    rect = get_geometry(widget_element)
+    if rect is None:
+        return
+    rect.translate(offset)
+
+    widget_class = widget_element.get('class')
+    name = widget_element.get('name')
+
+    text_element = get_property(widget_element, 'text')
+    text = text_element.findtext('string') or '' if text_element is not None else ''
+
+    if widget_class == 'QPushButton':
+        style_element = get_property(widget_element, 'styleSheet')
+        style_sheet = style_element.findtext('string') if style_element is not None else ''
+        kind = 'control' if name.endswith('_ctr') else 'action'
+        items.append(CanvasItem(name, kind, rect, get_style_color(style_sheet, 'background-color') or default_color,
+                                get_style_color(style_sheet, 'color') or QtGui.QColor('black'), text))
+    elif widget_class == 'QLabel':
+        pixmap_element = get_property(widget_element, 'pixmap')
+        if pixmap_element is not None:
+            image_path = os.path.join(ui_folder, pixmap_element.findtext('pixmap'))
+            items.append(CanvasItem(name, 'image', rect, text=image_path))
+    elif widget_class == 'QGroupBox':
+        title_element = get_property(widget_element, 'title')
+        title = title_element.findtext('string') or '' if title_element is not None else ''
+        items.append(CanvasItem(name, 'group', rect, text=title))
+
+    for child_element in widget_element.findall('widget'):
+        parse_widget(child_element, rect.topLeft(), ui_folder, items)
+
+
+def parse_layout(ui_path):
+    """
+    Get the canvas items of every tab from picker.ui, cached by the hash of the file
+    :param ui_path: str
+    :return: dict, {tab name: [CanvasItem, ...]}
+    """
+    ui_hash = picker_cache.get_file_hash(ui_path)
+    layout = parsed_layouts.get(ui_hash)
+    if layout is not None:
+        return layout
+
+    root = ElementTree.parse(ui_path).getroot()
+    ui_folder = os.path.dirname(ui_path)
+    layout = dict()
+    for tab_name in tab_names:
+        tab_element = root.find(".//widget[@name='{}']".format(tab_name))
+        items = list()
+        for child_element in tab_element.findall('widget'):
+            parse_widget(child_element, QtCore.QPoint(0, 0), ui_folder, items)
+        layout[tab_name] = items
+
+    parsed_layouts[ui_hash] = layout
+    return layout
+
+
+def get_shell_ui_path(ui_path):
+    """
+    Write a copy of picker.ui without the tab contents, the canvas draws them
+    :param ui_path: str
+    :return: str
+    """
+    shell_path = os.path.join(picker_cache.get_cache_folder(),
+                              'picker_shell_{}.ui'.format(picker_cache.get_file_hash(ui_path)))
+    if os.path.isfile(shell_path):
+        return shell_path
+
+    tree = ElementTree.parse(ui_path)
+    for tab_name in tab_names:
+        tab_element = tree.getroot().find(".//widget[@name='{}']".format(tab_name))
+        for child_element in tab_element.findall('widget'):
+            tab_element.remove(child_element)
+
+    tmp_path = '{}.{}.tmp'.format(shell_path, os.getpid())
+    tree.write(tmp_path, encoding='UTF-8', xml_declaration=True)
+    os.replace(tmp_path, shell_path)
+    return shell_path
+
+
+class PickerCanvas(QtWidgets.QWidget):
+    """
+    Draw the items of a tab with live zoom and pan, the controls are hit tested with a grid index
+    """
+    control_clicked = QtCore.Signal(str)
+    controls_selected = QtCore.Signal(list)
+    action_clicked = QtCore.Signal(str)
+
+    def __init__(self, items, zoom=1.0, parent=None):
+        super(PickerCanvas, self).__init__(parent)
+        self.setFocusPolicy(QtCore.Qt.ClickFocus)
+        self.setMouseTracking(False)
+
+        self.items = items
+        self.controls = dict()
+        self.actions = dict()
+        self.control_index = ControlIndex()
+        for item in items:
+            if item.kind == 'control':
+                self.controls[item.name] = item
+                self.control_index.add(item.name, item.rect)
+            elif item.kind == 'action':
+                self.actions[item.name] = item
+        self.background = None
+        self.background_item = ([x for x in items if x.kind == 'image'] or [None])[0]
+
+        self.default_zoom = zoom
+        self.zoom = zoom
+        self.pan = QtCore.QPointF(0, 0)
+        self.highlighted_controls = set()
+        self.selected_controls = set()
+
+        self.rubber_band = QtWidgets.QRubberBand(QtWidgets.QRubberBand.Rectangle, self)
+        self.origin = None
+        self.pan_origin = None
+        self.source_geo = None
+        self.alt_point = None
+        self.delta = None
+        self.dragging = False
+
+    # VIEW
+    def get_transform(self):
+        return QtGui.QTransform(self.zoom, 0, 0, self.zoom, self.pan.x(), self.pan.y())
+
+    def to_design(self, rect):
+        """
+        Map a rect from widget to design coordinates
+        :param rect: QRect
+        :return: QRect
+        """
+        return self.get_transform().inverted()[0].mapRect(QtCore.QRectF(rect)).toAlignedRect()
+
+    def to_view(self, rect):
+        return self.get_transform().mapRect(QtCore.QRectF(rect)).toAlignedRect()
+
+    def reset_view(self):
+        self.zoom = self.default_zoom
+        self.pan = QtCore.QPointF(0, 0)
+        self.update()
+
+    def get_background_size(self):
+        """
+        Size the background has to be decoded at for the current zoom
+        :return: QSize
+        """
+        return self.background_item.rect.size() * self.zoom if self.background_item else QtCore.QSize()
+
+    def setPixmap(self, pixmap):
+        self.background = pixmap
+        self.update()
+
+    # HIT TESTING
+    def get_item_at(self, pos):
+        """
+        Get the control or action under the position given
+        :param pos: QPoint, in widget coordinates
+        :return: CanvasItem or None
+        """
+        design_pos = self.get_transform().inverted()[0].map(QtCore.QPointF(pos)).toPoint()
+        for name in self.control_index.query(QtCore.QRect(design_pos, QtCore.QSize(1, 1))):
+            return self.controls[name]
+        for item in self.actions.values():
+            if item.rect.contains(design_pos):
+                return item
+        return None
+
+    def set_highlighted_controls(self, names):
+        """
+        Repaint only the controls whose highlight state changed
+        :param names: set
+        """
+        changed = names ^ self.highlighted_controls
+        self.highlighted_controls = names
+        self.update_controls(changed)
+
+    def set_selected_controls(self, names):
+        """
+        Repaint only the controls whose selection state changed
+        :param names: set
+        """
+        changed = names ^ self.selected_controls
+        self.selected_controls = names
+        self.update_controls(changed)
+
+    def update_controls(self, changed):
+        """
+        Repaint the area of the controls given
+        :param changed: set
+        """
+        if changed:
+            dirty_rect = QtCore.QRect()
+            for name in changed:
+                dirty_rect = dirty_rect.united(self.controls[name].rect)
+            self.update(self.to_view(dirty_rect).adjusted(-1, -1, 1, 1))
+
+    # EVENTS
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.setTransform(self.get_transform())
+        design_rect = self.to_design(event.rect())
+
+        if self.background_item and self.background is not None:
+            painter.drawPixmap(self.background_item.rect, self.background)
+
+        painter.setPen(QtGui.QPen(QtGui.QColor('gray')))
+        for item in self.items:
+            if not design_rect.intersects(item.rect):
+                continue
+            if item.kind == 'group':
+                painter.setBrush(QtCore.Qt.NoBrush)
+                painter.setPen(QtGui.QColor('gray'))
+                painter.drawRect(item.rect.adjusted(0, 7, -1, -1))
+                painter.drawText(item.rect.adjusted(0, 0, 0, -item.rect.height() + 14),
+                                 QtCore.Qt.AlignHCenter | QtCore.Qt.AlignTop, item.text)
+            elif item.kind in ('control', 'action'):
+                highlighted = item.name in self.highlighted_controls
+                painter.setPen(QtCore.Qt.black)
+                painter.setBrush(highlight_color if highlighted else item.color)
+                painter.drawRect(item.rect.adjusted(0, 0, -1, -1))
+                if item.name in self.selected_controls and not highlighted:
+                    painter.setBrush(QtCore.Qt.NoBrush)
+                    painter.setPen(QtGui.QPen(highlight_color, 2))
+                    painter.drawRect(item.rect.adjusted(1, 1, -2, -2))
+                if item.text:
+                    painter.setPen(QtCore.Qt.black if highlighted else item.text_color)
+                    painter.drawText(item.rect, QtCore.Qt.AlignCenter, item.text)
+
+    def event(self, event):
+        if event.type() == QtCore.QEvent.ToolTip:
+            item = self.get_item_at(event.pos())
+            if item and item.kind == 'control':
+                QtWidgets.QToolTip.showText(event.globalPos(), item.name, self)
+            else:
+                QtWidgets.QToolTip.hideText()
+            return True
+        return super(PickerCanvas, self).event(event)
+
+    def wheelEvent(self, event):
+        factor = 1.15 if event.angleDelta().y() > 0 else 1 / 1.15
+        pos = QtCore.QPointF(event.pos())
+        # Keep the point under the cursor in place
+        self.pan = pos - (pos - self.pan) * factor
+        self.zoom *= factor
+        self.update()
+
+    def keyPressEvent(self, event):
+        if event.key() == QtCore.Qt.Key_F:
+            self.reset_view()
+        else:
+            super(PickerCanvas, self).keyPressEvent(event)
+
+    def keyReleaseEvent(self, event):
+        if event.key() == QtCore.Qt.Key_Alt:
+            if self.delta is not None:
+                self.origin += self.delta
+                self.source_geo = None
+                self.alt_point = None
+                self.delta = None
+
+    def mousePressEvent(self, event):
+        if event.button() == QtCore.Qt.MiddleButton:
+            self.pan_origin = event.pos() - self.pan
+        elif event.button() == QtCore.Qt.LeftButton:
+            self.origin = event.pos()
+            self.dragging = False
+            self.rubber_band.setGeometry(QtCore.QRect(self.origin, QtCore.QSize()))
+            self.rubber_band.show()
+
+    def mouseMoveEvent(self, event):
+        if self.pan_origin is not None:
+            self.pan = QtCore.QPointF(event.pos() - self.pan_origin)
+            self.update()
+            return
+        if self.origin is None:
+            return
+        if not self.dragging and (event.pos() - self.origin).manhattanLength() < QtWidgets.QApplication.startDragDistance():
+            return
+        self.dragging = True
+
+        if event.modifiers() == QtCore.Qt.AltModifier:
+            if self.alt_point is None:
+                self.source_geo = self.rubber_band.geometry()
+                self.alt_point = event.pos()
+            self.delta = event.pos() - self.alt_point
+            new_geo = QtCore.QRect(self.source_geo)
+            new_geo.moveTopLeft(self.source_geo.topLeft() + self.delta)
+            self.rubber_band.setGeometry(new_geo)
+        else:
+            self.rubber_band.setGeometry(QtCore.QRect(self.origin, event.pos()).normalized())
+
+        self.set_highlighted_controls(self.control_index.query(self.to_design(self.rubber_band.geometry())))
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == QtCore.Qt.MiddleButton:
+            self.pan_origin = None
+        elif event.button() == QtCore.Qt.LeftButton and self.origin is not None:
+            self.rubber_band.hide()
+            self.origin = None
+            self.set_highlighted_controls(set())
+
+            if not self.dragging:
+                item = self.get_item_at(event.pos())
+                if item and item.kind == 'control':
+                    self.control_clicked.emit(item.name)
+                    return
+                if item and item.kind == 'action':
+                    self.action_clicked.emit(item.name)
+                    return
+
+            selected = self.control_index.query(self.to_design(self.rubber_band.geometry()))
+            self.controls_selected.emit([x.name for x in self.items if x.name in selected])
@@ -0,0 +1,1235 @@
+"""
+In-memory stand-in for maya.cmds, maya.OpenMayaUI and the parts of maya.api used by the picker,
+so the picker can be timed outside of Maya. The scene is a simulated rig with the picker controls,
+the limb snap nodes and filler controls up to the size requested. Every cmds call is counted
+"""
+import os
+import sys
+import math
+import types
+import collections
+import fnmatch
+import importlib.util
+from xml.etree import ElementTree
+
+
+group_names = {'all': 'modules_c_grp', 'body': 'bodyModules_c_grp', 'face': 'faceModules_c_grp'}
+attr_aliases = {'tx': 'translateX', 'ty': 'translateY', 'tz': 'translateZ',
+                'rx': 'rotateX', 'ry': 'rotateY', 'rz': 'rotateZ',
+                'sx': 'scaleX', 'sy': 'scaleY', 'sz': 'scaleZ',
+                'ro': 'rotateOrder', 'v': 'visibility'}
+unit_kinds = ('distance', 'angle')
+joint_orient_attrs = ('jointOrientX', 'jointOrientY', 'jointOrientZ')
+matrix_attrs = ('matrix', 'worldMatrix', 'worldInverseMatrix', 'parentMatrix', 'parentInverseMatrix')
+compound_attrs = ('translate', 'rotate', 'scale')
+identity_matrix = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+
+
+class Attribute(object):
+    def __init__(self, name, kind, value, default=None, user=False, locked=False, keyable=True):
+        """
+        :param name: str
+        :param kind: str, 'bool', 'int', 'enum', 'double', 'distance', 'angle' or 'string'
+        :param value: bool, int, float or str
+        :param default: default value, the value given if None
+        :param user: bool, user defined attribute
+        :param locked: bool
+        :param keyable: bool
+        """
+        self.name = name
+        self.kind = kind
+        self.static_value = value
+        self.default = value if default is None else default
+        self.user = user
+        self.locked = locked
+        self.keyable = keyable and kind != 'string'
+        # {time: value} of the anim curve, interpolated linearly between the keys
+        self.curve = None
+
+    @property
+    def value(self):
+        if not self.curve:
+            return self.static_value
+        return get_curve_value(self.curve, scene.get_time())
+
+    @value.setter
+    def value(self, value):
+        self.static_value = value
+
+
+def get_curve_value(curve, time):
+    """
+    :param curve: dict, {time: value}
+    :param time: float
+    :return: float
+    """
+    times = sorted(curve)
+    if time <= times[0]:
+        return curve[times[0]]
+    if time >= times[-1]:
+        return curve[times[-1]]
+    for start, end in zip(times, times[1:]):
+        if start <= time <= end:
+            weight = (time - start) / (end - start)
+            return curve[start] + (curve[end] - curve[start]) * weight
+
+
+class CompoundAttribute(object):
+    """
+    Translate, rotate or scale compound of the three channels of a node
+    """
+    kind = 'double3'
+    user = False
+    locked = False
+    keyable = False
+    curve = None
+
+    def __init__(self, node, name):
+        self.node = node
+        self.name = name
+
+    @property
+    def value(self):
+        return self.node.get_channel_values(['{}{}'.format(self.name, x) for x in 'XYZ'])
+
+
+class MatrixAttribute(object):
+    """
+    Matrix output of a node computed from the transform channels of the node and its parents
+    """
+    kind = 'matrix'
+    user = False
+    locked = False
+    keyable = False
+    curve = None
+
+    def __init__(self, node, name):
+        self.node = node
+        self.name = name
+
+    @property
+    def value(self):
+        if self.name == 'matrix':
+            return self.node.get_local_matrix()
+        if self.name == 'worldMatrix':
+            return self.node.get_world_matrix()
+        if self.name == 'worldInverseMatrix':
+            return self.node.get_world_matrix().inverse()
+        parent_matrix = self.node.parent.get_world_matrix() if self.node.parent is not None else MMatrix()
+        return parent_matrix.inverse() if self.name == 'parentInverseMatrix' else parent_matrix
+
+
+class Node(object):
+    def __init__(self, name, node_type='transform', parent=None):
+        self.name = name
+        self.node_type = node_type
+        self.parent = parent
+        self.children = list()
+        # Path of the file the node is referenced from, None for the nodes of the scene
+        self.reference_file = None
+        self.attributes = collections.OrderedDict()
+        self.matrix_attributes = dict()
+        self.matrix = list(identity_matrix)
+        self.keys = collections.defaultdict(set)
+        for attr in ('translateX', 'translateY', 'translateZ'):
+            self.add_attribute(Attribute(attr, 'distance', 0.0))
+        for attr in ('rotateX', 'rotateY', 'rotateZ'):
+            self.add_attribute(Attribute(attr, 'angle', 0.0))
+        for attr in ('scaleX', 'scaleY', 'scaleZ'):
+            self.add_attribute(Attribute(attr, 'double', 1.0))
+        for attr in ('shearXY', 'shearXZ', 'shearYZ'):
+            self.add_attribute(Attribute(attr, 'double', 0.0, keyable=False))
+        self.add_attribute(Attribute('rotateOrder', 'enum', 0, keyable=False))
+        self.add_attribute(Attribute('visibility', 'bool', True))
+        if node_type == 'joint':
+            for attr in joint_orient_attrs:
+                self.add_attribute(Attribute(attr, 'angle', 0.0, keyable=False))
+
+    def add_attribute(self, attribute):
+        self.attributes[attribute.name] = attribute
+
+    def get_attribute(self, attr_name):
+        if attr_name in matrix_attrs:
+            if attr_name not in self.matrix_attributes:
+                self.matrix_attributes[attr_name] = MatrixAttribute(self, attr_name)
+            return self.matrix_attributes[attr_name]
+        if attr_name in compound_attrs:
+            return CompoundAttribute(self, attr_name)
+        return self.attributes.get(attr_aliases.get(attr_name, attr_name))
+
+    def get_channel_values(self, attr_names):
+        return [self.attributes[x].value if x in self.attributes else 0.0 for x in attr_names]
+
+    def get_local_matrix(self):
+        """
+        Compose scale, rotation, joint orient and translation, the rotations are in the xyz order
+        :return: MMatrix
+        """
+        rotation = MEulerRotation(*self.get_channel_values(('rotateX', 'rotateY', 'rotateZ'))).asQuaternion()
+        if self.node_type == 'joint':
+            rotation = rotation * MEulerRotation(*self.get_channel_values(joint_orient_attrs)).asQuaternion()
+        scale = self.get_channel_values(('scaleX', 'scaleY', 'scaleZ'))
+        rows = [[x * y for x in row] for row, y in zip(rotation.matrix, scale)]
+        translation = self.get_channel_values(('translateX', 'translateY', 'translateZ'))
+        return MMatrix([x for row in rows for x in row + [0.0]] + translation + [1.0])
+
+    def get_world_matrix(self):
+        local_matrix = self.get_local_matrix()
+        return local_matrix * self.parent.get_world_matrix() if self.parent is not None else local_matrix
+
+
+class Scene(object):
+    """
+    Nodes of the simulated rig and the command counters
+    """
+    def __init__(self):
+        self.nodes = dict()
+        self.selection = list()
+        self.calls = collections.Counter()
+        self.current_time = 1.0
+        self.min_time = 1.0
+        self.max_time = 120.0
+        self.modifiers = 0
+        self.plugins = set()
+        self.callback_count = 0
+        self.refresh_suspended = False
+        self.evaluation_mode = 'parallel'
+        # Time of the MDGContext made current, the current time is evaluated if None
+        self.context_time = None
+        # Texts of the viewport messages
+        self.messages = list()
+
+    def clear(self):
+        self.nodes = dict()
+        self.selection = list()
+
+    def get_time(self):
+        return self.current_time if self.context_time is None else self.context_time
+
+    def reset_calls(self):
+        self.calls = collections.Counter()
+
+    def add_node(self, name, node_type='transform', parent=None):
+        parent_node = self.nodes[parent] if parent else None
+        node = Node(name, node_type, parent_node)
+        if parent_node is not None:
+            parent_node.children.append(node)
+        self.nodes[name] = node
+        return node
+
+    def get_node(self, name):
+        node = self.nodes.get(name.split('|')[-1])
+        if node is None:
+            raise ValueError('No object matches name: {}'.format(name))
+        return node
+
+    def get_attribute(self, plug_name):
+        node_name, attr_name = plug_name.split('.', 1)
+        attribute = self.get_node(node_name).get_attribute(attr_name)
+        if attribute is None:
+            raise ValueError('No object matches name: {}'.format(plug_name))
+        return attribute
+
+    def add_control(self, name, group, user_attr_count=3, node_type='transform'):
+        """
+        Add a control with numeric user attributes and skinPoseData
+        :param name: str
+        :param group: str, parent group
+        :param user_attr_count: int
+        :param node_type: str, 'transform' or 'joint'
+        :return: Node
+        """
+        node = self.add_node(name, node_type, group)
+        for i in range(user_attr_count):
+            kind = ('double', 'enum', 'bool', 'distance')[i % 4]
+            default = {'double': 0.0, 'enum': 0, 'bool': False, 'distance': 0.0}[kind]
+            node.add_attribute(Attribute('userAttr{}'.format(i), kind, default, user=True))
+        translation = [float(len(self.nodes) % 7), float(len(self.nodes) % 11), 0.0, 1.0]
+        node.add_attribute(Attribute('skinPoseData', 'string',
+                                     'matrix [{}]'.format(','.join(str(x) for x in identity_matrix[:12] +
+                                                                   translation)),
+                                     user=True))
+        # A locked channel per control, like the scale of most rig controls
+        node.get_attribute('scaleZ').locked = True
+        return node
+
+    def build_rig(self, control_count=500, namespace='', user_attr_count=3, joint_ratio=10, ui_path=None):
+        """
+        Build a rig with the picker controls and filler controls up to the count given
+        :param control_count: int, minimum number of _ctr nodes
+        :param namespace: str, e.g. 'hulk:'
+        :param user_attr_count: int, numeric user attributes per control
+        :param joint_ratio: int, one joint control every joint_ratio controls, 0 for none
+        :param ui_path: str, picker.ui to read the control names from, the one next to this file if None
+        """
+        self.clear()
+        for group, parent in (('all', None), ('body', 'all'), ('face', 'all')):
+            self.add_node('{}{}'.format(namespace, group_names[group]),
+                          parent='{}{}'.format(namespace, group_names[parent]) if parent else None)
+
+        control_names = get_ui_controls(ui_path or os.path.join(os.path.dirname(__file__), 'picker.ui'))
+        for limb in ('arm', 'leg'):
+            for side in ('l', 'r'):
+                control_names['body'].extend(get_limb_controls(limb, side))
+
+        count = 0
+        for group in ('body', 'face'):
+            for control_name in control_names[group]:
+                if '{}{}'.format(namespace, control_name) in self.nodes:
+                    continue
+                self.add_group_control(namespace, control_name, group, user_attr_count, joint_ratio, count)
+                count += 1
+
+        i = 0
+        while count < control_count:
+            group = 'body' if i % 2 == 0 else 'face'
+            for side in ('l', 'r', 'c') if i % 3 == 0 else ('l', 'r'):
+                control_name = 'filler{}{}_{}_ctr'.format(group.capitalize(), i, side)
+                self.add_group_control(namespace, control_name, group, user_attr_count, joint_ratio, count)
+                count += 1
+            i += 1
+
+        for limb in ('arm', 'leg'):
+            for side in ('l', 'r'):
+                for node_name in get_limb_snap_nodes(limb, side):
+                    node_type = 'joint' if node_name.endswith(('_jnt', '_skn')) else 'transform'
+                    self.add_node('{}{}'.format(namespace, node_name), node_type)
+                settings = self.get_node('{}{}Settings_{}_ctr'.format(namespace, limb, side))
+                if settings.get_attribute('fkIk') is None:
+                    settings.add_attribute(Attribute('fkIk', 'enum', 0, user=True))
+
+        general = '{}general_c_ctr'.format(namespace)
+        if general not in self.nodes:
+            self.add_control(general, '{}{}'.format(namespace, group_names['body']), 0)
+        for attr in ('visControls', 'visGeometries'):
+            self.get_node(general).add_attribute(Attribute(attr, 'bool', True, user=True))
+
+    def add_group_control(self, namespace, control_name, group, user_attr_count, joint_ratio, index):
+        node_type = 'joint' if joint_ratio and index % joint_ratio == joint_ratio - 1 else 'transform'
+        self.add_control('{}{}'.format(namespace, control_name), '{}{}'.format(namespace, group_names[group]),
+                         user_attr_count, node_type)
+
+    def get_controls(self):
+        return [x for x in self.nodes if x.endswith('_ctr')]
+
+
+def get_ui_controls(ui_path):
+    """
+    Get the control names of the picker tabs
+    :param ui_path: str
+    :return: dict, {'body': [control name, ...], 'face': [control name, ...]}
+    """
+    root = ElementTree.parse(ui_path).getroot()
+    control_names = dict()
+    for group in ('body', 'face'):
+        tab_element = root.find(".//widget[@name='{}_tab']".format(group))
+        control_names[group] = [x.get('name') for x in tab_element.iter('widget')
+                                if x.get('class') == 'QPushButton' and x.get('name', '').endswith('_ctr')]
+    return control_names
+
+
+def get_limb_controls(limb, side):
+    limb_name = limb.capitalize()
+    end_name = 'hand' if limb == 'arm' else 'foot'
+    return ['up{}Fk_{}_ctr'.format(limb_name, side), 'low{}Fk_{}_ctr'.format(limb_name, side),
+            '{}PoleVector_{}_ctr'.format(limb, side), '{}{}Fk_{}_ctr'.format(end_name, limb_name, side),
+            '{}{}Ik_{}_ctr'.format(end_name, limb_name, side), '{}Settings_{}_ctr'.format(limb, side)]
+
+
+def get_limb_snap_nodes(limb, side):
+    limb_name = limb.capitalize()
+    end_name = 'hand' if limb == 'arm' else 'foot'
+    return ['up{}_{}_jnt'.format(limb_name, side), 'low{}_{}_jnt'.format(limb_name, side),
+            '{}PoleVector_{}_snap'.format(limb, side), '{}{}_{}_skn'.format(end_name, limb_name, side)]
+
+
+scene = Scene()
+
+
+############
+# maya.cmds #
+############
+def command(function):
+    def counted_command(*args, **kwargs):
+        scene.calls[function.__name__] += 1
+        return function(*args, **kwargs)
+    counted_command.__name__ = function.__name__
+    return counted_command
+
+
+def as_list(names):
+    if names is None:
+        return list()
+    if isinstance(names, str):
+        return [names]
+    return list(names)
+
+
+@command
+def undoInfo(*args, **kwargs):
+    return None
+
+
+@command
+def about(batch=False, **kwargs):
+    return False
+
+
+@command
+def refresh(query=False, suspend=None, **kwargs):
+    if query:
+        return scene.refresh_suspended
+    if suspend is not None:
+        scene.refresh_suspended = suspend
+
+
+@command
+def evaluationManager(query=False, mode=None, **kwargs):
+    if query:
+        return [scene.evaluation_mode]
+    if mode is not None:
+        scene.evaluation_mode = mode
+
+
+@command
+def undo(*args, **kwargs):
+    return None
+
+
+@command
+def ls(*args, **kwargs):
+    if kwargs.get('selection') or kwargs.get('sl'):
+        return list(scene.selection)
+    if not args:
+        return list(scene.nodes)
+    names = list()
+    for pattern in (x for arg in args for x in as_list(arg)):
+        if '*' in pattern:
+            names.extend(sorted(x for x in scene.nodes if fnmatch.fnmatchcase(x, pattern)))
+        elif pattern.split('|')[-1] in scene.nodes:
+            names.append(pattern)
+    return names
+
+
+@command
+def select(*args, **kwargs):
+    names = as_list(args[0]) if args else list()
+    for name in names:
+        scene.get_node(name)
+    if kwargs.get('clear'):
+        scene.selection = list()
+    elif kwargs.get('add'):
+        selected = set(scene.selection)
+        scene.selection.extend(x for x in names if x not in selected)
+    elif kwargs.get('deselect'):
+        deselected = set(names)
+        scene.selection = [x for x in scene.selection if x not in deselected]
+    else:
+        scene.selection = list(collections.OrderedDict.fromkeys(names))
+
+
+@command
+def objExists(name):
+    return name.split('.')[0].split('|')[-1] in scene.nodes and (
+        '.' not in name or scene.nodes[name.split('.')[0]].get_attribute(name.split('.', 1)[1]) is not None)
+
+
+@command
+def listRelatives(name, allDescendents=False, children=False, **kwargs):
+    node = scene.get_node(name)
+    if not allDescendents:
+        return [x.name for x in node.children] or None
+    descendents = list()
+    stack = list(node.children)
+    while stack:
+        child = stack.pop()
+        descendents.append(child.name)
+        stack.extend(child.children)
+    return descendents or None
+
+
+@command
+def listAttr(name, userDefined=False, keyable=False, **kwargs):
+    attributes = scene.get_node(name).attributes.values()
+    return [x.name for x in attributes if (not userDefined or x.user) and (not keyable or x.keyable)] or None
+
+
+@command
+def addAttr(name, longName=None, dataType=None, **kwargs):
+    scene.get_node(name).add_attribute(Attribute(longName, 'string', '', user=True))
+
+
+@command
+def referenceQuery(name, filename=False, nodes=False, **kwargs):
+    if nodes:
+        return [x for x, y in scene.nodes.items() if y.reference_file == name]
+    reference_file = scene.get_node(name).reference_file
+    if reference_file is None:
+        raise RuntimeError('{} is not from a referenced file'.format(name))
+    return reference_file
+
+
+@command
+def getAttr(plug_name, **kwargs):
+    return scene.get_attribute(plug_name).value
+
+
+@command
+def setAttr(plug_name, value, **kwargs):
+    attribute = scene.get_attribute(plug_name)
+    if attribute.locked:
+        raise RuntimeError('The attribute {} is locked'.format(plug_name))
+    attribute.value = value
+
+
+@command
+def xform(name, query=False, matrix=None, **kwargs):
+    node = scene.get_node(name)
+    if query:
+        return list(node.matrix)
+    if matrix is not None:
+        node.matrix = list(matrix)
+        for attr, value in zip(('translateX', 'translateY', 'translateZ'), matrix[12:15]):
+            node.attributes[attr].value = value
+
+
+@command
+def setKeyframe(*args, **kwargs):
+    key_count = 0
+    key_time = kwargs.get('time', scene.current_time)
+    for name in as_list(args[0]) if args else list(scene.selection):
+        if '.' in name:
+            node = scene.get_node(name.split('.')[0])
+            attributes = [scene.get_attribute(name)]
+        else:
+            node = scene.get_node(name)
+            attributes = [x for x in node.attributes.values() if x.keyable]
+        for attribute in attributes:
+            if not attribute.locked:
+                node.keys[attribute.name].add(key_time)
+                key_count += 1
+    return key_count
+
+
+@command
+def keyframe(name, query=False, timeChange=False, time=None, **kwargs):
+    times = set()
+    for node_name in as_list(name):
+        for attr_times in scene.get_node(node_name).keys.values():
+            times.update(attr_times)
+    if time is not None:
+        times = set(x for x in times if time[0] <= x <= time[1])
+    return sorted(times) or None
+
+
+@command
+def currentTime(*args, **kwargs):
+    if kwargs.get('query'):
+        return scene.current_time
+    scene.current_time = float(args[0])
+    return scene.current_time
+
+
+@command
+def playbackOptions(query=False, minTime=False, maxTime=False, **kwargs):
+    return scene.min_time if minTime else scene.max_time
+
+
+@command
+def getModifiers():
+    return scene.modifiers
+
+
+@command
+def internalVar(userAppDir=False, **kwargs):
+    return os.path.join(os.path.expanduser('~'), 'maya') + '/'
+
+
+@command
+def inViewMessage(assistMessage='', **kwargs):
+    scene.messages.append(assistMessage)
+
+
+@command
+def pluginInfo(name, query=False, loaded=False, **kwargs):
+    return name in scene.plugins
+
+
+@command
+def loadPlugin(plugin_path, quiet=False):
+    """
+    Import the plugin file as a new module, like Maya does, and initialize it
+    """
+    plugin_name = os.path.splitext(os.path.basename(plugin_path))[0]
+    spec = importlib.util.spec_from_file_location('{}_plugin'.format(plugin_name), plugin_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.initializePlugin(module)
+    scene.plugins.add(plugin_name)
+    return [plugin_name]
+
+
+##################
+# maya.api.OpenMaya #
+##################
+class MFn(object):
+    kTransform = 110
+    kJoint = 121
+    kNumericAttribute = 1
+    kEnumAttribute = 2
+    kUnitAttribute = 3
+    kTypedAttribute = 4
+
+
+class MSpace(object):
+    kTransform = 1
+    kWorld = 4
+
+
+class MObject(object):
+    kNullObj = None
+
+    def __init__(self, node=None, attribute=None, data=None):
+        self.node = node
+        self.attribute = attribute
+        self.data = data
+
+    def isNull(self):
+        return self.node is None and self.attribute is None and self.data is None
+
+    def hasFn(self, fn_type):
+        if self.attribute is not None:
+            kind = self.attribute.kind
+            if kind in ('bool', 'int', 'double'):
+                return fn_type == MFn.kNumericAttribute
+            if kind == 'enum':
+                return fn_type == MFn.kEnumAttribute
+            if kind in unit_kinds:
+                return fn_type == MFn.kUnitAttribute
+            return fn_type == MFn.kTypedAttribute
+        if self.node is not None:
+            if fn_type == MFn.kTransform:
+                return True
+            return fn_type == MFn.kJoint and self.node.node_type == 'joint'
+        return False
+
+
+MObject.kNullObj = MObject()
+
+
+class MSelectionList(object):
+    def __init__(self):
+        self.nodes = list()
+        self.attributes = list()
+
+    def add(self, name):
+        if isinstance(name, MDagPath):
+            self.nodes.append(name.node_data)
+            self.attributes.append(None)
+            return self
+        node_name, separator, attr_name = name.partition('.')
+        node = scene.nodes.get(node_name.split('|')[-1])
+        attribute = node.get_attribute(attr_name) if node is not None and separator else None
+        if node is None or (separator and attribute is None):
+            raise RuntimeError('(kInvalidParameter): Object does not exist: {}'.format(name))
+        self.nodes.append(node)
+        self.attributes.append(attribute)
+        return self
+
+    def length(self):
+        return len(self.nodes)
+
+    def getDependNode(self, index):
+        return MObject(node=self.nodes[index])
+
+    def getDagPath(self, index):
+        return MDagPath(self.nodes[index])
+
+    def getPlug(self, index):
+        return MPlug(self.nodes[index], self.attributes[index])
+
+    def getSelectionStrings(self):
+        return [x.name for x in self.nodes]
+
+
+class MDagPath(object):
+    def __init__(self, node_data=None):
+        self.node_data = node_data
+
+    def node(self):
+        return MObject(node=self.node_data)
+
+    def partialPathName(self):
+        return self.node_data.name
+
+    def fullPathName(self):
+        names = list()
+        node = self.node_data
+        while node is not None:
+            names.insert(0, node.name)
+            node = node.parent
+        return '|' + '|'.join(names)
+
+
+class MObjectHandle(object):
+    def __init__(self, mobject):
+        self.node_data = mobject.node
+
+    def isValid(self):
+        return scene.nodes.get(self.node_data.name) is self.node_data
+
+
+class MGlobal(object):
+    kReplaceList = 0
+    kXORWithList = 1
+    kRemoveFromList = 2
+    kAddToList = 3
+
+    @staticmethod
+    def getActiveSelectionList():
+        scene.calls['MGlobal.getActiveSelectionList'] += 1
+        selection = MSelectionList()
+        for name in scene.selection:
+            selection.add(name)
+        return selection
+
+    @staticmethod
+    def setActiveSelectionList(selection, adjustment=0):
+        scene.calls['MGlobal.setActiveSelectionList'] += 1
+        names = selection.getSelectionStrings()
+        if adjustment == MGlobal.kAddToList:
+            selected = set(scene.selection)
+            scene.selection.extend(x for x in names if x not in selected)
+        elif adjustment == MGlobal.kRemoveFromList:
+            deselected = set(names)
+            scene.selection = [x for x in scene.selection if x not in deselected]
+        else:
+            scene.selection = list(collections.OrderedDict.fromkeys(names))
+
+
+class MPlug(object):
+    kFreeToChange = 0
+    kNotFreeToChange = 1
+    kChildrenNotFreeToChange = 2
+
+    def __init__(self, node, attribute):
+        self.node = node
+        self.attribute = attribute
+
+    def name(self):
+        return '{}.{}'.format(self.node.name, self.attribute.name)
+
+    @property
+    def isLocked(self):
+        return self.attribute.locked
+
+    @property
+    def isDestination(self):
+        return bool(self.node.keys.get(self.attribute.name))
+
+    def isFreeToChange(self, *args):
+        return MPlug.kNotFreeToChange if self.attribute.locked else MPlug.kFreeToChange
+
+    def asDouble(self):
+        return float(self.attribute.value)
+
+    def asInt(self):
+        return int(self.attribute.value)
+
+    def asBool(self):
+        return bool(self.attribute.value)
+
+    def asString(self):
+        return str(self.attribute.value)
+
+    def asMObject(self):
+        return MObject(data=self.attribute.value)
+
+    def elementByLogicalIndex(self, index):
+        return self
+
+
+class MFnMatrixData(object):
+    def __init__(self, obj):
+        self.data = obj.data
+
+    def matrix(self):
+        return self.data
+
+
+class MFnDependencyNode(object):
+    def __init__(self, obj=None):
+        self.node = obj.node if obj is not None else None
+
+    def name(self):
+        return self.node.name
+
+    def hasAttribute(self, attr_name):
+        return self.node.get_attribute(attr_name) is not None
+
+    @property
+    def isFromReferencedFile(self):
+        return self.node.reference_file is not None
+
+    def attribute(self, attr_name):
+        attribute = self.node.get_attribute(attr_name)
+        return MObject(attribute=attribute) if attribute is not None else MObject()
+
+    def findPlug(self, attr, want_networked_plug=False):
+        attribute = attr.attribute if isinstance(attr, MObject) else self.node.get_attribute(attr)
+        if attribute is None:
+            raise RuntimeError('(kInvalidParameter): No attribute {}'.format(attr))
+        return MPlug(self.node, attribute)
+
+
+class MFnAttribute(object):
+    def __init__(self, obj):
+        self.attribute = obj.attribute
+
+    @property
+    def name(self):
+        return self.attribute.name
+
+
+class MFnNumericData(object):
+    def __init__(self, obj=None):
+        self.data = obj.data if obj is not None else None
+
+    def getData(self):
+        return list(self.data)
+
+    kBoolean = 1
+    kByte = 2
+    kChar = 3
+    kShort = 4
+    kInt = 7
+    kInt64 = 10
+    kFloat = 11
+    kDouble = 12
+
+
+class MFnNumericAttribute(MFnAttribute):
+    numeric_types = {'bool': MFnNumericData.kBoolean, 'int': MFnNumericData.kInt, 'double': MFnNumericData.kDouble}
+
+    def numericType(self):
+        return self.numeric_types[self.attribute.kind]
+
+    @property
+    def default(self):
+        return self.attribute.default
+
+
+class MFnEnumAttribute(MFnAttribute):
+    @property
+    def default(self):
+        return self.attribute.default
+
+
+class UnitValue(object):
+    def __init__(self, value):
+        self.value = value
+
+
+class MFnUnitAttribute(MFnAttribute):
+    @property
+    def default(self):
+        return UnitValue(self.attribute.default)
+
+
+class MDGModifier(object):
+    def __init__(self):
+        self.edits = list()
+        self.previous_values = list()
+        # Plugs of the anim curves created through the modifier
+        self.curve_plugs = list()
+
+    def newPlugValueBool(self, plug, value):
+        self.edits.append((plug, bool(value)))
+
+    def newPlugValueInt(self, plug, value):
+        self.edits.append((plug, int(value)))
+
+    def newPlugValueDouble(self, plug, value):
+        self.edits.append((plug, float(value)))
+
+    def doIt(self):
+        self.previous_values = [plug.attribute.value for plug, value in self.edits]
+        for plug, value in self.edits:
+            plug.attribute.value = value
+
+    def undoIt(self):
+        for (plug, value), previous_value in zip(self.edits, self.previous_values):
+            plug.attribute.value = previous_value
+        for plug in self.curve_plugs:
+            plug.attribute.curve = None
+            plug.node.keys[plug.attribute.name].clear()
+
+
+class MVector(object):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class MMatrix(object):
+    """
+    4x4 matrix in rows, the points are row vectors like in Maya
+    """
+    def __init__(self, values=None):
+        self.values = list(values) if values is not None else list(identity_matrix)
+
+    def __mul__(self, other):
+        a = self.values
+        b = other.values
+        return MMatrix([sum(a[i * 4 + k] * b[k * 4 + j] for k in range(4)) for i in range(4) for j in range(4)])
+
+    def inverse(self):
+        # Gauss-Jordan elimination with partial pivoting
+        rows = [self.values[i * 4:i * 4 + 4] + identity_matrix[i * 4:i * 4 + 4] for i in range(4)]
+        for column in range(4):
+            pivot = max(range(column, 4), key=lambda x: abs(rows[x][column]))
+            rows[column], rows[pivot] = rows[pivot], rows[column]
+            pivot_value = rows[column][column]
+            rows[column] = [x / pivot_value for x in rows[column]]
+            for i in range(4):
+                if i != column:
+                    factor = rows[i][column]
+                    rows[i] = [x - factor * y for x, y in zip(rows[i], rows[column])]
+        return MMatrix([x for row in rows for x in row[4:]])
+
+
+def get_matrix_rotation(m):
+    """
+    :param m: list, 3x3 rotation matrix
+    :return: tuple, xyz rotation in radians
+    """
+    return (math.atan2(m[1][2], m[2][2]), math.asin(max(-1.0, min(1.0, -m[0][2]))), math.atan2(m[0][1], m[0][0]))
+
+
+def multiply_matrices(a, b):
+    return [[sum(a[i][k] * b[k][j] for k in range(3)) for j in range(3)] for i in range(3)]
+
+
+class MQuaternion(object):
+    """
+    Rotation kept as a 3x3 matrix, the product applies this rotation then the other one
+    """
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def __mul__(self, other):
+        return MQuaternion(multiply_matrices(self.matrix, other.matrix))
+
+    def inverse(self):
+        return MQuaternion([list(x) for x in zip(*self.matrix)])
+
+    def asEulerRotation(self):
+        return MEulerRotation(*get_matrix_rotation(self.matrix))
+
+
+class MEulerRotation(object):
+    """
+    Rotation in the xyz order, the other orders are not simulated
+    """
+    def __init__(self, x=0.0, y=0.0, z=0.0, order=0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    def asQuaternion(self):
+        cx, sx, cy, sy, cz, sz = (math.cos(self.x), math.sin(self.x), math.cos(self.y), math.sin(self.y),
+                                  math.cos(self.z), math.sin(self.z))
+        rotate_x = [[1.0, 0.0, 0.0], [0.0, cx, sx], [0.0, -sx, cx]]
+        rotate_y = [[cy, 0.0, -sy], [0.0, 1.0, 0.0], [sy, 0.0, cy]]
+        rotate_z = [[cz, sz, 0.0], [-sz, cz, 0.0], [0.0, 0.0, 1.0]]
+        return MQuaternion(multiply_matrices(multiply_matrices(rotate_x, rotate_y), rotate_z))
+
+    def reorderIt(self, order):
+        return self
+
+
+class MTransformationMatrix(object):
+    """
+    Decompose a matrix without shear in the xyz rotation order
+    """
+    def __init__(self, matrix=None):
+        values = matrix.values if matrix is not None else identity_matrix
+        self.rows = [values[i * 4:i * 4 + 3] for i in range(4)]
+        self.scale_values = [math.sqrt(sum(x * x for x in row)) or 1.0 for row in self.rows[:3]]
+
+    def reorderRotation(self, rotation_order):
+        pass
+
+    def translation(self, space):
+        return MVector(*self.rows[3])
+
+    def rotation(self, asQuaternion=False):
+        m = [[x / scale for x in row] for row, scale in zip(self.rows[:3], self.scale_values)]
+        if asQuaternion:
+            return MQuaternion(m)
+        return MEulerRotation(*get_matrix_rotation(m))
+
+    def scale(self, space):
+        return list(self.scale_values)
+
+    def setScale(self, scale, space):
+        self.rows[:3] = [[x / old_scale * new_scale for x in row]
+                         for row, old_scale, new_scale in zip(self.rows[:3], self.scale_values, scale)]
+        self.scale_values = list(scale)
+
+    def asMatrix(self):
+        return MMatrix([x for row in self.rows[:3] for x in list(row) + [0.0]] + list(self.rows[3]) + [1.0])
+
+    def shear(self, space):
+        return [0.0, 0.0, 0.0]
+
+
+class CallbackMessage(object):
+    @staticmethod
+    def add_callback(*args, **kwargs):
+        scene.callback_count += 1
+        return scene.callback_count
+
+
+class MMessage(object):
+    @staticmethod
+    def removeCallback(callback_id):
+        pass
+
+    @staticmethod
+    def removeCallbacks(callback_ids):
+        pass
+
+
+class MEventMessage(MMessage):
+    addEventCallback = CallbackMessage.add_callback
+
+
+class MDagMessage(MMessage):
+    addParentAddedCallback = CallbackMessage.add_callback
+    addParentRemovedCallback = CallbackMessage.add_callback
+
+
+class MDGMessage(MMessage):
+    addNodeRemovedCallback = CallbackMessage.add_callback
+
+
+class MNodeMessage(MMessage):
+    addNameChangedCallback = CallbackMessage.add_callback
+
+
+class MNamespaceMessage(MMessage):
+    addNamespaceRenamedCallback = CallbackMessage.add_callback
+
+
+class MSceneMessage(MMessage):
+    kAfterNew = 1
+    kAfterImport = 4
+    kAfterOpen = 6
+    kAfterLoadReference = 21
+    kAfterUnloadReference = 23
+    kAfterCreateReference = 30
+    kAfterRemoveReference = 34
+    addCallback = CallbackMessage.add_callback
+    addReferenceCallback = CallbackMessage.add_callback
+
+
+class MFileObject(object):
+    def __init__(self, path=''):
+        self.path = path
+
+    def resolvedFullName(self):
+        return self.path
+
+
+class MPxCommand(object):
+    def isUndoable(self):
+        return False
+
+
+class MFnPlugin(object):
+    def __init__(self, plugin, vendor='', version=''):
+        self.plugin = plugin
+
+    @staticmethod
+    def registerCommand(command_name, creator):
+        def plugin_command(*args, **kwargs):
+            creator().doIt(args)
+        plugin_command.__name__ = command_name
+        setattr(cmds, command_name, command(plugin_command))
+
+    @staticmethod
+    def deregisterCommand(command_name):
+        if hasattr(cmds, command_name):
+            delattr(cmds, command_name)
+
+
+class MAnimUtil(object):
+    @staticmethod
+    def isAnimated(plug):
+        return bool(plug.node.keys.get(plug.attribute.name))
+
+
+class MTime(object):
+    def __init__(self, value=0.0, unit=None):
+        self.value = value
+
+    def asUnits(self, unit):
+        return self.value
+
+    @staticmethod
+    def uiUnit():
+        return 6
+
+
+class MDGContext(object):
+    def __init__(self, time=None):
+        self.time = time.value if time is not None else None
+
+    def makeCurrent(self):
+        previous_context = MDGContext()
+        previous_context.time = scene.context_time
+        scene.context_time = self.time
+        return previous_context
+
+
+class MAnimCurveChange(object):
+    """
+    Curves before the keys were added, to undo them
+    """
+    def __init__(self):
+        self.previous_curves = list()
+
+    def undoIt(self):
+        for plug, curve in reversed(self.previous_curves):
+            plug.attribute.curve = curve
+            plug.node.keys[plug.attribute.name] = set(curve or ())
+
+    def redoIt(self):
+        pass
+
+
+class MAnimControl(object):
+    @staticmethod
+    def currentTime():
+        return MTime(scene.current_time)
+
+
+class MFnAnimCurve(object):
+    kAnimCurveUnknown = 7
+    kTangentAuto = 18
+    kTangentStep = 5
+
+    def __init__(self, plug=None):
+        self.plug = plug
+
+    def create(self, plug, curve_type=None, modifier=None):
+        self.plug = plug
+        plug.attribute.curve = dict()
+        if modifier is not None:
+            modifier.curve_plugs.append(plug)
+
+    def find(self, time):
+        times = self.get_times()
+        return times.index(time.value) if time.value in times else None
+
+    def record(self, change):
+        if change is not None:
+            curve = self.plug.attribute.curve
+            change.previous_curves.append((self.plug, dict(curve) if curve is not None else None))
+
+    def addKey(self, time, value, tangent_in=None, tangent_out=None, change=None):
+        self.record(change)
+        if self.plug.attribute.curve is None:
+            self.plug.attribute.curve = dict()
+        self.plug.attribute.curve[time.value] = value
+        self.plug.node.keys[self.plug.attribute.name].add(time.value)
+
+    def setValue(self, index, value, change=None):
+        self.record(change)
+        self.plug.attribute.curve[self.get_times()[index]] = value
+
+    @property
+    def numKeys(self):
+        return len(self.plug.attribute.curve or ())
+
+    def get_times(self):
+        return sorted(self.plug.attribute.curve or ())
+
+    def input(self, index):
+        return MTime(self.get_times()[index])
+
+    def findClosest(self, time):
+        times = self.get_times()
+        return min(range(len(times)), key=lambda i: abs(times[i] - time.value)) if times else 0
+
+    def remove(self, index, change=None):
+        attribute = self.plug.attribute
+        self.record(change)
+        key_time = self.get_times()[index]
+        attribute.curve = dict((x, y) for x, y in attribute.curve.items() if x != key_time)
+        self.plug.node.keys[attribute.name].discard(key_time)
+
+    def addKeys(self, times, values, tangent_in=None, tangent_out=None, keep_existing=False, change=None):
+        attribute = self.plug.attribute
+        self.record(change)
+        # The curve is cleared before the keys are added unless the existing keys are kept
+        curve = dict(attribute.curve or dict()) if keep_existing else dict()
+        curve.update((x.value, y) for x, y in zip(times, values))
+        attribute.curve = curve
+        if not keep_existing:
+            self.plug.node.keys[attribute.name].clear()
+        self.plug.node.keys[attribute.name].update(curve)
+
+
+####################
+# maya.OpenMayaUI #
+####################
+class MQtUtil(object):
+    main_window_ptr = 0
+
+    @staticmethod
+    def mainWindow():
+        return MQtUtil.main_window_ptr
+
+
+def create_module(name, attributes):
+    module = types.ModuleType(name)
+    for attr_name, value in attributes.items():
+        setattr(module, attr_name, value)
+    return module
+
+
+cmds = create_module('maya.cmds', dict((x.__name__, x) for x in (
+    undoInfo, undo, about, refresh, evaluationManager, ls, select, objExists, listRelatives, listAttr, addAttr,
+    referenceQuery, getAttr, setAttr, xform, setKeyframe, keyframe, currentTime, playbackOptions, getModifiers,
+    internalVar, inViewMessage, pluginInfo, loadPlugin)))
+
+
+def install():
+    """
+    Register the stand-in modules as maya, maya.cmds, maya.OpenMayaUI and maya.api
+    :return: Scene
+    """
+    open_maya = create_module('maya.api.OpenMaya', dict(
+        (x.__name__, x) for x in (MFn, MSpace, MObject, MSelectionList, MDagPath, MObjectHandle, MGlobal, MPlug, MFnDependencyNode, MFnAttribute,
+                                  MFnNumericData, MFnNumericAttribute, MFnEnumAttribute, MFnUnitAttribute,
+                                  MDGModifier, MVector, MMatrix, MQuaternion, MEulerRotation, MTransformationMatrix,
+                                  MMessage, MEventMessage, MDagMessage, MDGMessage, MNodeMessage, MNamespaceMessage, MSceneMessage,
+                                  MFileObject,
+                                  MPxCommand, MFnPlugin, MTime, MDGContext, MFnMatrixData)))
+    for class_name, base in (('MTimeArray', list), ('MDoubleArray', list)):
+        setattr(open_maya, class_name, type(class_name, (base,), dict()))
+    open_maya_anim = create_module('maya.api.OpenMayaAnim', {'MAnimCurveChange': MAnimCurveChange,
+                                                            'MFnAnimCurve': MFnAnimCurve, 'MAnimUtil': MAnimUtil,
+                                                            'MAnimControl': MAnimControl})
+    open_maya_ui = create_module('maya.OpenMayaUI', {'MQtUtil': MQtUtil})
+    api = create_module('maya.api', {'OpenMaya': open_maya, 'OpenMayaAnim': open_maya_anim})
+    maya = create_module('maya', {'cmds': cmds, 'OpenMayaUI': open_maya_ui, 'api': api})
+    maya.__path__ = list()
+    api.__path__ = list()
+
+    sys.modules.update({'maya': maya, 'maya.cmds': cmds, 'maya.OpenMayaUI': open_maya_ui, 'maya.api': api,
+                        'maya.api.OpenMaya': open_maya, 'maya.api.OpenMayaAnim': open_maya_anim})
+    return scene
@@ -0,0 +1,134 @@
+"""
+Guard around the bulk picker edits, the viewport refresh is suspended and the evaluation manager can be switched
+to another mode while the edit runs. The previous state is restored on exit or error
+"""
+import time
+import collections
+from maya import cmds
+
+
+max_samples = 256
+default_settings = {'enabled': True, 'suspend_refresh': True, 'evaluation_mode': None}
+# Settings per operation, the missing keys take the default settings.
+# evaluation_mode is 'off' (DG), 'serial' or 'parallel', None keeps the current mode
+operation_settings = {'bind_pose': {},
+                      'flip_pose': {},
+                      'mirror_pose': {},
+                      'flip_animation': {},
+                      'mirror_animation': {},
+                      'snap_fk_ik': {},
+                      'bake_fk_ik': {},
+                      'apply_pose': {},
+                      'blend_pose': {}}
+# Time spent inside the guard per operation, {operation: deque([(elapsed, enabled), ...])}
+timings = collections.OrderedDict()
+
+
+def get_settings(operation):
+    """
+    :param operation: str
+    :return: dict
+    """
+    settings = dict(default_settings)
+    settings.update(operation_settings.get(operation, dict()))
+    return settings
+
+
+def set_settings(operation, **settings):
+    """
+    Change the settings of an operation, e.g. set_settings('bind_pose', evaluation_mode='off')
+    :param operation: str
+    """
+    operation_settings.setdefault(operation, dict()).update(settings)
+
+
+class EditGuard(object):
+    """
+    Context manager of a bulk edit, the guards inside another guard do nothing
+    """
+    depth = 0
+
+    def __init__(self, operation, **settings):
+        """
+        :param operation: str, name of the operation, its settings are used
+        :param settings: overrides of the operation settings
+        """
+        self.operation = operation
+        self.settings = get_settings(operation)
+        self.settings.update(settings)
+        self.refresh_suspended = None
+        self.evaluation_mode = None
+        self.start_time = None
+
+    def __enter__(self):
+        self.start_time = time.time()
+        EditGuard.depth += 1
+        if EditGuard.depth > 1 or not self.settings['enabled']:
+            return self
+
+        try:
+            self.apply_settings()
+        except Exception:
+            # __exit__ is not called when __enter__ fails, what was set is restored here
+            try:
+                self.restore()
+            finally:
+                EditGuard.depth -= 1
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        try:
+            self.restore()
+        finally:
+            EditGuard.depth -= 1
+
+        if EditGuard.depth == 0:
+            add_timing(self.operation, time.time() - self.start_time, self.settings['enabled'])
+        return False
+
+    def apply_settings(self):
+        """
+        Suspend the refresh and switch the evaluation mode, the previous state is stored to be restored
+        """
+        if self.settings['suspend_refresh'] and not cmds.about(batch=True):
+            self.refresh_suspended = cmds.refresh(query=True, suspend=True)
+            if not self.refresh_suspended:
+                cmds.refresh(suspend=True)
+
+        evaluation_mode = self.settings['evaluation_mode']
+        if evaluation_mode:
+            current_mode = cmds.evaluationManager(query=True, mode=True)[0]
+            if current_mode != evaluation_mode:
+                self.evaluation_mode = current_mode
+                cmds.evaluationManager(mode=evaluation_mode)
+
+    def restore(self):
+        try:
+            if self.evaluation_mode:
+                cmds.evaluationManager(mode=self.evaluation_mode)
+        finally:
+            if self.refresh_suspended is False:
+                cmds.refresh(suspend=False)
+
+
+def add_timing(operation, elapsed, enabled):
+    if operation not in timings:
+        timings[operation] = collections.deque(maxlen=max_samples)
+    timings[operation].append((elapsed, enabled))
+
+
+def get_stats():
+    """
+    Get the average guarded time of every operation with the guard enabled and disabled
+    :return: dict, {operation: {'enabled': (count, mean seconds), 'disabled': (count, mean seconds)}}
+    """
+    stats = dict()
+    for operation, samples in timings.items():
+        operation_stats = dict()
+        for enabled, key in ((True, 'enabled'), (False, 'disabled')):
+            elapsed_list = [x[0] for x in samples if x[1] == enabled]
+            mean = sum(elapsed_list) / len(elapsed_list) if elapsed_list else 0.0
+            operation_stats[key] = (len(elapsed_list), mean)
+        stats[operation] = operation_stats
+    return stats
@@ -0,0 +1,105 @@
+"""
+Node handles of the controls cached per namespace, so a click selects the controls without resolving their names
+"""
+from maya.api import OpenMaya
+
+import picker_registry
+import picker_undo
+
+
+handle_tables = dict()
+selection_adjustments = {'shift': OpenMaya.MGlobal.kAddToList,
+                         'control': OpenMaya.MGlobal.kRemoveFromList}
+
+
+class HandleTable(object):
+    """
+    DAG paths of the controls of a namespace, resolved by name once and validated with their object handle on reuse
+    """
+    def __init__(self, namespace, control_list):
+        self.namespace = namespace
+        self.control_list = control_list
+        self.handles = dict()
+
+    def get_dag_path(self, control_name):
+        """
+        :param control_name: str, name without namespace
+        :return: MDagPath or None if the node does not exist
+        """
+        handle, dag_path = self.handles.get(control_name, (None, None))
+        if handle is not None and handle.isValid():
+            return dag_path
+
+        selection = OpenMaya.MSelectionList()
+        try:
+            selection.add('{}{}'.format(self.namespace, control_name))
+        except RuntimeError:
+            self.handles.pop(control_name, None)
+            return None
+        dag_path = selection.getDagPath(0)
+        self.handles[control_name] = (OpenMaya.MObjectHandle(dag_path.node()), dag_path)
+        return dag_path
+
+    def get_selection_list(self, control_names):
+        """
+        :param control_names: list, names without namespace
+        :return: MSelectionList, the missing nodes are skipped
+        """
+        selection = OpenMaya.MSelectionList()
+        for control_name in control_names:
+            dag_path = self.get_dag_path(control_name)
+            if dag_path is not None:
+                selection.add(dag_path)
+        return selection
+
+
+def get_handle_table(namespace):
+    """
+    Get the handle table of a namespace, rebuilt when the control registry changes
+    :param namespace: str
+    :return: HandleTable
+    """
+    try:
+        control_list = picker_registry.get_registry().get_controls(namespace, 'all')
+    except ValueError:
+        control_list = list()
+
+    handle_table = handle_tables.get(namespace)
+    if handle_table is None or handle_table.control_list is not control_list:
+        handle_table = HandleTable(namespace, control_list)
+        handle_tables[namespace] = handle_table
+    return handle_table
+
+
+class SelectionEdit(object):
+    """
+    Undoable change of the active selection
+    """
+    def __init__(self, selection, adjustment):
+        """
+        :param selection: MSelectionList
+        :param adjustment: MGlobal list adjustment
+        """
+        self.selection = selection
+        self.adjustment = adjustment
+        self.previous_selection = None
+
+    def doIt(self):
+        picker_undo.count_commands()
+        self.previous_selection = OpenMaya.MGlobal.getActiveSelectionList()
+        OpenMaya.MGlobal.setActiveSelectionList(self.selection, self.adjustment)
+
+    def undoIt(self):
+        OpenMaya.MGlobal.setActiveSelectionList(self.previous_selection, OpenMaya.MGlobal.kReplaceList)
+
+
+def select_controls(namespace, control_names, modifier=None):
+    """
+    Add, remove or replace the selection with the controls given in a single undoable update
+    :param namespace: str
+    :param control_names: list, names without namespace
+    :param modifier: str, 'shift' adds to the selection, 'control' removes from it
+    """
+    selection = get_handle_table(namespace).get_selection_list(control_names)
+    adjustment = selection_adjustments.get(modifier, OpenMaya.MGlobal.kReplaceList)
+    picker_undo.commit(SelectionEdit(selection, adjustment))
@@ -0,0 +1,106 @@
+"""
+Decode the picker backgrounds off the UI thread at the size they are displayed,
+cached on disk by source hash and size, and in the QPixmapCache
+"""
+import os
+from PySide2 import QtCore, QtGui
+
+import picker_cache
+
+
+placeholder_color = QtGui.QColor(60, 60, 60)
+pixmap_cache_limit = 64 * 1024  # KB
+
+
+def get_cache_key(image_path, size):
+    """
+    Get the cache key of an image at the size given
+    :param image_path: str
+    :param size: QSize
+    :return: str
+    """
+    return 'picker_{}_{}x{}'.format(picker_cache.get_file_hash(image_path), size.width(), size.height())
+
+
+def get_thumbnail_path(cache_key):
+    thumbnail_folder = os.path.join(picker_cache.get_cache_folder(), 'thumbnails')
+    os.makedirs(thumbnail_folder, exist_ok=True)
+    return os.path.join(thumbnail_folder, '{}.png'.format(cache_key))
+
+
+class ImageSignals(QtCore.QObject):
+    loaded = QtCore.Signal(str, QtGui.QImage)
+
+
+class ImageTask(QtCore.QRunnable):
+    """
+    Read the thumbnail from the disk cache, or decode the source scaled and store the thumbnail
+    """
+    def __init__(self, image_path, size, cache_key):
+        super(ImageTask, self).__init__()
+        self.image_path = image_path
+        self.size = size
+        self.cache_key = cache_key
+        self.signals = ImageSignals()
+
+    def run(self):
+        thumbnail_path = get_thumbnail_path(self.cache_key)
+        image = QtGui.QImage()
+        if os.path.isfile(thumbnail_path):
+            image = QtGui.QImageReader(thumbnail_path).read()
+
+        if image.isNull():
+            reader = QtGui.QImageReader(self.image_path)
+            reader.setScaledSize(self.size)
+            image = reader.read()
+            if not image.isNull():
+                image.save(thumbnail_path)
+
+        self.signals.loaded.emit(self.cache_key, image)
+
+
+class ImageLoader(QtCore.QObject):
+    """
+    Set the label pixmaps asynchronously, the labels show a placeholder until the image arrives
+    """
+    def __init__(self, parent=None):
+        super(ImageLoader, self).__init__(parent)
+        self.pending_labels = dict()
+        self.tasks = dict()
+        if QtGui.QPixmapCache.cacheLimit() < pixmap_cache_limit:
+            QtGui.QPixmapCache.setCacheLimit(pixmap_cache_limit)
+
+    def load(self, label, image_path, size):
+        """
+        Set the image in the label at the size given
+        :param label: QLabel
+        :param image_path: str
+        :param size: QSize
+        """
+        cache_key = get_cache_key(image_path, size)
+        pixmap = QtGui.QPixmapCache.find(cache_key)
+        if pixmap is not None and not pixmap.isNull():
+            label.setPixmap(pixmap)
+            return
+
+        placeholder = QtGui.QPixmap(1, 1)
+        placeholder.fill(placeholder_color)
+        label.setPixmap(placeholder)
+
+        self.pending_labels.setdefault(cache_key, list()).append(label)
+        if cache_key not in self.tasks:
+            task = ImageTask(image_path, size, cache_key)
+            task.signals.loaded.connect(self.image_loaded, QtCore.Qt.QueuedConnection)
+            self.tasks[cache_key] = task
+            QtCore.QThreadPool.globalInstance().start(task)
+
+    def image_loaded(self, cache_key, image):
+        self.tasks.pop(cache_key, None)
+        labels = self.pending_labels.pop(cache_key, list())
+        if image.isNull():
+            return
+
+        pixmap = QtGui.QPixmap.fromImage(image)
+        QtGui.QPixmapCache.insert(cache_key, pixmap)
+        for label in labels:
+            label.setPixmap(pixmap)
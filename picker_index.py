@@ -0,0 +1,84 @@
+from PySide2 import QtCore
+
+
+class ControlIndex(object):
+    """
+    Uniform grid with the rects of the picker controls in picker local coordinates
+    """
+    def __init__(self, cell_size=32):
+        self.cell_size = cell_size
+        self.cells = dict()
+        self.control_rects = dict()
+        self.control_tabs = dict()
+
+    def clear(self):
+        self.cells = dict()
+        self.control_rects = dict()
+        self.control_tabs = dict()
+
+    def build(self, root_widget, control_widgets, tab_names=('body_tab', 'face_tab'), cell_size=None):
+        """
+        Precompute the rect and the owner tab of every control
+        :param root_widget: QWidget, the rects are stored in its coordinates
+        :param control_widgets: list
+        :param tab_names: tuple, object names of the widgets that own the controls
+        :param cell_size: int, size of the grid cells, the current one if None
+        """
+        self.clear()
+        if cell_size:
+            self.cell_size = cell_size
+
+        for widget in control_widgets:
+            parent_tab = widget.parentWidget()
+            while parent_tab is not None and parent_tab.objectName() not in tab_names:
+                parent_tab = parent_tab.parentWidget()
+
+            widget_rect = QtCore.QRect(widget.mapTo(root_widget, QtCore.QPoint(0, 0)), widget.size())
+            self.add(widget, widget_rect, parent_tab.objectName() if parent_tab is not None else None)
+
+    def add(self, widget, widget_rect, tab_name=None):
+        """
+        Add a control to the grid
+        :param widget: QWidget
+        :param widget_rect: QRect
+        :param tab_name: str
+        """
+        self.control_rects[widget] = widget_rect
+        self.control_tabs[widget] = tab_name
+        for cell in self.get_cells(widget_rect):
+            self.cells.setdefault(cell, list()).append(widget)
+
+    def get_cells(self, rect):
+        """
+        Get the grid cells covered by the rect given
+        :param rect: QRect
+        """
+        first_column = rect.left() // self.cell_size
+        last_column = rect.right() // self.cell_size
+        first_row = rect.top() // self.cell_size
+        last_row = rect.bottom() // self.cell_size
+        return [(column, row) for column in range(first_column, last_column + 1)
+                for row in range(first_row, last_row + 1)]
+
+    def query(self, rect, tab_name=None):
+        """
+        Get the controls that intersect the rect given
+        :param rect: QRect, in root widget coordinates
+        :param tab_name: str, only return the controls of this tab if given
+        :return: set
+        """
+        hits = set()
+        if not rect.isValid():
+            return hits
+
+        checked = set()
+        for cell in self.get_cells(rect):
+            for widget in self.cells.get(cell, ()):
+                if widget in checked:
+                    continue
+                checked.add(widget)
+                if tab_name is not None and self.control_tabs[widget] != tab_name:
+                    continue
+                if rect.intersects(self.control_rects[widget]):
+                    hits.add(widget)
+        return hits
@@ -0,0 +1,188 @@
+"""
+Run long rig-wide operations in chunks of bounded time from the Qt event loop, so Maya stays responsive.
+The chunks apply their edits off the undo queue and return them as records, the records are committed as a single
+undo step when the job completes and reverted when it is cancelled, so the edits of the user between two chunks are
+not part of the job
+"""
+import time
+import logging
+from PySide2 import QtCore, QtWidgets
+
+import picker_undo
+
+
+logger = logging.getLogger(__name__)
+
+# Operations on fewer controls run synchronously
+job_threshold = 1000
+# Time spent per chunk before giving the event loop back, in seconds
+chunk_time = 0.03
+first_chunk_size = 64
+
+
+class JobEdit(object):
+    """
+    Undo record of the edits of the chunks of a job, in their order
+    """
+    def __init__(self, edits):
+        """
+        :param edits: list, objects with doIt or redoIt and undoIt methods, already applied
+        """
+        self.edits = edits
+
+    def redoIt(self):
+        for edit in self.edits:
+            redo = getattr(edit, 'redoIt', None) or edit.doIt
+            redo()
+
+    def undoIt(self):
+        for edit in reversed(self.edits):
+            edit.undoIt()
+
+    def get_memory_size(self):
+        """
+        :return: int, bytes of the edits that report their memory size
+        """
+        return sum(x.get_memory_size() for x in self.edits if hasattr(x, 'get_memory_size'))
+
+
+class ChunkedJob(QtCore.QObject):
+    """
+    Process a list of items in chunks whose size adapts to the chunk time
+    """
+    progress = QtCore.Signal(int, int)
+    finished = QtCore.Signal(bool)
+
+    def __init__(self, name, items, process_chunk, finish=None, parent=None):
+        """
+        :param name: str
+        :param items: list
+        :param process_chunk: callable(chunk), returns the undo record of the edits it applied or None
+        :param finish: callable run after the last chunk, before the records are committed. It commits its own
+            edits, they are not reverted if it fails
+        :param parent: QObject
+        """
+        super(ChunkedJob, self).__init__(parent)
+        self.name = name
+        self.items = items
+        self.process_chunk = process_chunk
+        self.finish = finish
+        self.index = 0
+        self.chunk_size = first_chunk_size
+        self.edits = list()
+        self.running = False
+        self.failed = False
+        self.start_time = None
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.step)
+
+    def start(self):
+        self.running = True
+        self.start_time = time.time()
+        self.progress.emit(0, len(self.items))
+        self.timer.start()
+
+    def step(self):
+        """
+        Process the next chunk, the chunk size is doubled or halved to take about chunk_time
+        """
+        try:
+            chunk = self.items[self.index:self.index + self.chunk_size]
+            chunk_start_time = time.time()
+            edit = self.process_chunk(chunk)
+            if edit is not None:
+                self.edits.append(edit)
+            elapsed = time.time() - chunk_start_time
+        except Exception:
+            self.failed = True
+            self.stop(False)
+            raise
+
+        self.index += len(chunk)
+        if elapsed < chunk_time / 2:
+            self.chunk_size *= 2
+        elif elapsed > chunk_time and self.chunk_size > 1:
+            self.chunk_size //= 2
+        self.progress.emit(self.index, len(self.items))
+
+        if self.index >= len(self.items):
+            try:
+                if self.finish:
+                    self.finish()
+            except Exception:
+                self.failed = True
+                self.stop(False)
+                raise
+            self.stop(True)
+
+    def cancel(self):
+        if self.running:
+            self.stop(False)
+
+    def stop(self, completed):
+        """
+        Commit the records of the chunks as a single undo step, or revert them if the job did not complete
+        :param completed: bool
+        """
+        self.timer.stop()
+        self.running = False
+        if self.edits:
+            edit = JobEdit(self.edits)
+            if completed:
+                picker_undo.commit(edit, applied=True)
+            else:
+                edit.undoIt()
+        self.edits = list()
+        logger.info('%s: %s in %.3fs', self.name, 'done' if completed else '{} at {}/{}'.format(
+            'failed' if self.failed else 'cancelled', self.index, len(self.items)), time.time() - self.start_time)
+        self.finished.emit(completed)
+
+
+class JobProgress(QtWidgets.QWidget):
+    """
+    Progress bar and cancel button of the running job
+    """
+    def __init__(self, parent=None):
+        super(JobProgress, self).__init__(parent)
+        self.job = None
+
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setMaximumHeight(20)
+        self.cancel_pb = QtWidgets.QPushButton('Cancel')
+        self.cancel_pb.setMaximumHeight(20)
+        self.cancel_pb.clicked.connect(self.cancel)
+
+        layout = QtWidgets.QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.cancel_pb)
+        self.hide()
+
+    def is_running(self):
+        return self.job is not None and self.job.running
+
+    def run(self, job):
+        """
+        Start the job and show its progress until it finishes
+        :param job: ChunkedJob
+        """
+        self.job = job
+        self.progress_bar.setFormat('{} %p%'.format(job.name))
+        job.progress.connect(self.set_progress)
+        job.finished.connect(self.job_finished)
+        self.show()
+        job.start()
+
+    def set_progress(self, done, total):
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+
+    def job_finished(self, completed):
+        self.job.deleteLater()
+        self.job = None
+        self.hide()
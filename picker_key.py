@@ -0,0 +1,231 @@
+"""
+Smart key, key only the channels that changed since the last key or bind pose, or that already have curves
+"""
+import time
+from maya import cmds
+from maya.api import OpenMaya, OpenMayaAnim
+
+import picker_manifest
+import picker_pose
+import picker_registry
+import picker_undo
+
+
+tolerance = 1e-5
+key_tables = dict()
+# Channel values per namespace at the last key or bind pose, {namespace: {plug name: value}}
+snapshots = dict()
+
+
+class KeyTable(object):
+    """
+    Keyable channel plugs of the controls of a namespace
+    """
+    def __init__(self, control_list):
+        self.control_list = control_list
+        self.channels = dict()
+
+    def get_channels(self, ctr):
+        """
+        Get the keyable numeric channels of a control, from the rig manifest if the control is in it
+        :param ctr: str
+        :return: list, [(plug name, MPlug), ...]
+        """
+        channels = self.channels.get(ctr)
+        if channels is None:
+            selection = OpenMaya.MSelectionList()
+            selection.add(ctr)
+            fn_node = OpenMaya.MFnDependencyNode(selection.getDependNode(0))
+
+            entry = picker_manifest.get_entry(ctr)
+            if entry is not None:
+                keyable_attrs = entry['keyable']
+            else:
+                picker_undo.count_commands()
+                keyable_attrs = cmds.listAttr(ctr, keyable=True, scalar=True) or list()
+
+            channels = list()
+            for attr in keyable_attrs:
+                attr_obj = fn_node.attribute(attr)
+                if attr_obj.isNull() or picker_pose.get_attribute_default(attr_obj) is None:
+                    continue
+                channels.append(('{}.{}'.format(ctr, attr), fn_node.findPlug(attr_obj, False)))
+            self.channels[ctr] = channels
+        return channels
+
+
+def get_key_table(namespace):
+    """
+    Get the key table of a namespace, rebuilt when the control registry changes
+    :param namespace: str
+    :return: KeyTable
+    """
+    control_list = picker_registry.get_registry().get_controls(namespace, 'all')
+    key_table = key_tables.get(namespace)
+    if key_table is None or key_table.control_list is not control_list:
+        key_table = KeyTable(control_list)
+        key_tables[namespace] = key_table
+    return key_table
+
+
+def take_snapshot(namespace, control_list):
+    """
+    Store the current channel values of the controls given
+    :param namespace: str
+    :param control_list: list
+    """
+    key_table = get_key_table(namespace)
+    snapshot = snapshots.setdefault(namespace, dict())
+    for ctr in control_list:
+        for plug_name, plug in key_table.get_channels(ctr):
+            snapshot[plug_name] = plug.asDouble()
+
+
+def reset_snapshot(namespace=None):
+    """
+    Start the smart key of a rig loaded from its bind pose
+    :param namespace: str, every rig if None
+    """
+    if namespace is None:
+        snapshots.clear()
+    else:
+        snapshots.pop(namespace, None)
+
+
+def take_bind_snapshot(namespace):
+    """
+    Store the bind values of the channels of a rig without setting them, so the smart key of a rig loaded keys the
+    channels that are away from the bind pose. The channels without bind value keep their current value.
+    The bind values do not change with the pose, they are read at the first smart key instead of at load
+    :param namespace: str
+    """
+    key_table = get_key_table(namespace)
+    control_list = key_table.control_list
+    selection = OpenMaya.MSelectionList()
+    for ctr in control_list:
+        selection.add(ctr)
+
+    snapshot = snapshots[namespace] = dict()
+    for i, ctr in enumerate(control_list):
+        node = selection.getDependNode(i)
+        fn_node = OpenMaya.MFnDependencyNode(node)
+        user_channels, skin_pose_data, is_joint = picker_pose.get_bind_data(node, fn_node, ctr)
+        # The channels of the key table have long names
+        bind_values = dict((OpenMaya.MFnAttribute(fn_node.attribute(attr)).name, value) for attr, value
+                           in picker_pose.get_bind_transform_targets(fn_node, skin_pose_data, is_joint))
+        bind_values.update((OpenMaya.MFnAttribute(attr_obj).name, default) for attr_obj, kind, default in user_channels)
+        for plug_name, plug in key_table.get_channels(ctr):
+            value = bind_values.get(plug_name.rsplit('.', 1)[1])
+            snapshot[plug_name] = plug.asDouble() if value is None else float(value)
+
+
+class KeyEdit(object):
+    """
+    Undo record of keys set at the current time through the API, so they are not on the undo queue until the record
+    is committed. The curves created for the channels without keys are kept in a modifier and the keys in a curve change
+    """
+    def __init__(self):
+        self.modifier = OpenMaya.MDGModifier()
+        self.anim_change = OpenMayaAnim.MAnimCurveChange()
+        self.key_count = 0
+
+    def add_keys(self, plugs):
+        """
+        Key the plugs with their current value, the locked plugs are skipped
+        :param plugs: list, [MPlug, ...]
+        """
+        key_time = OpenMayaAnim.MAnimControl.currentTime()
+        for plug in plugs:
+            if plug.isLocked:
+                continue
+            if OpenMayaAnim.MAnimUtil.isAnimated(plug):
+                anim_curve = OpenMayaAnim.MFnAnimCurve(plug)
+            else:
+                picker_undo.count_commands()
+                anim_curve = OpenMayaAnim.MFnAnimCurve()
+                anim_curve.create(plug, OpenMayaAnim.MFnAnimCurve.kAnimCurveUnknown, self.modifier)
+            picker_undo.count_commands()
+            index = anim_curve.find(key_time)
+            if index is None:
+                anim_curve.addKey(key_time, plug.asDouble(), change=self.anim_change)
+            else:
+                anim_curve.setValue(index, plug.asDouble(), self.anim_change)
+            self.key_count += 1
+
+    def redoIt(self):
+        self.modifier.doIt()
+        self.anim_change.redoIt()
+
+    def undoIt(self):
+        self.anim_change.undoIt()
+        self.modifier.undoIt()
+
+
+def get_key_plugs(namespace, control_list):
+    """
+    Get the channels of the controls that changed since the snapshot or have curves, the snapshot is updated.
+    The first snapshot of a rig is its bind pose
+    :param namespace: str
+    :param control_list: list
+    :return: tuple, ([(plug name, MPlug), ...], skipped count)
+    """
+    key_table = get_key_table(namespace)
+    if namespace not in snapshots:
+        take_bind_snapshot(namespace)
+    snapshot = snapshots[namespace]
+
+    key_plugs = list()
+    skipped_count = 0
+    for ctr in control_list:
+        for plug_name, plug in key_table.get_channels(ctr):
+            value = plug.asDouble()
+            previous_value = snapshot.get(plug_name)
+            snapshot[plug_name] = value
+            if plug.isLocked:
+                skipped_count += 1
+                continue
+            if OpenMayaAnim.MAnimUtil.isAnimated(plug):
+                key_plugs.append((plug_name, plug))
+            elif plug.isDestination:
+                # Driven by a constraint or a connection, a key would break it
+                skipped_count += 1
+            elif previous_value is None or abs(value - previous_value) > tolerance:
+                key_plugs.append((plug_name, plug))
+            else:
+                skipped_count += 1
+    return key_plugs, skipped_count
+
+
+def smart_key(namespace, control_list):
+    """
+    Key the channels of the controls that changed since the snapshot or have curves, in a single setKeyframe call.
+    The first snapshot of a rig is its bind pose
+    :param namespace: str
+    :param control_list: list
+    :return: EditReport
+    """
+    return smart_key_rigs([(namespace, control_list)])
+
+
+def smart_key_rigs(rig_controls, key_edit=None):
+    """
+    Smart key the controls of several rigs in a single setKeyframe call
+    :param rig_controls: list, [(namespace, control list), ...]
+    :param key_edit: KeyEdit, the keys are set in the record instead of with setKeyframe if given
+    :return: EditReport
+    """
+    start_time = time.time()
+    key_plugs = list()
+    skipped_count = 0
+    for namespace, control_list in rig_controls:
+        rig_key_plugs, rig_skipped_count = get_key_plugs(namespace, control_list)
+        key_plugs.extend(rig_key_plugs)
+        skipped_count += rig_skipped_count
+
+    if key_edit is not None:
+        key_edit.add_keys([x[1] for x in key_plugs])
+    elif key_plugs:
+        picker_undo.count_commands()
+        cmds.setKeyframe([x[0] for x in key_plugs])
+
+    return picker_pose.EditReport('Smart key', len(key_plugs), skipped_count, time.time() - start_time)
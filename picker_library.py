@@ -0,0 +1,356 @@
+"""
+Pose library stored in a single memory-mapped file.
+The control and user channel names are stored once in the index at the end of the file. Every pose is a block of
+control indices, a float32 array of 9 transform values per control, user channel indices and float32 user values.
+Only the index is read when the library is opened, the pose blocks are read when a pose is applied
+"""
+import os
+import json
+import mmap
+import time
+import array
+import struct
+from maya import cmds
+from maya.api import OpenMaya
+from PySide2 import QtWidgets
+
+import picker_pose
+import picker_registry
+import picker_undo
+
+
+magic = b'PKPL'
+version = 1
+# magic, version, index offset, index size
+header_format = '<4sIQQ'
+header_size = struct.calcsize(header_format)
+pose_transform_attrs = picker_pose.transform_attrs[:9]
+
+
+def get_library_path():
+    """
+    Get the pose library file, PICKER_POSE_LIBRARY overrides the one of the user in the Maya folder
+    :return: str
+    """
+    return os.environ.get('PICKER_POSE_LIBRARY') or os.path.join(cmds.internalVar(userAppDir=True), 'picker',
+                                                                 'poses.pklib')
+
+
+def to_bytes(values, type_code):
+    return array.array(type_code, values).tobytes()
+
+
+class Pose(object):
+    def __init__(self, control_names, transforms, channel_names, channel_values):
+        """
+        :param control_names: list, control names without namespace
+        :param transforms: sequence, 9 values per control, translate rotate scale
+        :param channel_names: list, 'control.attribute' names without namespace
+        :param channel_values: sequence
+        """
+        self.control_names = control_names
+        self.transforms = transforms
+        self.channel_names = channel_names
+        self.channel_values = channel_values
+
+
+class PoseLibrary(object):
+    """
+    Read and write the poses of the library file
+    """
+    def __init__(self, file_path=None):
+        self.file_path = file_path or get_library_path()
+        self.file = None
+        self.map = None
+        self.control_names = list()
+        self.channel_names = list()
+        self.poses = dict()
+        self.open()
+
+    def open(self):
+        """
+        Map the file and read its index
+        """
+        self.close()
+        self.control_names = list()
+        self.channel_names = list()
+        self.poses = dict()
+        if not os.path.isfile(self.file_path) or os.path.getsize(self.file_path) < header_size:
+            return
+
+        self.file = open(self.file_path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        file_magic, file_version, index_offset, index_size = struct.unpack_from(header_format, self.map, 0)
+        if file_magic != magic or file_version != version:
+            self.close()
+            raise ValueError('{} is not a picker pose library'.format(self.file_path))
+
+        index = json.loads(self.map[index_offset:index_offset + index_size].decode('utf-8'))
+        self.control_names = index['controls']
+        self.channel_names = index['channels']
+        self.poses = index['poses']
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def get_pose_names(self):
+        return sorted(self.poses)
+
+    def get_pose(self, pose_name):
+        """
+        Read a pose block from the mapped file
+        :param pose_name: str
+        :return: Pose
+        """
+        offset, control_count, channel_count = self.poses[pose_name]
+        blocks = list()
+        for type_code, count in (('I', control_count), ('f', control_count * 9), ('I', channel_count),
+                                 ('f', channel_count)):
+            block = array.array(type_code)
+            block.frombytes(self.map[offset:offset + count * 4])
+            blocks.append(block)
+            offset += count * 4
+
+        control_names = [self.control_names[x] for x in blocks[0]]
+        channel_names = [self.channel_names[x] for x in blocks[2]]
+        return Pose(control_names, blocks[1].tolist(), channel_names, blocks[3].tolist())
+
+    def get_pose_block(self, pose):
+        """
+        Encode a pose, adding its names to the index
+        :param pose: Pose
+        :return: bytes
+        """
+        control_indices = dict((name, i) for i, name in enumerate(self.control_names))
+        channel_indices = dict((name, i) for i, name in enumerate(self.channel_names))
+        for name in pose.control_names:
+            if name not in control_indices:
+                control_indices[name] = len(self.control_names)
+                self.control_names.append(name)
+        for name in pose.channel_names:
+            if name not in channel_indices:
+                channel_indices[name] = len(self.channel_names)
+                self.channel_names.append(name)
+
+        return b''.join([to_bytes([control_indices[x] for x in pose.control_names], 'I'),
+                         to_bytes(pose.transforms, 'f'),
+                         to_bytes([channel_indices[x] for x in pose.channel_names], 'I'),
+                         to_bytes(pose.channel_values, 'f')])
+
+    def write(self, new_blocks=None, removed=()):
+        """
+        Write the library with the poses kept and the new ones, the existing blocks are copied without decoding
+        :param new_blocks: dict, {pose name: (block bytes, control count, channel count)}
+        :param removed: list, names of the poses removed
+        """
+        new_blocks = new_blocks or dict()
+        folder = os.path.dirname(self.file_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        tmp_path = '{}.{}.tmp'.format(self.file_path, os.getpid())
+        poses = dict()
+        with open(tmp_path, 'wb') as library_file:
+            library_file.write(b'\0' * header_size)
+            offset = header_size
+            for pose_name, (pose_offset, control_count, channel_count) in self.poses.items():
+                if pose_name in removed or pose_name in new_blocks:
+                    continue
+                size = (control_count * 10 + channel_count * 2) * 4
+                library_file.write(self.map[pose_offset:pose_offset + size])
+                poses[pose_name] = [offset, control_count, channel_count]
+                offset += size
+            for pose_name, (block, control_count, channel_count) in new_blocks.items():
+                library_file.write(block)
+                poses[pose_name] = [offset, control_count, channel_count]
+                offset += len(block)
+
+            index = json.dumps({'controls': self.control_names, 'channels': self.channel_names,
+                                'poses': poses}, separators=(',', ':')).encode('utf-8')
+            library_file.write(index)
+            library_file.seek(0)
+            library_file.write(struct.pack(header_format, magic, version, offset, len(index)))
+
+        # The map must be closed before the file is replaced
+        self.close()
+        os.replace(tmp_path, self.file_path)
+        self.open()
+
+    def add_pose(self, pose_name, pose):
+        """
+        Store a pose, replacing the one with the same name
+        :param pose_name: str
+        :param pose: Pose
+        """
+        block = self.get_pose_block(pose)
+        self.write({pose_name: (block, len(pose.control_names), len(pose.channel_names))})
+
+    def remove_pose(self, pose_name):
+        if pose_name in self.poses:
+            self.write(removed=[pose_name])
+
+
+def get_node_channels(ctr):
+    """
+    Get the transform and numeric user channel plugs of a control
+    :param ctr: str
+    :return: tuple, (transform plugs, [(attribute name, MPlug, value kind), ...])
+    """
+    selection = OpenMaya.MSelectionList()
+    selection.add(ctr)
+    fn_node = OpenMaya.MFnDependencyNode(selection.getDependNode(0))
+    transform_plugs = [fn_node.findPlug(x, False) for x in pose_transform_attrs]
+    user_channels = [(OpenMaya.MFnAttribute(attr_obj).name, fn_node.findPlug(attr_obj, False), kind)
+                     for attr_obj, kind, default in picker_pose.get_user_channels(fn_node, ctr)]
+    return transform_plugs, user_channels
+
+
+def capture_pose(namespace, control_list):
+    """
+    Read the pose of the controls given
+    :param namespace: str, removed from the stored names
+    :param control_list: list
+    :return: Pose
+    """
+    control_names = list()
+    transforms = list()
+    channel_names = list()
+    channel_values = list()
+    for ctr in control_list:
+        transform_plugs, user_channels = get_node_channels(ctr)
+        control_name = ctr[len(namespace):]
+        control_names.append(control_name)
+        transforms.extend(plug.asDouble() for plug in transform_plugs)
+        for attr, plug, kind in user_channels:
+            channel_names.append('{}.{}'.format(control_name, attr))
+            channel_values.append(plug.asDouble())
+    return Pose(control_names, transforms, channel_names, channel_values)
+
+
+def apply_pose(pose, namespace, control_names=None, name='Apply pose'):
+    """
+    Set the pose in a single undoable modifier, it must run inside the undo chunk of the caller
+    :param pose: Pose
+    :param namespace: str
+    :param control_names: set, only apply to these controls, without namespace, all the pose controls if None
+    :param name: str, name of the report
+    :return: EditReport
+    """
+    start_time = time.time()
+    engine = picker_pose.BindPoseEngine(list())
+    channel_values = dict(zip(pose.channel_names, pose.channel_values))
+    for i, control_name in enumerate(pose.control_names):
+        if control_names is not None and control_name not in control_names:
+            continue
+        try:
+            transform_plugs, user_channels = get_node_channels('{}{}'.format(namespace, control_name))
+        except RuntimeError:
+            # The control is not in the scene
+            engine.skipped_count += 1
+            continue
+
+        for plug, value in zip(transform_plugs, pose.transforms[i * 9:i * 9 + 9]):
+            engine.add_target(plug, 'double', value)
+        for attr, plug, kind in user_channels:
+            value = channel_values.get('{}.{}'.format(control_name, attr))
+            if value is not None:
+                engine.add_target(plug, kind, value)
+
+    if engine.plugs:
+        picker_undo.commit(engine.build_edit())
+    return picker_pose.EditReport(name, len(engine.plugs), engine.skipped_count, time.time() - start_time)
+
+
+def get_pose_controls(namespace, selected_only=False):
+    """
+    Get the controls of the namespace, or the selected ones
+    :param namespace: str
+    :param selected_only: bool
+    :return: list
+    """
+    control_list = picker_registry.get_registry().get_controls(namespace, 'all')
+    if not selected_only:
+        return control_list
+    control_set = set(control_list)
+    picker_undo.count_commands()
+    return [x for x in cmds.ls(selection=True) or list() if x in control_set]
+
+
+libraries = dict()
+
+
+def get_library(file_path=None):
+    """
+    Get the library of the file given, opened once
+    :param file_path: str, the default library if None
+    :return: PoseLibrary
+    """
+    file_path = file_path or get_library_path()
+    library = libraries.get(file_path)
+    if library is None:
+        library = PoseLibrary(file_path)
+        libraries[file_path] = library
+    return library
+
+
+class PoseLibraryPanel(QtWidgets.QDialog):
+    """
+    List of the library poses with the save and apply buttons of the picker
+    """
+    def __init__(self, picker, parent=None):
+        super(PoseLibraryPanel, self).__init__(parent)
+        self.setWindowTitle('Picker pose library')
+        self.picker = picker
+
+        self.pose_list = QtWidgets.QListWidget()
+        self.pose_list.itemDoubleClicked.connect(lambda item: self.apply_pose(False))
+        self.name_le = QtWidgets.QLineEdit()
+        self.name_le.setPlaceholderText('Pose name')
+        self.pose_list.currentTextChanged.connect(self.name_le.setText)
+
+        buttons = [('Save', lambda: self.save_pose(False)),
+                   ('Save selected', lambda: self.save_pose(True)),
+                   ('Apply', lambda: self.apply_pose(False)),
+                   ('Apply to selected', lambda: self.apply_pose(True)),
+                   ('Delete', self.remove_pose)]
+        buttons_layout = QtWidgets.QGridLayout()
+        for i, (label, slot) in enumerate(buttons):
+            push_button = QtWidgets.QPushButton(label)
+            push_button.clicked.connect(slot)
+            buttons_layout.addWidget(push_button, i // 2, i % 2)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.pose_list)
+        layout.addWidget(self.name_le)
+        layout.addLayout(buttons_layout)
+        self.resize(280, 400)
+
+    def refresh(self):
+        current_name = self.name_le.text()
+        self.pose_list.clear()
+        self.pose_list.addItems(get_library().get_pose_names())
+        self.name_le.setText(current_name)
+
+    def save_pose(self, selected_only):
+        pose_name = self.name_le.text().strip()
+        if pose_name:
+            self.picker.save_pose(pose_name, selected_only)
+            self.refresh()
+
+    def apply_pose(self, selected_only):
+        pose_name = self.name_le.text().strip()
+        if pose_name in get_library().poses:
+            self.picker.apply_pose(pose_name, selected_only)
+
+    def remove_pose(self):
+        get_library().remove_pose(self.name_le.text().strip())
+        self.refresh()
+
+    def showEvent(self, event):
+        self.refresh()
+        super(PoseLibraryPanel, self).showEvent(event)
@@ -0,0 +1,156 @@
+"""
+Load picker.ui through a compiled Python module cached on disk by the hash of the .ui file.
+The cache folder belongs to the user and every module is checked against the hash written in its first line
+before it runs
+"""
+import os
+import io
+import time
+import types
+import hashlib
+import subprocess
+from PySide2 import QtCore, QtWidgets, QtUiTools
+
+import picker_cache
+
+
+compiled_modules = dict()
+
+
+def get_source_hash(code):
+    """
+    :param code: str
+    :return: str
+    """
+    return hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+
+def read_compiled_module(py_path):
+    """
+    Read the code of a compiled module, the first line has the hash of the rest of the file
+    :param py_path: str
+    :return: str or None if the file does not exist or does not match its hash
+    """
+    try:
+        with open(py_path, 'r') as py_file:
+            header = py_file.readline()
+            code = py_file.read()
+    except (IOError, OSError):
+        return None
+    if header.strip() != '# sha256: {}'.format(get_source_hash(code)):
+        return None
+    return code
+
+
+def compile_ui(ui_path, py_path):
+    """
+    Compile the .ui file to a Python module with pyside2uic or the uic executable
+    :param ui_path: str
+    :param py_path: str
+    :return: str, code of the module or None if it can not be compiled
+    """
+    try:
+        from pyside2uic import compileUi
+    except ImportError:
+        compileUi = None
+
+    if compileUi:
+        py_file = io.StringIO()
+        with open(ui_path, 'r') as ui_file:
+            compileUi(ui_file, py_file)
+        code = py_file.getvalue()
+    else:
+        code = None
+        for command in (['pyside2-uic', ui_path], ['uic', '-g', 'python', ui_path]):
+            try:
+                code = subprocess.check_output(command, stderr=subprocess.STDOUT).decode('utf-8')
+                break
+            except (OSError, subprocess.CalledProcessError):
+                continue
+        if code is None:
+            return None
+
+    # Write to a temporary file first so a half written module is never read
+    tmp_path = '{}.{}.tmp'.format(py_path, os.getpid())
+    with open(tmp_path, 'w') as py_file:
+        py_file.write('# sha256: {}\n'.format(get_source_hash(code)))
+        py_file.write(code)
+    os.replace(tmp_path, py_path)
+    return code
+
+
+def get_compiled_module(ui_path):
+    """
+    Get the compiled module of the .ui file, compiling it if it is not in the cache
+    :param ui_path: str
+    :return: module or None if the .ui can not be compiled or the cache folder is shared with other users
+    """
+    ui_hash = picker_cache.get_file_hash(ui_path)
+    module = compiled_modules.get(ui_hash)
+    if module is not None:
+        return module
+
+    cache_folder = picker_cache.get_cache_folder()
+    if not picker_cache.is_private_folder(cache_folder):
+        return None
+
+    module_name = 'picker_ui_{}'.format(ui_hash)
+    py_path = os.path.join(cache_folder, '{}.py'.format(module_name))
+    # The code checked is the one that runs, the file is not opened again
+    code = read_compiled_module(py_path) or compile_ui(ui_path, py_path)
+    if code is None:
+        return None
+
+    module = types.ModuleType(module_name)
+    module.__file__ = py_path
+    exec(compile(code, py_path, 'exec'), module.__dict__)
+    compiled_modules[ui_hash] = module
+    return module
+
+
+def load_ui(ui_path, parent=None, timings=None):
+    """
+    Build the widget tree of the .ui file, from the compiled module if possible
+    :param ui_path: str
+    :param parent: QWidget
+    :param timings: dict, the parse and build times are stored in it if given
+    :return: QWidget
+    """
+    timings = timings if timings is not None else dict()
+
+    start_time = time.time()
+    module = get_compiled_module(ui_path)
+    timings['parse'] = time.time() - start_time
+
+    start_time = time.time()
+    if module is not None:
+        ui_class = [getattr(module, x) for x in dir(module) if x.startswith('Ui_')][0]
+        ui = QtWidgets.QMainWindow(parent)
+        ui.ui_form = ui_class()
+        ui.ui_form.setupUi(ui)
+    else:
+        loader = QtUiTools.QUiLoader()
+        ui_file = QtCore.QFile(ui_path)
+        ui_file.open(QtCore.QFile.ReadOnly)
+        ui = loader.load(ui_file, parent)
+        ui_file.close()
+    timings['build'] = time.time() - start_time
+
+    return ui
+
+
+def get_children(root_widget):
+    """
+    Get all the children of a widget and the map by name in a single traversal
+    :param root_widget: QWidget
+    :return: tuple, (list of child widgets, dict of objects by name)
+    """
+    child_widgets = list()
+    name_map = dict()
+    for child in root_widget.findChildren(QtCore.QObject):
+        if isinstance(child, QtWidgets.QWidget):
+            child_widgets.append(child)
+        name = child.objectName()
+        if name:
+            name_map[name] = child
+    return child_widgets, name_map
@@ -0,0 +1,336 @@
+"""
+Rig manifest, the static facts of a rig gathered once so the actions do not query the attributes of every control:
+the group lists, the numeric user channels and their defaults, the keyable channels, the bind matrices and the mirror
+pairs. The locks can change in the scene, they are read from the plugs.
+
+The manifest is written on the modules group at rig publish with write_manifest, otherwise it is built on first use
+and kept in a sidecar file of the cache folder for referenced rigs. A manifest is used if its data matches the hash
+stored with it. The hash covers the rig the manifest was built for, the publish stamp or the path and mtime of the
+rig file of a sidecar, and the manifest of a rig in the scene must have the controls of the rig
+"""
+import os
+import json
+import time
+import zlib
+import base64
+import hashlib
+from maya import cmds
+from maya.api import OpenMaya
+
+import picker_cache
+import picker_registry
+import picker_undo
+
+
+manifest_attr = 'pickerManifest'
+manifest_version = 2
+# {namespace: RigManifest}, loaded again when the control registry is invalidated
+manifests = dict()
+
+
+def get_control_name(namespace, ctr):
+    """
+    :param namespace: str
+    :param ctr: str
+    :return: str, name without path and namespace
+    """
+    return ctr.split('|')[-1][len(namespace):]
+
+
+def get_data_hash(data):
+    """
+    Get the hash of the facts stored in a manifest
+    :param data: dict
+    :return: str
+    """
+    text = json.dumps([data.get('rig'), data.get('groups'), data.get('controls'), data.get('mirror')],
+                      sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def is_valid_manifest(data, namespace, control_list=None, rig_key=None):
+    """
+    :param data: dict or None
+    :param namespace: str
+    :param control_list: list, the controls the manifest must have, not checked if None
+    :param rig_key: str, the rig file the manifest must have been built for, not checked if None
+    :return: bool, True if the data matches its hash, its rig file and has the controls of the list
+    """
+    if data is None or data.get('hash') != get_data_hash(data):
+        return False
+    if rig_key is not None and data.get('rig') != rig_key:
+        return False
+    if control_list is None:
+        return True
+    return set(data.get('controls') or dict()) == set(get_control_name(namespace, x) for x in control_list)
+
+
+def encode_manifest(data):
+    """
+    :param data: dict
+    :return: str, compressed JSON in base64 so it can be stored in a string attribute
+    """
+    text = json.dumps(data, separators=(',', ':'))
+    return base64.b64encode(zlib.compress(text.encode('utf-8'))).decode('ascii')
+
+
+def decode_manifest(text):
+    """
+    :param text: str
+    :return: dict or None if the text is not a manifest of this version
+    """
+    try:
+        data = json.loads(zlib.decompress(base64.b64decode(text)).decode('utf-8'))
+    except (ValueError, TypeError, zlib.error):
+        return None
+    if not isinstance(data, dict) or data.get('version') != manifest_version:
+        return None
+    return data
+
+
+class RigManifest(object):
+    """
+    Static facts of the controls of a rig, the controls are stored without namespace
+    """
+    def __init__(self, namespace, data, generation):
+        """
+        :param namespace: str
+        :param data: dict
+        :param generation: int, control registry generation the manifest was loaded at
+        """
+        self.namespace = namespace
+        self.generation = generation
+        self.data_hash = data['hash']
+        self.groups = data['groups']
+        self.controls = data['controls']
+        self.mirror_pairs = data['mirror']
+        self.group_lists = dict()
+
+    def get_entry(self, ctr):
+        """
+        :param ctr: str
+        :return: dict, {'user': [[attribute name, value kind, default value], ...], 'keyable': [attribute name, ...],
+            'bind': skin pose matrix or None, 'joint': bool} or None if the control is not in the manifest
+        """
+        return self.controls.get(get_control_name(self.namespace, ctr))
+
+    def get_group(self, group):
+        """
+        :param group: str, 'all', 'body' or 'face'
+        :return: list, controls with namespace, shared so it must not be modified
+        """
+        group_list = self.group_lists.get(group)
+        if group_list is None:
+            group_list = ['{}{}'.format(self.namespace, x) for x in self.groups[group]]
+            self.group_lists[group] = group_list
+        return group_list
+
+    def get_opposites(self):
+        """
+        :return: dict, {control: opposite control} with namespace
+        """
+        return dict(('{}{}'.format(self.namespace, x), '{}{}'.format(self.namespace, y))
+                    for x, y in self.mirror_pairs.items())
+
+
+def build_manifest_data(namespace, control_list, rig_key=None):
+    """
+    Query the static facts of every control of a rig
+    :param namespace: str
+    :param control_list: list
+    :param rig_key: str, publish stamp or rig file key of get_rig_key
+    :return: dict
+    """
+    # The queries of the picker modules are imported here, as they read their facts from the manifest
+    import picker_mirror
+    import picker_pose
+
+    registry = picker_registry.get_registry()
+    groups = dict((x, [get_control_name(namespace, y) for y in registry.get_controls(namespace, x)])
+                  for x in picker_registry.group_names)
+
+    selection = OpenMaya.MSelectionList()
+    for ctr in control_list:
+        selection.add(ctr)
+
+    controls = dict()
+    for i, ctr in enumerate(control_list):
+        node = selection.getDependNode(i)
+        fn_node = OpenMaya.MFnDependencyNode(node)
+
+        user_channels = [[OpenMaya.MFnAttribute(attr_obj).name, kind, default]
+                         for attr_obj, kind, default in picker_pose.query_user_channels(fn_node, ctr)]
+        keyable_attrs = list()
+        picker_undo.count_commands()
+        for attr in cmds.listAttr(ctr, keyable=True, scalar=True) or list():
+            attr_obj = fn_node.attribute(attr)
+            if not attr_obj.isNull() and picker_pose.get_attribute_default(attr_obj) is not None:
+                keyable_attrs.append(attr)
+        bind_matrix = None
+        if fn_node.hasAttribute(picker_pose.skin_pose_attr):
+            bind_matrix = picker_pose.parse_skin_pose_data(
+                fn_node.findPlug(picker_pose.skin_pose_attr, False).asString())
+
+        controls[get_control_name(namespace, ctr)] = {'user': user_channels, 'keyable': keyable_attrs,
+                                                      'bind': bind_matrix, 'joint': node.hasFn(OpenMaya.MFn.kJoint)}
+
+    mirror_pairs = dict()
+    for control_name in groups['all']:
+        opposite = picker_mirror.MirrorTable.get_opposite_name(control_name)
+        if opposite in controls:
+            mirror_pairs[control_name] = opposite
+
+    data = {'version': manifest_version, 'rig': rig_key, 'groups': groups, 'controls': controls,
+            'mirror': mirror_pairs}
+    data['hash'] = get_data_hash(data)
+    return data
+
+
+def get_modules_node(namespace):
+    """
+    :param namespace: str
+    :return: MFnDependencyNode of the modules group or None if it does not exist
+    """
+    selection = OpenMaya.MSelectionList()
+    try:
+        selection.add('{}{}'.format(namespace, picker_registry.group_names['all']))
+    except RuntimeError:
+        return None
+    return OpenMaya.MFnDependencyNode(selection.getDependNode(0))
+
+
+def read_node_manifest(fn_node):
+    """
+    :param fn_node: MFnDependencyNode, modules group
+    :return: dict or None
+    """
+    if not fn_node.hasAttribute(manifest_attr):
+        return None
+    return decode_manifest(fn_node.findPlug(manifest_attr, False).asString())
+
+
+def get_rig_key(fn_node):
+    """
+    Get the key of the rig file of a referenced rig, its path and mtime
+    :param fn_node: MFnDependencyNode, modules group
+    :return: str or None if the rig is not referenced, as it can change in the scene
+    """
+    if not fn_node.isFromReferencedFile:
+        return None
+    picker_undo.count_commands()
+    rig_path = cmds.referenceQuery(fn_node.name(), filename=True, withoutCopyNumber=True)
+    rig_mtime = os.path.getmtime(rig_path) if os.path.isfile(rig_path) else 0.0
+    return '{}|{}'.format(rig_path, rig_mtime)
+
+
+def get_sidecar_path(rig_key):
+    """
+    Get the sidecar file of a referenced rig
+    :param rig_key: str, see get_rig_key
+    :return: str
+    """
+    manifest_folder = os.path.join(picker_cache.get_cache_folder(), 'manifests')
+    os.makedirs(manifest_folder, exist_ok=True)
+    return os.path.join(manifest_folder, '{}.manifest'.format(hashlib.sha1(rig_key.encode('utf-8')).hexdigest()))
+
+
+def read_sidecar(sidecar_path):
+    """
+    :param sidecar_path: str
+    :return: dict or None
+    """
+    try:
+        with open(sidecar_path, 'r') as sidecar_file:
+            return decode_manifest(sidecar_file.read())
+    except (IOError, OSError):
+        return None
+
+
+def write_sidecar(sidecar_path, data):
+    """
+    Write the sidecar file through a temporary file, so a picker reading it never sees a partial manifest
+    :param sidecar_path: str
+    :param data: dict
+    """
+    temp_path = '{}.{}.tmp'.format(sidecar_path, os.getpid())
+    try:
+        with open(temp_path, 'w') as sidecar_file:
+            sidecar_file.write(encode_manifest(data))
+        os.replace(temp_path, sidecar_path)
+    except (IOError, OSError):
+        pass
+
+
+def load_manifest(namespace, generation):
+    """
+    Load the manifest of a rig from its modules group or its sidecar file, it is built if none of them matches.
+    The controls of a referenced rig are not queried unless the manifest is built
+    :param namespace: str
+    :param generation: int, control registry generation
+    :return: RigManifest or None if the rig has no modules group
+    """
+    fn_node = get_modules_node(namespace)
+    if fn_node is None:
+        return None
+
+    rig_key = get_rig_key(fn_node)
+    sidecar_path = get_sidecar_path(rig_key) if rig_key else None
+    # The controls of a rig in the scene can change after its manifest was written, a referenced rig keeps them
+    control_list = None if rig_key else picker_registry.get_registry().get_controls(namespace, 'all')
+    data = read_node_manifest(fn_node)
+    if not is_valid_manifest(data, namespace, control_list):
+        data = read_sidecar(sidecar_path) if sidecar_path else None
+        if not is_valid_manifest(data, namespace, control_list, rig_key):
+            if control_list is None:
+                control_list = picker_registry.get_registry().get_controls(namespace, 'all')
+            data = build_manifest_data(namespace, control_list, rig_key)
+            if sidecar_path:
+                write_sidecar(sidecar_path, data)
+    return RigManifest(namespace, data, generation)
+
+
+def get_manifest(namespace):
+    """
+    Get the manifest of a rig, loaded once per control registry generation
+    :param namespace: str
+    :return: RigManifest or None if the namespace has no rig
+    """
+    generation = picker_registry.get_registry().generation
+    manifest = manifests.get(namespace)
+    if manifest is None or manifest.generation != generation:
+        manifest = load_manifest(namespace, generation)
+        manifests[namespace] = manifest
+    return manifest
+
+
+def get_entry(ctr):
+    """
+    Get the manifest entry of a control, see RigManifest.get_entry
+    :param ctr: str
+    :return: dict or None if the control is not in the manifest of its rig
+    """
+    manifest = get_manifest(picker_registry.get_node_namespace(ctr))
+    return manifest.get_entry(ctr) if manifest is not None else None
+
+
+def write_manifest(namespace=''):
+    """
+    Build the manifest of a rig and store it on its modules group, run at rig publish
+    :param namespace: str
+    :return: str, report
+    """
+    modules_grp = '{}{}'.format(namespace, picker_registry.group_names['all'])
+    fn_node = get_modules_node(namespace)
+    if fn_node is None:
+        return 'No {} group, the manifest was not written'.format(modules_grp)
+
+    control_list = picker_registry.get_registry().get_controls(namespace, 'all')
+    data = build_manifest_data(namespace, control_list, 'published {}'.format(time.strftime('%Y-%m-%d %H:%M:%S')))
+    text = encode_manifest(data)
+    if not fn_node.hasAttribute(manifest_attr):
+        picker_undo.count_commands()
+        cmds.addAttr(modules_grp, longName=manifest_attr, dataType='string')
+    picker_undo.count_commands()
+    cmds.setAttr('{}.{}'.format(modules_grp, manifest_attr), text, type='string')
+    manifests[namespace] = RigManifest(namespace, data, picker_registry.get_registry().generation)
+    return 'Manifest of {} controls written, {} characters'.format(len(control_list), len(text))
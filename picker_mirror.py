@@ -0,0 +1,540 @@
+"""
+Flip and mirror poses from a mirror pair table computed once per namespace
+"""
+import time
+import itertools
+import collections
+from maya import cmds
+from maya.api import OpenMaya, OpenMayaAnim
+
+import picker_manifest
+import picker_pose
+import picker_registry
+import picker_undo
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Channels negated on the center controls for every mirror axis
+mirror_axis_signs = {'x': {'tx': -1, 'ry': -1, 'rz': -1},
+                     'y': {'ty': -1, 'rx': -1, 'rz': -1},
+                     'z': {'tz': -1, 'rx': -1, 'ry': -1}}
+opposite_sides = {'l': 'r', 'r': 'l'}
+# Compound plugs of the transform channels, in the order of picker_pose.transform_attrs
+transform_compounds = ['translate', 'rotate', 'scale']
+mirror_tables = dict()
+# MFnAnimCurve tangent type of the keyTangent type names, resolved when the curves are written
+tangent_type_names = {'auto': 'kTangentAuto', 'spline': 'kTangentSmooth', 'linear': 'kTangentLinear',
+                      'flat': 'kTangentFlat', 'step': 'kTangentStep', 'stepnext': 'kTangentStepNext',
+                      'fixed': 'kTangentFixed', 'clamped': 'kTangentClamped', 'plateau': 'kTangentPlateau'}
+
+
+def get_side(ctr):
+    """
+    Get the side token of a control name, e.g. 'l' for 'hand_l_ctr'
+    :param ctr: str
+    :return: str or None
+    """
+    name_parts = ctr.split('|')[-1].split('_')
+    return name_parts[-2] if len(name_parts) > 2 else None
+
+
+class MirrorTable(object):
+    """
+    Opposite controls and channel plugs of the controls of a namespace
+    """
+    def __init__(self, control_list, opposites=None):
+        """
+        :param control_list: list
+        :param opposites: dict, {control: opposite control} of the rig manifest, found from the names if None
+        """
+        self.control_list = control_list
+        self.opposites = dict()
+        self.channels = dict()
+        self.compound_plugs = dict()
+        if opposites is not None:
+            self.opposites.update(opposites)
+            return
+
+        control_set = set(control_list)
+        for ctr in control_list:
+            opposite = self.get_opposite_name(ctr)
+            if opposite in control_set:
+                self.opposites[ctr] = opposite
+
+    @staticmethod
+    def get_opposite_name(ctr):
+        side = get_side(ctr)
+        if side not in opposite_sides:
+            return None
+        return ctr.replace('_{}_'.format(side), '_{}_'.format(opposite_sides[side]))
+
+    def get_opposite(self, ctr):
+        """
+        Get the opposite control, controls outside of the modules group are resolved once by name
+        :param ctr: str
+        :return: str or None for center controls
+        """
+        if ctr not in self.opposites:
+            opposite = self.get_opposite_name(ctr)
+            if opposite:
+                picker_undo.count_commands()
+            self.opposites[ctr] = opposite if opposite and cmds.objExists(opposite) else None
+        return self.opposites[ctr]
+
+    def get_channels(self, ctr):
+        """
+        Get the transform and numeric user channels of a control
+        :param ctr: str
+        :return: OrderedDict, {attribute name: (MPlug, value kind)}
+        """
+        channels = self.channels.get(ctr)
+        if channels is None:
+            selection = OpenMaya.MSelectionList()
+            selection.add(ctr)
+            fn_node = OpenMaya.MFnDependencyNode(selection.getDependNode(0))
+
+            channels = collections.OrderedDict()
+            for attr in picker_pose.transform_attrs:
+                channels[attr] = (fn_node.findPlug(attr, False), 'double')
+            for attr_obj, kind, default in picker_pose.get_user_channels(fn_node, ctr):
+                channels[OpenMaya.MFnAttribute(attr_obj).name] = (fn_node.findPlug(attr_obj, False), kind)
+            self.channels[ctr] = channels
+            self.compound_plugs[ctr] = [fn_node.findPlug(x, False) for x in transform_compounds]
+        return channels
+
+    def read_values(self, ctr):
+        """
+        Read the values of all the channels of a control in their order, the transform channels are read three at a
+        time from their compound plug
+        :param ctr: str
+        :return: list
+        """
+        channels = self.get_channels(ctr)
+        values = list()
+        for compound_plug in self.compound_plugs[ctr]:
+            values.extend(OpenMaya.MFnNumericData(compound_plug.asMObject()).getData())
+        values.extend(plug.asDouble() for plug, kind in itertools.islice(channels.values(), len(picker_pose.transform_attrs), None))
+        return values
+
+
+def get_mirror_table(namespace):
+    """
+    Get the mirror table of a namespace, rebuilt when the control registry changes
+    :param namespace: str
+    :return: MirrorTable
+    """
+    try:
+        control_list = picker_registry.get_registry().get_controls(namespace, 'all')
+    except ValueError:
+        control_list = list()
+
+    mirror_table = mirror_tables.get(namespace)
+    if mirror_table is None or mirror_table.control_list is not control_list:
+        manifest = picker_manifest.get_manifest(namespace)
+        mirror_table = MirrorTable(control_list, manifest.get_opposites() if manifest is not None else None)
+        mirror_tables[namespace] = mirror_table
+    return mirror_table
+
+
+class MirrorEngine(object):
+    """
+    Read all the source channels in one pass, compute the mirrored values in bulk and write them in a single
+    undoable modifier
+    """
+    def __init__(self, mirror_axis='x', side_sign_rules=None):
+        """
+        :param mirror_axis: str, 'x', 'y' or 'z'
+        :param side_sign_rules: dict, {attribute name: sign} applied when copying between opposite controls
+        """
+        self.center_sign_rules = mirror_axis_signs[mirror_axis]
+        self.side_sign_rules = side_sign_rules or dict()
+        self.source_plugs = list()
+        # Mirror table of every source control and the index of every source channel in the channels of its control
+        self.source_controls = collections.OrderedDict()
+        self.source_indexes = list()
+        self.target_plugs = list()
+        self.target_kinds = list()
+        self.attributes = list()
+        self.signs = list()
+        self.skipped_count = 0
+
+    def add_copy(self, mirror_table, source, target, sign_rules, transform_only=False):
+        """
+        Copy the channels of the source to the target multiplied by the sign rules
+        :param mirror_table: MirrorTable
+        :param source: str
+        :param target: str
+        :param sign_rules: dict
+        :param transform_only: bool, skip the user attributes
+        """
+        target_channels = mirror_table.get_channels(target)
+        for index, (attr, (source_plug, kind)) in enumerate(mirror_table.get_channels(source).items()):
+            if transform_only and attr not in picker_pose.transform_attrs:
+                continue
+            if attr not in target_channels:
+                continue
+            target_plug, target_kind = target_channels[attr]
+            if target_plug.isFreeToChange() != OpenMaya.MPlug.kFreeToChange:
+                self.skipped_count += 1
+                continue
+            self.source_plugs.append(source_plug)
+            self.source_controls[source] = mirror_table
+            self.source_indexes.append((source, index))
+            self.target_plugs.append(target_plug)
+            self.target_kinds.append(target_kind)
+            self.attributes.append(attr)
+            self.signs.append(sign_rules.get(attr, 1))
+
+    def gather(self, node_list, flip=True):
+        """
+        Collect the copies of the nodes given, every pair is processed once
+        :param node_list: list
+        :param flip: bool, swap the pairs and flip the center controls, if False mirror the selected side
+        """
+        done = set()
+        for node in node_list:
+            if node in done:
+                continue
+            mirror_table = get_mirror_table(picker_registry.get_node_namespace(node))
+            opposite = mirror_table.get_opposite(node)
+            if opposite is None:
+                done.add(node)
+                if flip and get_side(node) == 'c':
+                    self.add_copy(mirror_table, node, node, self.center_sign_rules, transform_only=True)
+                continue
+
+            done.update((node, opposite))
+            self.add_copy(mirror_table, node, opposite, self.side_sign_rules)
+            if flip:
+                self.add_copy(mirror_table, opposite, node, self.side_sign_rules)
+
+    def compute(self):
+        """
+        Read the channel values of every source control at once and apply the signs
+        :return: list
+        """
+        control_values = list()
+        offsets = dict()
+        for ctr, mirror_table in self.source_controls.items():
+            offsets[ctr] = len(control_values)
+            control_values.extend(mirror_table.read_values(ctr))
+        indexes = [offsets[ctr] + index for ctr, index in self.source_indexes]
+        if numpy is None:
+            return [control_values[index] * sign for index, sign in zip(indexes, self.signs)]
+
+        values = numpy.array(control_values, dtype=numpy.float64)[indexes]
+        values *= numpy.array(self.signs, dtype=numpy.float64)
+        return values.tolist()
+
+    def apply(self, node_list, flip=True):
+        """
+        Flip or mirror the nodes given, it must run inside the undo chunk of the caller
+        :param node_list: list
+        :param flip: bool
+        :return: EditReport
+        """
+        start_time = time.time()
+        self.gather(node_list, flip)
+        if self.target_plugs:
+            values = self.compute()
+            picker_undo.commit(picker_pose.PlugValueEdit(self.target_plugs, self.target_kinds, values))
+
+        return picker_pose.EditReport('Flip pose' if flip else 'Mirror pose', len(self.target_plugs),
+                                      self.skipped_count, time.time() - start_time)
+
+
+def flip_pose(node_list, mirror_axis='x', side_sign_rules=None):
+    """
+    Swap the pose of the opposite controls and flip the center controls
+    :param node_list: list
+    :param mirror_axis: str, 'x', 'y' or 'z'
+    :param side_sign_rules: dict, {attribute name: sign}
+    :return: EditReport
+    """
+    return MirrorEngine(mirror_axis, side_sign_rules).apply(node_list, flip=True)
+
+
+def mirror_pose(node_list, mirror_axis='x', side_sign_rules=None):
+    """
+    Copy the pose of the controls given to their opposite controls
+    :param node_list: list
+    :param mirror_axis: str, 'x', 'y' or 'z'
+    :param side_sign_rules: dict, {attribute name: sign}
+    :return: EditReport
+    """
+    return MirrorEngine(mirror_axis, side_sign_rules).apply(node_list, flip=False)
+
+
+class CurveKeys(object):
+    """
+    Keys of an anim curve inside a frame range, as parallel arrays in UI units
+    """
+    def __init__(self, times, values, in_types, out_types, in_angles, out_angles):
+        self.times = times
+        self.values = values
+        self.in_types = in_types
+        self.out_types = out_types
+        self.in_angles = in_angles
+        self.out_angles = out_angles
+
+    def __len__(self):
+        return len(self.times)
+
+
+def read_curve_keys(plug_name, start_frame, end_frame):
+    """
+    Query the keys of the curve of a plug in the frame range, every array is read in a single command
+    :param plug_name: str
+    :param start_frame: float
+    :param end_frame: float
+    :return: CurveKeys or None if the plug has no key in the range
+    """
+    frame_range = (start_frame, end_frame)
+    picker_undo.count_commands()
+    times = cmds.keyframe(plug_name, query=True, time=frame_range, timeChange=True)
+    if not times:
+        return None
+    picker_undo.count_commands(5)
+    return CurveKeys(times, cmds.keyframe(plug_name, query=True, time=frame_range, valueChange=True),
+                     cmds.keyTangent(plug_name, query=True, time=frame_range, inTangentType=True),
+                     cmds.keyTangent(plug_name, query=True, time=frame_range, outTangentType=True),
+                     cmds.keyTangent(plug_name, query=True, time=frame_range, inAngle=True),
+                     cmds.keyTangent(plug_name, query=True, time=frame_range, outAngle=True))
+
+
+def transform_curve_keys(curve_keys_list, signs, offsets, time_offset=0.0, start_frame=None, end_frame=None):
+    """
+    Apply the sign and offset of every curve to its values, the sign to its tangent angles, and shift its times.
+    All the keys are processed as single arrays
+    :param curve_keys_list: list, [CurveKeys, ...]
+    :param signs: list, sign of every curve
+    :param offsets: list, value offset of every curve
+    :param time_offset: float, the shifted keys are wrapped inside the frame range, e.g. half a cycle
+    :param start_frame: float
+    :param end_frame: float
+    :return: list, [CurveKeys, ...], the keys of every curve sorted by time without duplicated times
+    """
+    if numpy is None:
+        return [transform_keys(x, sign, offset, time_offset, start_frame, end_frame)
+                for x, sign, offset in zip(curve_keys_list, signs, offsets)]
+    if not curve_keys_list:
+        return list()
+
+    counts = [len(x) for x in curve_keys_list]
+    key_signs = numpy.repeat(numpy.array(signs, dtype=numpy.float64), counts)
+    key_offsets = numpy.repeat(numpy.array(offsets, dtype=numpy.float64), counts)
+
+    def concatenate(name, dtype=numpy.float64):
+        return numpy.concatenate([numpy.asarray(getattr(x, name), dtype=dtype) for x in curve_keys_list])
+
+    times = concatenate('times')
+    if time_offset:
+        times = start_frame + numpy.mod(times - start_frame + time_offset, end_frame - start_frame)
+    values = concatenate('values') * key_signs + key_offsets
+    in_angles = concatenate('in_angles') * key_signs
+    out_angles = concatenate('out_angles') * key_signs
+    in_types = concatenate('in_types', object)
+    out_types = concatenate('out_types', object)
+
+    result = list()
+    split_indices = numpy.cumsum(counts)[:-1]
+    for curve_arrays in zip(*(numpy.split(x, split_indices)
+                              for x in (times, values, in_types, out_types, in_angles, out_angles))):
+        # Sort by time, a key wrapped onto the time of another key is dropped
+        unique_times, indices = numpy.unique(curve_arrays[0], return_index=True)
+        result.append(CurveKeys(unique_times, *(x[indices] for x in curve_arrays[1:])))
+    return result
+
+
+def transform_keys(curve_keys, sign, offset, time_offset=0.0, start_frame=None, end_frame=None):
+    """
+    transform_curve_keys of a single curve without numpy
+    :return: CurveKeys
+    """
+    keys = dict()
+    for key in zip(curve_keys.times, curve_keys.values, curve_keys.in_types, curve_keys.out_types,
+                   curve_keys.in_angles, curve_keys.out_angles):
+        key_time = key[0]
+        if time_offset:
+            key_time = start_frame + (key_time - start_frame + time_offset) % (end_frame - start_frame)
+        keys.setdefault(key_time, (key[1] * sign + offset, key[2], key[3], key[4] * sign, key[5] * sign))
+    sorted_times = sorted(keys)
+    return CurveKeys(sorted_times, *[list(x) for x in zip(*(keys[x] for x in sorted_times))])
+
+
+def remove_range_keys(anim_curve, start_frame, end_frame, anim_change):
+    """
+    Remove the keys of the curve in the frame range, the keys around it are kept
+    :param anim_curve: MFnAnimCurve
+    :param start_frame: float
+    :param end_frame: float
+    :param anim_change: MAnimCurveChange
+    """
+    time_unit = OpenMaya.MTime.uiUnit()
+    index = anim_curve.findClosest(OpenMaya.MTime(end_frame, time_unit))
+    if anim_curve.numKeys and anim_curve.input(index).asUnits(time_unit) > end_frame:
+        index -= 1
+    while index >= 0 and anim_curve.numKeys and anim_curve.input(index).asUnits(time_unit) >= start_frame:
+        picker_undo.count_commands()
+        anim_curve.remove(index, anim_change)
+        index -= 1
+
+
+def write_curve_keys(plug, curve_keys, start_frame, end_frame, anim_change):
+    """
+    Replace the keys of the curve of the plug in the frame range, the keys are added in a single call and only
+    the keys whose tangents differ from the first key, or are fixed, are edited one by one
+    :param plug: MPlug, connected to an anim curve
+    :param curve_keys: CurveKeys
+    :param start_frame: float
+    :param end_frame: float
+    :param anim_change: MAnimCurveChange
+    """
+    time_unit = OpenMaya.MTime.uiUnit()
+    anim_curve = OpenMayaAnim.MFnAnimCurve(plug)
+    remove_range_keys(anim_curve, start_frame, end_frame, anim_change)
+
+    # The keys were read in UI units
+    curve_type = anim_curve.animCurveType
+    if curve_type == OpenMayaAnim.MFnAnimCurve.kAnimCurveTA:
+        unit_factor = OpenMaya.MAngle.uiToInternal(1.0)
+    elif curve_type == OpenMayaAnim.MFnAnimCurve.kAnimCurveTL:
+        unit_factor = OpenMaya.MDistance.uiToInternal(1.0)
+    else:
+        unit_factor = 1.0
+
+    def get_tangent_type(type_name):
+        return getattr(OpenMayaAnim.MFnAnimCurve, tangent_type_names.get(type_name, 'kTangentAuto'))
+
+    times = [OpenMaya.MTime(float(x), time_unit) for x in curve_keys.times]
+    picker_undo.count_commands()
+    anim_curve.addKeys(OpenMaya.MTimeArray(times), OpenMaya.MDoubleArray([x * unit_factor for x in curve_keys.values]),
+                       get_tangent_type(curve_keys.in_types[0]), get_tangent_type(curve_keys.out_types[0]),
+                       True, anim_change)
+
+    first_types = (curve_keys.in_types[0], curve_keys.out_types[0])
+    for key_time, in_type, out_type, in_angle, out_angle in zip(times, curve_keys.in_types, curve_keys.out_types,
+                                                               curve_keys.in_angles, curve_keys.out_angles):
+        if (in_type, out_type) == first_types and 'fixed' not in first_types:
+            continue
+        key_index = anim_curve.find(key_time)
+        picker_undo.count_commands(2)
+        anim_curve.setInTangentType(key_index, get_tangent_type(in_type), anim_change)
+        anim_curve.setOutTangentType(key_index, get_tangent_type(out_type), anim_change)
+        if in_type == 'fixed':
+            picker_undo.count_commands()
+            anim_curve.setAngle(key_index, OpenMaya.MAngle(float(in_angle), OpenMaya.MAngle.kDegrees), True,
+                                anim_change)
+        if out_type == 'fixed':
+            picker_undo.count_commands()
+            anim_curve.setAngle(key_index, OpenMaya.MAngle(float(out_angle), OpenMaya.MAngle.kDegrees), False,
+                                anim_change)
+
+
+class CurveMirrorEngine(MirrorEngine):
+    """
+    Flip or mirror whole anim curves over a frame range. The keys of every source curve are read in bulk,
+    transformed together and written back in a single undoable curve change
+    """
+    def __init__(self, start_frame, end_frame, time_offset=0.0, mirror_axis='x', side_sign_rules=None,
+                 side_offset_rules=None):
+        """
+        :param start_frame: float
+        :param end_frame: float
+        :param time_offset: float, shift of the written keys, wrapped inside the frame range
+        :param mirror_axis: str, 'x', 'y' or 'z'
+        :param side_sign_rules: dict, {attribute name: sign} applied when copying between opposite controls
+        :param side_offset_rules: dict, {attribute name: offset} added when copying between opposite controls
+        """
+        super(CurveMirrorEngine, self).__init__(mirror_axis, side_sign_rules)
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.time_offset = time_offset
+        self.side_offset_rules = side_offset_rules or dict()
+        self.offsets = list()
+
+    def add_copy(self, mirror_table, source, target, sign_rules, transform_only=False):
+        copy_index = len(self.target_plugs)
+        super(CurveMirrorEngine, self).add_copy(mirror_table, source, target, sign_rules, transform_only)
+        offset_rules = self.side_offset_rules if source != target else dict()
+        self.offsets.extend(offset_rules.get(x, 0.0) for x in self.attributes[copy_index:])
+
+    def apply(self, node_list, flip=True):
+        """
+        Flip or mirror the animation of the nodes given, it must run inside the undo chunk of the caller
+        :param node_list: list
+        :param flip: bool
+        :return: EditReport, the count is the number of keys written
+        """
+        start_time = time.time()
+        self.gather(node_list, flip)
+
+        # Read every source curve before writing, the flipped pairs are the sources of each other
+        curve_keys_list = list()
+        copies = list()
+        for source_plug, target_plug, sign, offset in zip(self.source_plugs, self.target_plugs, self.signs,
+                                                          self.offsets):
+            curve_keys = read_curve_keys(source_plug.name(), self.start_frame, self.end_frame)
+            if curve_keys is None or (target_plug.isDestination and
+                                      not OpenMayaAnim.MAnimUtil.isAnimated(target_plug)):
+                self.skipped_count += 1
+                continue
+            curve_keys_list.append(curve_keys)
+            copies.append((target_plug, sign, offset))
+
+        curve_keys_list = transform_curve_keys(curve_keys_list, [x[1] for x in copies], [x[2] for x in copies],
+                                               self.time_offset, self.start_frame, self.end_frame)
+
+        key_count = 0
+        if copies:
+            unkeyed_plugs = [x[0].name() for x in copies if not OpenMayaAnim.MAnimUtil.isAnimated(x[0])]
+            if unkeyed_plugs:
+                picker_undo.count_commands()
+                cmds.setKeyframe(unkeyed_plugs, time=self.start_frame)
+
+            anim_change = OpenMayaAnim.MAnimCurveChange()
+            for (target_plug, sign, offset), curve_keys in zip(copies, curve_keys_list):
+                write_curve_keys(target_plug, curve_keys, self.start_frame, self.end_frame, anim_change)
+                key_count += len(curve_keys)
+            picker_undo.commit(anim_change, applied=True)
+
+        return picker_pose.EditReport('Flip animation' if flip else 'Mirror animation', key_count,
+                                      self.skipped_count, time.time() - start_time)
+
+
+def flip_animation(node_list, start_frame, end_frame, time_offset=0.0, mirror_axis='x', side_sign_rules=None,
+                   side_offset_rules=None):
+    """
+    Swap the animation of the opposite controls and flip the animation of the center controls over a frame range
+    :param node_list: list
+    :param start_frame: float
+    :param end_frame: float
+    :param time_offset: float, e.g. half a cycle
+    :param mirror_axis: str, 'x', 'y' or 'z'
+    :param side_sign_rules: dict, {attribute name: sign}
+    :param side_offset_rules: dict, {attribute name: offset}
+    :return: EditReport
+    """
+    return CurveMirrorEngine(start_frame, end_frame, time_offset, mirror_axis, side_sign_rules,
+                             side_offset_rules).apply(node_list, flip=True)
+
+
+def mirror_animation(node_list, start_frame, end_frame, time_offset=0.0, mirror_axis='x', side_sign_rules=None,
+                     side_offset_rules=None):
+    """
+    Copy the animation of the controls given to their opposite controls over a frame range
+    :param node_list: list
+    :param start_frame: float
+    :param end_frame: float
+    :param time_offset: float, e.g. half a cycle
+    :param mirror_axis: str, 'x', 'y' or 'z'
+    :param side_sign_rules: dict, {attribute name: sign}
+    :param side_offset_rules: dict, {attribute name: offset}
+    :return: EditReport
+    """
+    return CurveMirrorEngine(start_frame, end_frame, time_offset, mirror_axis, side_sign_rules,
+                             side_offset_rules).apply(node_list, flip=False)
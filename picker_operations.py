@@ -0,0 +1,171 @@
+"""
+Picker operations without UI, used by the picker window and callable from mayapy.
+The group operations take a namespace or a list of namespaces, the rigs given are edited in a single batch
+"""
+import itertools
+from maya import cmds
+from maya.api import OpenMaya
+
+import picker_guard
+import picker_handles
+import picker_key
+import picker_manifest
+import picker_pose
+import picker_registry
+import picker_undo
+
+
+vis_attributes = {'controls': 'visControls', 'geometries': 'visGeometries'}
+
+
+def get_selection_namespace():
+    """
+    Get the namespace of the first node selected
+    :return: str
+    """
+    picker_undo.count_commands()
+    selection = cmds.ls(selection=True)
+    if selection:
+        return picker_registry.get_node_namespace(selection[0])
+    return ''
+
+
+def get_rig_namespaces():
+    """
+    Get the namespaces of the rigs in the scene
+    :return: list
+    """
+    modules_grp = picker_registry.group_names['all']
+    picker_undo.count_commands()
+    rig_groups = cmds.ls(modules_grp, '*:{}'.format(modules_grp), recursive=True) or list()
+    return sorted(set(picker_registry.get_node_namespace(x) for x in rig_groups))
+
+
+def as_namespaces(namespaces):
+    """
+    :param namespaces: str or list
+    :return: list
+    """
+    return [namespaces] if isinstance(namespaces, str) else list(namespaces)
+
+
+def get_controls(namespace, group='all'):
+    """
+    Get the controls of a group from the rig manifest, from the control registry if the rig has none
+    :param namespace: str
+    :param group: str, 'all', 'body' or 'face'
+    :return: list, shared with the manifest or the registry so it must not be modified
+    """
+    manifest = picker_manifest.get_manifest(namespace)
+    if manifest is not None:
+        return manifest.get_group(group)
+    return picker_registry.get_registry().get_controls(namespace, group)
+
+
+def get_rig_controls(namespaces, group='all'):
+    """
+    :param namespaces: str or list
+    :param group: str, 'all', 'body' or 'face'
+    :return: list, [(namespace, control list), ...]
+    """
+    return [(x, get_controls(x, group)) for x in as_namespaces(namespaces)]
+
+
+def join_rig_controls(rig_controls):
+    """
+    :param rig_controls: list, [(namespace, control list), ...]
+    :return: list, the controls of every rig, the shared list itself if there is a single rig
+    """
+    if len(rig_controls) == 1:
+        return rig_controls[0][1]
+    return [ctr for namespace, control_list in rig_controls for ctr in control_list]
+
+
+def split_rig_controls(control_list):
+    """
+    Group consecutive controls by namespace, e.g. a chunk of the joined controls of several rigs
+    :param control_list: list
+    :return: list, [(namespace, control list), ...]
+    """
+    return [(namespace, list(controls))
+            for namespace, controls in itertools.groupby(control_list, picker_registry.get_node_namespace)]
+
+
+def bind_pose(namespaces, snapshot=False):
+    """
+    Set the rigs to the bind/skin pose in a single modifier
+    :param namespaces: str or list
+    :param snapshot: bool, store the pose as the smart key snapshot
+    :return: EditReport
+    """
+    rig_controls = get_rig_controls(namespaces, 'all')
+    with picker_guard.EditGuard('bind_pose'):
+        report = picker_pose.bind_pose(join_rig_controls(rig_controls))
+    if snapshot:
+        for namespace, control_list in rig_controls:
+            picker_key.take_snapshot(namespace, control_list)
+    return report
+
+
+def select_controls(namespace, control_names, modifier=None):
+    """
+    Select controls by their names without namespace, the nodes are taken from the handle table of the namespace
+    :param namespace: str
+    :param control_names: str or list
+    :param modifier: str, 'shift' adds to the selection, 'control' removes from it
+    """
+    if isinstance(control_names, str):
+        control_names = [control_names]
+    picker_handles.select_controls(namespace, control_names, modifier)
+
+
+def key_controls(namespace, control_list, smart=False):
+    """
+    Key the controls given
+    :param namespace: str
+    :param control_list: list
+    :param smart: bool, only key the channels changed since the last key or bind pose
+    :return: EditReport or None if not smart
+    """
+    return key_rigs([(namespace, control_list)], smart)
+
+
+def key_rigs(rig_controls, smart=False, key_edit=None):
+    """
+    Key the controls of several rigs in a single setKeyframe call
+    :param rig_controls: list, [(namespace, control list), ...]
+    :param smart: bool, only key the channels changed since the last key or bind pose
+    :param key_edit: picker_key.KeyEdit, the keys are set in the record instead of with setKeyframe if given
+    :return: EditReport or None if not smart
+    """
+    if smart:
+        return picker_key.smart_key_rigs(rig_controls, key_edit)
+    if key_edit is None:
+        picker_undo.count_commands()
+        cmds.setKeyframe(join_rig_controls(rig_controls))
+    else:
+        for namespace, control_list in rig_controls:
+            key_table = picker_key.get_key_table(namespace)
+            key_edit.add_keys([x[1] for ctr in control_list for x in key_table.get_channels(ctr)])
+    return None
+
+
+def set_visibility(namespaces, vis_type='controls', value=None):
+    """
+    Set the controls or geometries visibility of the rigs in a single modifier
+    :param namespaces: str or list
+    :param vis_type: str, 'controls' or 'geometries'
+    :param value: int, switch the value of the first rig if None
+    :return: int, value set
+    """
+    selection = OpenMaya.MSelectionList()
+    for namespace in as_namespaces(namespaces):
+        selection.add('{}general_c_ctr.{}'.format(namespace, vis_attributes[vis_type]))
+    vis_plugs = [selection.getPlug(i) for i in range(selection.length())]
+    if not vis_plugs:
+        return value
+
+    if value is None:
+        value = 0 if vis_plugs[0].asInt() else 1
+    picker_undo.commit(picker_pose.PlugValueEdit(vis_plugs, ['int'] * len(vis_plugs), [value] * len(vis_plugs)))
+    return value
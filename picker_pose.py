@@ -0,0 +1,350 @@
+import time
+import array
+from maya import cmds
+from maya.api import OpenMaya
+
+import picker_manifest
+import picker_undo
+
+
+skin_pose_attr = 'skinPoseData'
+transform_attrs = ['{}{}'.format(attr, axis) for attr in 'trs' for axis in 'xyz']
+shear_attrs = ['shearXY', 'shearXZ', 'shearYZ']
+joint_orient_attrs = ['jointOrientX', 'jointOrientY', 'jointOrientZ']
+# Value kinds of the plugs packed in a PlugValueEdit
+value_kinds = ('bool', 'int', 'double')
+
+
+class EditReport(object):
+    def __init__(self, name, set_count=0, skipped_count=0, elapsed=0.0):
+        """
+        :param name: str, name of the edit, e.g. 'Bind pose'
+        :param set_count: int, number of plugs set
+        :param skipped_count: int, number of plugs skipped because they are locked or connected
+        :param elapsed: float, seconds
+        """
+        self.name = name
+        self.set_count = set_count
+        self.skipped_count = skipped_count
+        self.elapsed = elapsed
+
+    def __str__(self):
+        return '{}: {} plugs set, {} skipped in {:.3f}s'.format(self.name, self.set_count, self.skipped_count,
+                                                               self.elapsed)
+
+
+def parse_skin_pose_data(skin_pose_data):
+    """
+    Get the matrix stored in the skinPoseData string
+    :param skin_pose_data: str
+    :return: list
+    """
+    skin_pose_data = skin_pose_data.split('[')[-1].split(']')[0].split(',')
+    return [float(x) for x in skin_pose_data]
+
+
+def get_attribute_default(attr_obj):
+    """
+    Get the default value of a numeric, enum or unit attribute
+    :param attr_obj: MObject
+    :return: tuple, (value kind, value) or None if the attribute has not a single default value
+    """
+    if attr_obj.hasFn(OpenMaya.MFn.kNumericAttribute):
+        numeric_attr = OpenMaya.MFnNumericAttribute(attr_obj)
+        numeric_type = numeric_attr.numericType()
+        if numeric_type == OpenMaya.MFnNumericData.kBoolean:
+            return 'bool', numeric_attr.default
+        if numeric_type in (OpenMaya.MFnNumericData.kByte, OpenMaya.MFnNumericData.kChar,
+                            OpenMaya.MFnNumericData.kShort, OpenMaya.MFnNumericData.kInt,
+                            OpenMaya.MFnNumericData.kInt64):
+            return 'int', numeric_attr.default
+        if numeric_type in (OpenMaya.MFnNumericData.kFloat, OpenMaya.MFnNumericData.kDouble):
+            return 'double', numeric_attr.default
+    elif attr_obj.hasFn(OpenMaya.MFn.kEnumAttribute):
+        return 'int', OpenMaya.MFnEnumAttribute(attr_obj).default
+    elif attr_obj.hasFn(OpenMaya.MFn.kUnitAttribute):
+        unit_attr = OpenMaya.MFnUnitAttribute(attr_obj)
+        # The unit defaults are MAngle, MDistance or MTime, their values are in internal units
+        return 'double', unit_attr.default.value
+    return None
+
+
+def get_user_channels(fn_node, ctr):
+    """
+    Get the numeric user attributes of a control, from the rig manifest if the control is in it
+    :param fn_node: MFnDependencyNode
+    :param ctr: str
+    :return: list, [(attribute MObject, value kind, default value), ...]
+    """
+    entry = picker_manifest.get_entry(ctr)
+    if entry is None:
+        return query_user_channels(fn_node, ctr)
+    return get_entry_user_channels(fn_node, entry)
+
+
+def get_entry_user_channels(fn_node, entry):
+    """
+    :param fn_node: MFnDependencyNode
+    :param entry: dict, manifest entry of the control
+    :return: list, [(attribute MObject, value kind, default value), ...]
+    """
+    user_channels = list()
+    for user_attr, kind, default in entry['user']:
+        attr_obj = fn_node.attribute(user_attr)
+        if not attr_obj.isNull():
+            user_channels.append((attr_obj, kind, default))
+    return user_channels
+
+
+def query_user_channels(fn_node, ctr):
+    """
+    Query the numeric user attributes of a control
+    :param fn_node: MFnDependencyNode
+    :param ctr: str
+    :return: list, [(attribute MObject, value kind, default value), ...]
+    """
+    user_channels = list()
+    picker_undo.count_commands()
+    for user_attr in cmds.listAttr(ctr, userDefined=True) or list():
+        if user_attr == skin_pose_attr:
+            continue
+        attr_obj = fn_node.attribute(user_attr)
+        if attr_obj.isNull():
+            continue
+        default = get_attribute_default(attr_obj)
+        if default is not None:
+            user_channels.append((attr_obj,) + default)
+    return user_channels
+
+
+def get_bind_data(node, fn_node, ctr):
+    """
+    Get the static bind facts of a control, from the rig manifest if the control is in it
+    :param node: MObject
+    :param fn_node: MFnDependencyNode
+    :param ctr: str
+    :return: tuple, (user channels, skin pose matrix or None, is joint)
+    """
+    entry = picker_manifest.get_entry(ctr)
+    if entry is not None:
+        return get_entry_user_channels(fn_node, entry), entry['bind'], entry['joint']
+
+    skin_pose_data = None
+    if fn_node.hasAttribute(skin_pose_attr):
+        skin_pose_data = parse_skin_pose_data(fn_node.findPlug(skin_pose_attr, False).asString())
+    return query_user_channels(fn_node, ctr), skin_pose_data, node.hasFn(OpenMaya.MFn.kJoint)
+
+
+def get_transform_targets(fn_node, skin_pose_data=None):
+    """
+    Get the bind values of the transform channels of a control
+    :param fn_node: MFnDependencyNode
+    :param skin_pose_data: list, local matrix stored in the skinPoseData attribute
+    :return: list, [(attribute name, value), ...]
+    """
+    if skin_pose_data is None:
+        return [(attr, 1.0 if attr.startswith('s') else 0.0) for attr in transform_attrs]
+
+    rotate_order = fn_node.findPlug('rotateOrder', False).asInt()
+    transformation_matrix = OpenMaya.MTransformationMatrix(OpenMaya.MMatrix(skin_pose_data))
+    # MTransformationMatrix rotation orders are the rotateOrder attribute values plus one
+    transformation_matrix.reorderRotation(rotate_order + 1)
+
+    translation = transformation_matrix.translation(OpenMaya.MSpace.kTransform)
+    rotation = transformation_matrix.rotation()
+    scale = transformation_matrix.scale(OpenMaya.MSpace.kTransform)
+    shear = transformation_matrix.shear(OpenMaya.MSpace.kTransform)
+
+    values = [translation.x, translation.y, translation.z, rotation.x, rotation.y, rotation.z] + list(scale)
+    return list(zip(transform_attrs, values)) + list(zip(shear_attrs, shear))
+
+
+def get_joint_transform_targets(fn_node, skin_pose_data):
+    """
+    Get the bind values of the transform channels of a joint, the joint orient is removed from the rotation of the
+    skin pose matrix so the values are set with the other plugs instead of xform
+    :param fn_node: MFnDependencyNode
+    :param skin_pose_data: list, local matrix stored in the skinPoseData attribute
+    :return: list, [(attribute name, value), ...]
+    """
+    targets = get_transform_targets(fn_node, skin_pose_data)
+    rotation = OpenMaya.MTransformationMatrix(OpenMaya.MMatrix(skin_pose_data)).rotation(asQuaternion=True)
+    rotation = remove_joint_orient(fn_node, rotation)
+    targets[3:6] = zip(transform_attrs[3:6], (rotation.x, rotation.y, rotation.z))
+    return targets
+
+
+def remove_joint_orient(fn_node, rotation):
+    """
+    Get the rotate channel values of a joint from the rotation of its local matrix, that includes the joint orient
+    :param fn_node: MFnDependencyNode, joint
+    :param rotation: MQuaternion
+    :return: MEulerRotation in the rotate order of the joint
+    """
+    joint_orient = OpenMaya.MEulerRotation(*[fn_node.findPlug(x, False).asDouble() for x in joint_orient_attrs])
+    rotation = (rotation * joint_orient.asQuaternion().inverse()).asEulerRotation()
+    # The rotateOrder attribute values are the MEulerRotation orders
+    rotation.reorderIt(fn_node.findPlug('rotateOrder', False).asInt())
+    return rotation
+
+
+def get_bind_transform_targets(fn_node, skin_pose_data, is_joint):
+    """
+    :param fn_node: MFnDependencyNode
+    :param skin_pose_data: list or None
+    :param is_joint: bool
+    :return: list, [(attribute name, value), ...]
+    """
+    if skin_pose_data and is_joint:
+        # Joint orient is part of the joint matrix
+        return get_joint_transform_targets(fn_node, skin_pose_data)
+    return get_transform_targets(fn_node, skin_pose_data)
+
+
+def build_modifier(plugs, kinds, values):
+    """
+    Create a modifier that sets the values given
+    :param plugs: list, [MPlug, ...]
+    :param kinds: list, 'bool', 'int' or 'double' for every plug
+    :param values: list
+    :return: MDGModifier
+    """
+    modifier = OpenMaya.MDGModifier()
+    for plug, kind, value in zip(plugs, kinds, values):
+        if kind == 'bool':
+            modifier.newPlugValueBool(plug, bool(value))
+        elif kind == 'int':
+            modifier.newPlugValueInt(plug, int(round(value)))
+        else:
+            modifier.newPlugValueDouble(plug, float(value))
+    return modifier
+
+
+class PlugValueEdit(object):
+    """
+    Compact undo record of a bulk plug edit, the values before and after the edit are packed in arrays of doubles
+    and undo or redo writes all of them in one modifier that is not kept
+    """
+    def __init__(self, plugs, kinds, values):
+        """
+        :param plugs: list, [MPlug, ...]
+        :param kinds: list, 'bool', 'int' or 'double' for every plug
+        :param values: list, values after the edit
+        """
+        self.plugs = list(plugs)
+        self.kinds = array.array('B', (value_kinds.index(x) for x in kinds))
+        self.after = array.array('d', values)
+        self.before = None
+
+    def write(self, values):
+        """
+        :param values: array, a value per plug
+        """
+        picker_undo.count_commands()
+        build_modifier(self.plugs, [value_kinds[x] for x in self.kinds], values).doIt()
+
+    def doIt(self):
+        if self.before is None:
+            self.before = array.array('d', (x.asDouble() for x in self.plugs))
+        self.write(self.after)
+
+    def undoIt(self):
+        self.write(self.before)
+
+    def get_memory_size(self):
+        """
+        Get the size of the packed value buffers of the record, the plugs it keeps to write them are not counted
+        :return: int, bytes
+        """
+        return sum(len(x) * x.itemsize for x in (self.kinds, self.after, self.before) if x is not None)
+
+
+class BindPoseEngine(object):
+    """
+    Gather the bind values of all the controls in one pass and apply them in a single undoable modifier
+    """
+    def __init__(self, control_list):
+        self.control_list = control_list
+        self.plugs = list()
+        self.kinds = list()
+        self.values = list()
+        self.skipped_count = 0
+
+    def add_target(self, plug, kind, value):
+        """
+        Store the value to set in the plug if it is free to change
+        :param plug: MPlug
+        :param kind: str, 'bool', 'int' or 'double'
+        :param value: bool, int or float
+        """
+        if plug.isFreeToChange() != OpenMaya.MPlug.kFreeToChange:
+            self.skipped_count += 1
+            return
+        self.plugs.append(plug)
+        self.kinds.append(kind)
+        self.values.append(value)
+
+    def gather(self, control_list=None):
+        """
+        Collect the plugs and the values of the bind pose
+        :param control_list: list, part of the controls of the engine, all of them if None
+        """
+        control_list = self.control_list if control_list is None else control_list
+        selection = OpenMaya.MSelectionList()
+        for ctr in control_list:
+            selection.add(ctr)
+
+        for i, ctr in enumerate(control_list):
+            node = selection.getDependNode(i)
+            fn_node = OpenMaya.MFnDependencyNode(node)
+
+            user_channels, skin_pose_data, is_joint = get_bind_data(node, fn_node, ctr)
+            for attr_obj, kind, default in user_channels:
+                self.add_target(fn_node.findPlug(attr_obj, False), kind, default)
+            self.add_transform_targets(fn_node, get_bind_transform_targets(fn_node, skin_pose_data, is_joint))
+
+    def add_transform_targets(self, fn_node, targets):
+        """
+        :param fn_node: MFnDependencyNode
+        :param targets: list, [(attribute name, value), ...]
+        """
+        for attr, value in targets:
+            self.add_target(fn_node.findPlug(attr, False), 'double', value)
+
+    def build_edit(self):
+        """
+        Create the undo record with all the plug values
+        :return: PlugValueEdit
+        """
+        return PlugValueEdit(self.plugs, self.kinds, self.values)
+
+    def apply(self):
+        """
+        Set the bind pose, it must run inside the undo chunk of the caller
+        :return: EditReport
+        """
+        start_time = time.time()
+        self.gather()
+        report = self.commit()
+        report.elapsed = time.time() - start_time
+        return report
+
+    def commit(self):
+        """
+        Set the values gathered, it must run inside the undo chunk of the caller
+        :return: EditReport
+        """
+        start_time = time.time()
+        if self.plugs:
+            picker_undo.commit(self.build_edit())
+
+        return EditReport('Bind pose', len(self.plugs), self.skipped_count, time.time() - start_time)
+
+
+def bind_pose(control_list):
+    """
+    Set the controls given to the bind/skin pose
+    :param control_list: list
+    :return: EditReport
+    """
+    return BindPoseEngine(control_list).apply()
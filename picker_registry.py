@@ -0,0 +1,154 @@
+from maya import cmds
+from maya.api import OpenMaya
+
+import picker_key
+import picker_undo
+
+
+group_names = {'all': 'modules_c_grp',
+               'body': 'bodyModules_c_grp',
+               'face': 'faceModules_c_grp'}
+
+
+def get_node_namespace(node_name):
+    """
+    Get the namespace of a node name with the same format as the picker namespace
+    :param node_name: str
+    :return: str
+    """
+    node_name = node_name.split('|')[-1]
+    if ':' in node_name:
+        return '{}:'.format(':'.join(node_name.split(':')[:-1]))
+    return ''
+
+
+class ControlRegistry(object):
+    """
+    Cache the control lists of every namespace, invalidated by scene callbacks
+    """
+    def __init__(self):
+        self.cache = dict()
+        # Incremented at every invalidation, the caches built from the scene rigs are kept while it is the same
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.callback_ids = list()
+
+    def get_controls(self, namespace, group='all'):
+        """
+        Get the controls of a group, the list returned is shared so it must not be modified
+        :param namespace: str
+        :param group: str, 'all', 'body' or 'face'
+        :return: list
+        """
+        namespace_controls = self.cache.setdefault(namespace, dict())
+        control_list = namespace_controls.get(group)
+        if control_list is None:
+            self.misses += 1
+            control_list = self.build(namespace, group)
+            namespace_controls[group] = control_list
+        else:
+            self.hits += 1
+        return control_list
+
+    @staticmethod
+    def build(namespace, group):
+        """
+        Collect the controls of a group of the namespace
+        :param namespace: str
+        :param group: str
+        :return: list
+        """
+        modules_grp = '{}{}'.format(namespace, group_names[group])
+        picker_undo.count_commands()
+        return [x for x in cmds.listRelatives(modules_grp, allDescendents=True) or list() if x.endswith('_ctr')]
+
+    def invalidate(self, namespace=None):
+        """
+        Remove a namespace from the cache, or the whole cache if None
+        :param namespace: str
+        """
+        self.generation += 1
+        if namespace is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(namespace, None)
+
+    def get_stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'namespaces': len(self.cache)}
+
+    # CALLBACKS
+    def install_callbacks(self):
+        """
+        Register the scene callbacks that invalidate the cache
+        """
+        if self.callback_ids:
+            return
+
+        self.callback_ids.append(OpenMaya.MDagMessage.addParentAddedCallback(self.parent_changed))
+        self.callback_ids.append(OpenMaya.MDagMessage.addParentRemovedCallback(self.parent_changed))
+        self.callback_ids.append(OpenMaya.MDGMessage.addNodeRemovedCallback(self.node_removed, 'transform'))
+        self.callback_ids.append(OpenMaya.MNodeMessage.addNameChangedCallback(OpenMaya.MObject.kNullObj,
+                                                                              self.name_changed))
+        self.callback_ids.append(OpenMaya.MNamespaceMessage.addNamespaceRenamedCallback(self.scene_changed))
+        for message in (OpenMaya.MSceneMessage.kAfterNew, OpenMaya.MSceneMessage.kAfterOpen):
+            self.callback_ids.append(OpenMaya.MSceneMessage.addCallback(message, self.scene_loaded))
+        for message in (OpenMaya.MSceneMessage.kAfterImport, OpenMaya.MSceneMessage.kAfterUnloadReference,
+                        OpenMaya.MSceneMessage.kAfterRemoveReference):
+            self.callback_ids.append(OpenMaya.MSceneMessage.addCallback(message, self.scene_changed))
+        for message in (OpenMaya.MSceneMessage.kAfterLoadReference, OpenMaya.MSceneMessage.kAfterCreateReference):
+            self.callback_ids.append(OpenMaya.MSceneMessage.addReferenceCallback(message, self.reference_loaded))
+
+    def remove_callbacks(self):
+        if self.callback_ids:
+            OpenMaya.MMessage.removeCallbacks(self.callback_ids)
+        self.callback_ids = list()
+
+    def parent_changed(self, child_path, parent_path, *args):
+        if self.cache and group_names['all'] in parent_path.fullPathName():
+            self.invalidate(get_node_namespace(child_path.partialPathName()))
+
+    def node_removed(self, node, *args):
+        if self.cache:
+            node_name = OpenMaya.MFnDependencyNode(node).name()
+            if node_name.endswith('_ctr'):
+                self.invalidate(get_node_namespace(node_name))
+
+    def name_changed(self, node, previous_name, *args):
+        if self.cache and node.hasFn(OpenMaya.MFn.kTransform):
+            node_name = OpenMaya.MFnDependencyNode(node).name()
+            if node_name.endswith('_ctr') or previous_name.endswith('_ctr'):
+                self.invalidate(get_node_namespace(node_name))
+                self.invalidate(get_node_namespace(previous_name))
+
+    def scene_changed(self, *args):
+        self.invalidate()
+
+    def scene_loaded(self, *args):
+        """
+        The rigs of a new scene start from their bind pose as smart key snapshot
+        """
+        self.invalidate()
+        picker_key.reset_snapshot()
+
+    def reference_loaded(self, reference_file, *args):
+        """
+        The rig of a reference loaded starts from its bind pose as smart key snapshot
+        :param reference_file: MFileObject
+        """
+        self.invalidate()
+        picker_undo.count_commands()
+        for node_name in cmds.referenceQuery(reference_file.resolvedFullName(), nodes=True)[:1]:
+            picker_key.reset_snapshot(get_node_namespace(node_name))
+
+
+registry = ControlRegistry()
+
+
+def get_registry():
+    """
+    Get the control registry with its callbacks registered
+    :return: ControlRegistry
+    """
+    registry.install_callbacks()
+    return registry
@@ -10,4 +10,4 @@ import picker
 importlib.reload(picker)
 
 
-picker_controller.openWindow(scale_factor=1)
+picker.openWindow(scale_factor=1)
@@ -0,0 +1,91 @@
+"""
+Rigs of the scene driven by a single picker. The rig namespaces are found in one scene query and every rig keeps a
+small state, so switching the active rig only changes the namespace of the picker
+"""
+from maya.api import OpenMaya
+from PySide2 import QtCore
+
+import picker_operations
+
+
+class RigState(object):
+    def __init__(self, namespace):
+        """
+        :param namespace: str
+        """
+        self.namespace = namespace
+        # The group actions run on the targeted rigs, or on the active rig if none is targeted
+        self.targeted = False
+        self.tab_index = 0
+
+
+class RigSession(QtCore.QObject):
+    """
+    Rig namespaces of the scene and their states
+    """
+    rigs_changed = QtCore.Signal(list)
+
+    def __init__(self, parent=None):
+        super(RigSession, self).__init__(parent)
+        self.namespaces = list()
+        self.states = dict()
+        self.callback_ids = list()
+
+    def get_namespaces(self):
+        return list(self.namespaces)
+
+    def get_state(self, namespace):
+        """
+        :param namespace: str
+        :return: RigState, also created for a namespace typed in the picker that is not a rig of the scene
+        """
+        state = self.states.get(namespace)
+        if state is None:
+            state = RigState(namespace)
+            self.states[namespace] = state
+        return state
+
+    def refresh(self):
+        """
+        Find the rigs of the scene, the states of the rigs still in the scene are kept
+        :return: list, namespaces
+        """
+        namespaces = picker_operations.get_rig_namespaces()
+        if namespaces != self.namespaces:
+            self.namespaces = namespaces
+            self.states = dict((x, y) for x, y in self.states.items() if x in namespaces)
+            self.rigs_changed.emit(list(namespaces))
+        return namespaces
+
+    def set_targeted(self, namespace, targeted):
+        self.get_state(namespace).targeted = targeted
+
+    def get_targets(self, active_namespace):
+        """
+        Get the namespaces the group actions run on
+        :param active_namespace: str
+        :return: list, the targeted rigs in scene order, or the active rig if none is targeted
+        """
+        targets = [x for x in self.namespaces if self.get_state(x).targeted]
+        return targets or [active_namespace]
+
+    # CALLBACKS
+    def install_callbacks(self):
+        """
+        Find the rigs again when references or scenes are loaded
+        """
+        if self.callback_ids:
+            return
+        for message in (OpenMaya.MSceneMessage.kAfterNew, OpenMaya.MSceneMessage.kAfterOpen,
+                        OpenMaya.MSceneMessage.kAfterImport, OpenMaya.MSceneMessage.kAfterLoadReference,
+                        OpenMaya.MSceneMessage.kAfterUnloadReference, OpenMaya.MSceneMessage.kAfterCreateReference,
+                        OpenMaya.MSceneMessage.kAfterRemoveReference):
+            self.callback_ids.append(OpenMaya.MSceneMessage.addCallback(message, self.scene_changed))
+
+    def remove_callbacks(self):
+        if self.callback_ids:
+            OpenMaya.MMessage.removeCallbacks(self.callback_ids)
+        self.callback_ids = list()
+
+    def scene_changed(self, *args):
+        self.refresh()
@@ -0,0 +1,263 @@
+"""
+FK/IK snap of the current frame and bake of the snap over a frame range
+"""
+import time
+from maya import cmds
+from maya.api import OpenMaya, OpenMayaAnim
+
+import picker_mirror
+import picker_pose
+import picker_undo
+
+
+snap_channels = ['translateX', 'translateY', 'translateZ', 'rotateX', 'rotateY', 'rotateZ']
+
+
+def get_snap_info(namespace, limb='arm', side='l'):
+    """
+    Get the controls and snap targets of a limb
+    :param namespace: str
+    :param limb: str, arm or leg
+    :param side: str, "l" or "r"
+    :return: tuple, (snap info dict, settings control)
+    """
+    end_name = 'hand' if limb == 'arm' else 'foot'
+
+    snap_info = {'start': {'fk_control': '{}up{}Fk_{}_ctr'.format(namespace, limb.capitalize(), side),
+                           'ik_control': None,
+                           'fk_snap': '{}up{}_{}_jnt'.format(namespace, limb.capitalize(), side),
+                           'ik_snap': None,
+                           'snap_xform': None
+                           },
+                 'mid': {'fk_control': '{}low{}Fk_{}_ctr'.format(namespace, limb.capitalize(), side),
+                         'ik_control': '{}{}PoleVector_{}_ctr'.format(namespace, limb, side),
+                         'fk_snap': '{}low{}_{}_jnt'.format(namespace, limb.capitalize(), side),
+                         'ik_snap': '{}{}PoleVector_{}_snap'.format(namespace, limb, side),
+                         'snap_xform': None
+                         },
+                 'end': {'fk_control': '{}{}{}Fk_{}_ctr'.format(namespace, end_name, limb.capitalize(), side),
+                         'ik_control': '{}{}{}Ik_{}_ctr'.format(namespace, end_name, limb.capitalize(), side),
+                         'fk_snap': '{}{}{}_{}_skn'.format(namespace, end_name, limb.capitalize(), side),
+                         'ik_snap': '{}{}{}_{}_skn'.format(namespace, end_name, limb.capitalize(), side),
+                         'snap_xform': None
+                         }
+                 }
+
+    settings_control = '{}{}Settings_{}_ctr'.format(namespace, limb, side)
+
+    return snap_info, settings_control
+
+
+def snap_fk_ik(namespace, limb='arm', side='l'):
+    """
+    Switch the limb between fk and ik matching the current frame pose
+    :param namespace: str
+    :param limb: str, arm or leg
+    :param side: str, "l" or "r"
+    """
+    snap_info, settings_control = get_snap_info(namespace, limb, side)
+
+    picker_undo.count_commands()
+    state = cmds.getAttr('{}.fkIk'.format(settings_control))  # 0 == Fk; 1 == Ik
+
+    snap_value = 'ik_snap' if state == 0 else 'fk_snap'
+    control_value = 'ik_control' if state == 0 else 'fk_control'
+
+    for key, values in snap_info.items():
+        if snap_info[key][control_value]:
+            picker_undo.count_commands()
+            snap_info[key]['snap_xform'] = cmds.xform(snap_info[key][snap_value],
+                                                      query=True, worldSpace=True, matrix=True)
+
+    new_state = 1 if state == 0 else 0
+    picker_undo.count_commands()
+    cmds.setAttr('{}.fkIk'.format(settings_control), new_state)
+
+    for key, values in snap_info.items():
+        if snap_info[key][control_value]:
+            picker_undo.count_commands()
+            cmds.xform(snap_info[key][control_value], worldSpace=True, matrix=snap_info[key]['snap_xform'])
+
+
+def get_node(node_name):
+    selection = OpenMaya.MSelectionList()
+    selection.add(node_name)
+    return selection.getDependNode(0)
+
+
+class SnapTarget(object):
+    """
+    Control matched to a snap node, the matrices of every frame are stored to be keyed in bulk.
+    The targets are sampled parent first, a target below another one is solved under the matrix its parent gets
+    """
+    def __init__(self, control, snap):
+        self.control = control
+        selection = OpenMaya.MSelectionList()
+        selection.add(control)
+        dag_path = selection.getDagPath(0)
+        self.path = dag_path.fullPathName()
+        self.parent_target = None
+        # World matrix of the control with the values sampled for the current frame
+        self.world_matrix = None
+
+        self.fn_control = OpenMaya.MFnDependencyNode(dag_path.node())
+        self.is_joint = dag_path.node().hasFn(OpenMaya.MFn.kJoint)
+        self.rotate_order = self.fn_control.findPlug('rotateOrder', False).asInt()
+        self.matrix_plug = self.fn_control.findPlug('matrix', False)
+        self.parent_matrix_plug = self.fn_control.findPlug('parentMatrix', False).elementByLogicalIndex(0)
+        self.world_plug = self.fn_control.findPlug('worldMatrix', False).elementByLogicalIndex(0)
+        self.snap_world_plug = OpenMaya.MFnDependencyNode(get_node(snap)).findPlug(
+            'worldMatrix', False).elementByLogicalIndex(0)
+        self.channel_plugs = [self.fn_control.findPlug(x, False) for x in snap_channels]
+        self.values = [list() for x in snap_channels]
+
+    def get_depth(self):
+        return self.path.count('|')
+
+    def set_parent_target(self, targets):
+        """
+        Find the closest target above this one
+        :param targets: list, [SnapTarget, ...]
+        """
+        target_paths = dict((x.path, x) for x in targets)
+        path = self.path
+        while '|' in path and self.parent_target is None:
+            path = path.rsplit('|', 1)[0]
+            self.parent_target = target_paths.get(path)
+
+    def sample(self):
+        """
+        Store the channel values that match the snap node in the current context
+        """
+        snap_world = OpenMaya.MFnMatrixData(self.snap_world_plug.asMObject()).matrix()
+        parent_matrix = OpenMaya.MFnMatrixData(self.parent_matrix_plug.asMObject()).matrix()
+        if self.parent_target is not None:
+            # The context still has the parent target before the bake, its evaluated matrix is replaced
+            parent_world = OpenMaya.MFnMatrixData(self.parent_target.world_plug.asMObject()).matrix()
+            parent_matrix = parent_matrix * parent_world.inverse() * self.parent_target.world_matrix
+
+        transformation_matrix = OpenMaya.MTransformationMatrix(snap_world * parent_matrix.inverse())
+        translation = transformation_matrix.translation(OpenMaya.MSpace.kTransform)
+        if self.is_joint:
+            rotation = picker_pose.remove_joint_orient(self.fn_control,
+                                                       transformation_matrix.rotation(asQuaternion=True))
+        else:
+            transformation_matrix.reorderRotation(self.rotate_order + 1)
+            rotation = transformation_matrix.rotation()
+
+        for values, value in zip(self.values, [translation.x, translation.y, translation.z,
+                                               rotation.x, rotation.y, rotation.z]):
+            values.append(value)
+
+        # The scale is not keyed, the control keeps its own
+        local_matrix = OpenMaya.MFnMatrixData(self.matrix_plug.asMObject()).matrix()
+        transformation_matrix.setScale(OpenMaya.MTransformationMatrix(local_matrix).scale(OpenMaya.MSpace.kTransform),
+                                       OpenMaya.MSpace.kTransform)
+        self.world_matrix = transformation_matrix.asMatrix() * parent_matrix
+
+
+def get_sample_frames(node_list, start_frame, end_frame, keys_only=False):
+    """
+    Get the frames to sample in the range
+    :param node_list: list, the key times of these nodes are used if keys_only
+    :param start_frame: float
+    :param end_frame: float
+    :param keys_only: bool
+    :return: list
+    """
+    if keys_only:
+        picker_undo.count_commands()
+        key_times = cmds.keyframe(node_list, query=True, time=(start_frame, end_frame), timeChange=True) or list()
+        frames = sorted(set(key_times) | {start_frame, end_frame})
+    else:
+        frames = [float(x) for x in range(int(start_frame), int(end_frame) + 1)]
+    return frames
+
+
+def bake_fk_ik(namespace, limb_list, start_frame, end_frame, keys_only=False):
+    """
+    Switch the limbs between fk and ik over a frame range, keying the controls to match the previous pose.
+    The frames are evaluated in context, so the current time does not change
+    :param namespace: str
+    :param limb_list: list, [(limb, side), ...]
+    :param start_frame: float
+    :param end_frame: float
+    :param keys_only: bool, sample only the frames with keys in the driving and baked controls
+    :return: EditReport
+    """
+    start_time = time.time()
+
+    targets = list()
+    settings_controls = list()
+    driving_controls = list()
+    for limb, side in limb_list:
+        snap_info, settings_control = get_snap_info(namespace, limb, side)
+        picker_undo.count_commands()
+        state = cmds.getAttr('{}.fkIk'.format(settings_control), time=start_frame)
+        snap_value = 'ik_snap' if state == 0 else 'fk_snap'
+        control_value = 'ik_control' if state == 0 else 'fk_control'
+        current_value = 'fk_control' if state == 0 else 'ik_control'
+
+        settings_controls.append((settings_control, 1 if state == 0 else 0))
+        for key, values in snap_info.items():
+            if values[current_value]:
+                driving_controls.append(values[current_value])
+            if values[control_value]:
+                targets.append(SnapTarget(values[control_value], values[snap_value]))
+
+    for target in targets:
+        target.set_parent_target(targets)
+    targets.sort(key=SnapTarget.get_depth)
+
+    # The keys of the baked controls are sampled too, so every key of the range is solved again
+    frames = get_sample_frames(driving_controls + [x.control for x in targets] + [x[0] for x in settings_controls],
+                               start_frame, end_frame, keys_only)
+
+    # Read every snap node of every limb in a single pass over time
+    time_unit = OpenMaya.MTime.uiUnit()
+    for frame in frames:
+        context = OpenMaya.MDGContext(OpenMaya.MTime(frame, time_unit))
+        previous_context = context.makeCurrent()
+        try:
+            for target in targets:
+                target.sample()
+        finally:
+            previous_context.makeCurrent()
+
+    # Create the missing curves in one call, then write all the keys of each curve at once
+    plugs = list()
+    values = list()
+    skipped_count = 0
+    for target in targets:
+        for plug, channel_values in zip(target.channel_plugs, target.values):
+            if plug.isLocked or (plug.isDestination and not OpenMayaAnim.MAnimUtil.isAnimated(plug)):
+                skipped_count += 1
+                continue
+            plugs.append(plug)
+            values.append(channel_values)
+
+    unkeyed_plugs = [plug.name() for plug in plugs if not OpenMayaAnim.MAnimUtil.isAnimated(plug)]
+    if unkeyed_plugs:
+        picker_undo.count_commands()
+        cmds.setKeyframe(unkeyed_plugs, time=frames[0])
+
+    anim_change = OpenMayaAnim.MAnimCurveChange()
+    times = OpenMaya.MTimeArray([OpenMaya.MTime(x, time_unit) for x in frames])
+    for plug, channel_values in zip(plugs, values):
+        anim_curve = OpenMayaAnim.MFnAnimCurve(plug)
+        # Only the keys of the range are replaced, the keys around it are kept
+        picker_mirror.remove_range_keys(anim_curve, frames[0], frames[-1], anim_change)
+        picker_undo.count_commands()
+        anim_curve.addKeys(times, OpenMaya.MDoubleArray(channel_values),
+                           OpenMayaAnim.MFnAnimCurve.kTangentAuto, OpenMayaAnim.MFnAnimCurve.kTangentAuto,
+                           True, anim_change)
+    picker_undo.commit(anim_change, applied=True)
+
+    for settings_control, new_state in settings_controls:
+        for frame in (frames[0], frames[-1]):
+            picker_undo.count_commands()
+            cmds.setKeyframe(settings_control, attribute='fkIk', time=frame, value=new_state,
+                             outTangentType='step')
+
+    return picker_pose.EditReport('Bake FK/IK', len(plugs) * len(frames), skipped_count,
+                                  time.time() - start_time)
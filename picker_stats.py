@@ -0,0 +1,309 @@
+"""
+Opt-in latency instrumentation of the picker actions.
+Every action records its wall time, the number of scene commands and API edits the picker modules counted with
+picker_undo.count_commands, the number of controls it touched and the size of the values packed in the undo records
+it committed in a rolling window per action and namespace, which can be dumped to JSON or CSV or shown in the stats
+panel.
+An action that runs as a chunked job is recorded when the job finishes
+"""
+import csv
+import json
+import time
+import collections
+from functools import wraps, partial
+from PySide2 import QtCore, QtWidgets
+
+import picker_undo
+
+
+max_samples = 512
+# Upper bounds of the histogram buckets in milliseconds, the last bucket takes the rest
+histogram_bounds = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+csv_fields = ['action', 'namespace', 'time', 'elapsed_ms', 'commands', 'controls', 'undo_bytes']
+
+
+class ActionSample(object):
+    def __init__(self, action, namespace, elapsed, commands, controls, undo_bytes=0):
+        """
+        :param action: str
+        :param namespace: str
+        :param elapsed: float, seconds
+        :param commands: int, number of scene commands and API edits
+        :param controls: int, number of controls touched
+        :param undo_bytes: int, size of the values packed in the picker undo records committed
+        """
+        self.action = action
+        self.namespace = namespace
+        self.time = time.time()
+        self.elapsed = elapsed
+        self.commands = commands
+        self.controls = controls
+        self.undo_bytes = undo_bytes
+
+    def to_dict(self):
+        return {'action': self.action, 'namespace': self.namespace, 'time': self.time,
+                'elapsed_ms': self.elapsed * 1000.0, 'commands': self.commands, 'controls': self.controls,
+                'undo_bytes': self.undo_bytes}
+
+
+def get_histogram(elapsed_list):
+    """
+    Count the times given in the histogram buckets
+    :param elapsed_list: list, seconds
+    :return: list, count per bucket
+    """
+    histogram = [0] * (len(histogram_bounds) + 1)
+    for elapsed in elapsed_list:
+        elapsed_ms = elapsed * 1000.0
+        bucket = len(histogram_bounds)
+        for i, bound in enumerate(histogram_bounds):
+            if elapsed_ms <= bound:
+                bucket = i
+                break
+        histogram[bucket] += 1
+    return histogram
+
+
+def get_percentile(sorted_list, percentile):
+    if not sorted_list:
+        return 0.0
+    return sorted_list[min(int(len(sorted_list) * percentile), len(sorted_list) - 1)]
+
+
+class ActionRecorder(object):
+    """
+    Wrap the picker actions and keep their last samples
+    """
+    def __init__(self, sample_count=max_samples):
+        self.sample_count = sample_count
+        self.samples = collections.OrderedDict()
+        self.enabled = False
+        self.depth = 0
+        self.control_count = 0
+        # Chunked job started by the action being recorded
+        self.job = None
+
+    def set_enabled(self, enabled):
+        """
+        Turn on/off the recording of the actions
+        :param enabled: bool
+        """
+        self.enabled = enabled
+
+    # RECORDING
+    def wrap(self, action, function, get_namespace=None):
+        """
+        Wrap an action so its calls are recorded when the recorder is enabled.
+        The actions called from another action are recorded as part of it
+        :param action: str, name of the action
+        :param function: callable
+        :param get_namespace: callable returning the namespace the action runs on
+        :return: callable
+        """
+        @wraps(function)
+        def recorded_action(*args, **kwargs):
+            if not self.enabled or self.depth:
+                return function(*args, **kwargs)
+
+            namespace = get_namespace() if get_namespace else ''
+            self.depth = 1
+            self.control_count = 0
+            self.job = None
+            counts = (time.time(), picker_undo.command_count, picker_undo.undo_memory_size)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.depth = 0
+                sample = ActionSample(action, namespace, 0.0, 0, self.control_count)
+                if self.job is None:
+                    self.finish_sample(sample, counts)
+                else:
+                    self.job.finished.connect(partial(self.finish_job_sample, sample, counts))
+                    self.job = None
+        return recorded_action
+
+    def finish_sample(self, sample, counts):
+        """
+        Add the sample with the time, commands and undo memory since the action started
+        :param sample: ActionSample
+        :param counts: tuple, (start time, command count, undo memory size) when the action started
+        """
+        start_time, command_count, undo_memory_size = counts
+        sample.elapsed = time.time() - start_time
+        sample.commands = picker_undo.command_count - command_count
+        sample.undo_bytes = picker_undo.undo_memory_size - undo_memory_size
+        self.add_sample(sample)
+
+    def finish_job_sample(self, sample, counts, completed):
+        """
+        Add the sample of an action that ran as a chunked job when the job completes, the cancelled jobs are not kept
+        :param sample: ActionSample
+        :param counts: tuple, see finish_sample
+        :param completed: bool
+        """
+        if completed:
+            self.finish_sample(sample, counts)
+
+    def add_job(self, job):
+        """
+        Record the action being recorded until the chunked job it started finishes
+        :param job: picker_jobs.ChunkedJob
+        """
+        if self.depth:
+            self.job = job
+
+    def add_controls(self, count):
+        """
+        Add controls to the ones touched by the action being recorded
+        :param count: int
+        """
+        if self.depth:
+            self.control_count += count
+
+    def add_sample(self, sample):
+        key = (sample.action, sample.namespace)
+        if key not in self.samples:
+            self.samples[key] = collections.deque(maxlen=self.sample_count)
+        self.samples[key].append(sample)
+
+    def clear(self):
+        self.samples.clear()
+
+    # RESULTS
+    def get_summary(self):
+        """
+        Get the stats of every action and namespace
+        :return: list, [dict, ...] sorted by the slowest average time
+        """
+        summary = list()
+        for (action, namespace), samples in self.samples.items():
+            elapsed_list = sorted(x.elapsed for x in samples)
+            count = len(samples)
+            summary.append({'action': action,
+                            'namespace': namespace,
+                            'count': count,
+                            'mean_ms': sum(elapsed_list) / count * 1000.0,
+                            'p50_ms': get_percentile(elapsed_list, 0.5) * 1000.0,
+                            'p95_ms': get_percentile(elapsed_list, 0.95) * 1000.0,
+                            'max_ms': elapsed_list[-1] * 1000.0,
+                            'commands': sum(x.commands for x in samples) / float(count),
+                            'controls': sum(x.controls for x in samples) / float(count),
+                            'undo_kb': sum(x.undo_bytes for x in samples) / float(count) / 1024.0,
+                            'histogram': get_histogram(elapsed_list)})
+        return sorted(summary, key=lambda x: x['mean_ms'], reverse=True)
+
+    def dump_json(self, file_path):
+        """
+        Write the summary, the histogram bounds and the samples
+        :param file_path: str
+        """
+        data = {'histogram_bounds_ms': histogram_bounds,
+                'summary': self.get_summary(),
+                'samples': [x.to_dict() for samples in self.samples.values() for x in samples]}
+        with open(file_path, 'w') as json_file:
+            json.dump(data, json_file, indent=2)
+
+    def dump_csv(self, file_path):
+        """
+        Write a row per sample
+        :param file_path: str
+        """
+        with open(file_path, 'w', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=csv_fields)
+            writer.writeheader()
+            for samples in self.samples.values():
+                for sample in samples:
+                    writer.writerow(sample.to_dict())
+
+
+recorder = ActionRecorder()
+
+
+def get_recorder():
+    return recorder
+
+
+class StatsPanel(QtWidgets.QDialog):
+    """
+    Table with the stats of the recorded actions, refreshed while it is visible
+    """
+    columns = [('Action', 'action'), ('Namespace', 'namespace'), ('Count', 'count'), ('Mean ms', 'mean_ms'),
+               ('P50 ms', 'p50_ms'), ('P95 ms', 'p95_ms'), ('Max ms', 'max_ms'), ('Commands', 'commands'),
+               ('Controls', 'controls'), ('Undo KB', 'undo_kb')]
+
+    def __init__(self, action_recorder, parent=None):
+        super(StatsPanel, self).__init__(parent)
+        self.setWindowTitle('Picker action stats')
+        self.recorder = action_recorder
+
+        self.record_cb = QtWidgets.QCheckBox('Record')
+        self.record_cb.setChecked(self.recorder.enabled)
+        self.record_cb.toggled.connect(self.recorder.set_enabled)
+
+        self.table = QtWidgets.QTableWidget(0, len(self.columns))
+        self.table.setHorizontalHeaderLabels([x[0] for x in self.columns])
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().hide()
+
+        clear_pb = QtWidgets.QPushButton('Clear')
+        clear_pb.clicked.connect(self.clear)
+        json_pb = QtWidgets.QPushButton('Export JSON')
+        json_pb.clicked.connect(get_export_slot(self, 'JSON (*.json)', self.recorder.dump_json))
+        csv_pb = QtWidgets.QPushButton('Export CSV')
+        csv_pb.clicked.connect(get_export_slot(self, 'CSV (*.csv)', self.recorder.dump_csv))
+
+        buttons_layout = QtWidgets.QHBoxLayout()
+        buttons_layout.addWidget(self.record_cb)
+        buttons_layout.addStretch()
+        for button in (clear_pb, json_pb, csv_pb):
+            buttons_layout.addWidget(button)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons_layout)
+        self.resize(720, 320)
+
+        self.refresh_timer = QtCore.QTimer(self)
+        self.refresh_timer.setInterval(500)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def refresh(self):
+        summary = self.recorder.get_summary()
+        self.table.setRowCount(len(summary))
+        for row, action_stats in enumerate(summary):
+            for column, (label, key) in enumerate(self.columns):
+                value = action_stats[key]
+                text = '{:.2f}'.format(value) if isinstance(value, float) else str(value)
+                item = QtWidgets.QTableWidgetItem(text)
+                if key == 'mean_ms':
+                    item.setToolTip('Histogram (ms <= {}): {}'.format(histogram_bounds, action_stats['histogram']))
+                self.table.setItem(row, column, item)
+
+    def clear(self):
+        self.recorder.clear()
+        self.refresh()
+
+    def showEvent(self, event):
+        self.record_cb.setChecked(self.recorder.enabled)
+        self.refresh()
+        self.refresh_timer.start()
+        super(StatsPanel, self).showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super(StatsPanel, self).hideEvent(event)
+
+
+def get_export_slot(parent, file_filter, dump):
+    """
+    Get a slot that asks for a file path and dumps the stats to it
+    :param parent: QWidget
+    :param file_filter: str
+    :param dump: callable taking the file path
+    :return: callable
+    """
+    def export(*args):
+        file_path = QtWidgets.QFileDialog.getSaveFileName(parent, 'Export action stats', '', file_filter)[0]
+        if file_path:
+            dump(file_path)
+    return export
@@ -0,0 +1,104 @@
+"""
+Maya plugin with the command that registers the picker bulk edits as a single undo step.
+The edit is any object with doIt or redoIt and undoIt methods, e.g. a picker_pose.PlugValueEdit
+or an OpenMayaAnim.MAnimCurveChange. The edits that report their memory size are added to undo_memory_size.
+The picker modules count the scene commands and API edits they issue with count_commands
+"""
+import os
+import sys
+import types
+from maya import cmds
+from maya.api import OpenMaya
+
+
+command_name = 'pickerUndo'
+plugin_name = os.path.splitext(os.path.basename(__file__))[0]
+
+# Maya loads the plugin as a different module than the one imported by the picker,
+# so the pending edits are stored in a module shared by both
+shared = sys.modules.get('picker_undo_shared')
+if shared is None:
+    shared = types.ModuleType('picker_undo_shared')
+    shared.pending = list()
+    sys.modules['picker_undo_shared'] = shared
+
+# Bytes of the values packed in the undo records committed in this session, read by the action recorder
+undo_memory_size = 0
+# Scene commands and API edits issued by the picker modules in this session, read by the action recorder
+command_count = 0
+
+
+def maya_useNewAPI():
+    pass
+
+
+class PickerUndoCommand(OpenMaya.MPxCommand):
+    def __init__(self):
+        super(PickerUndoCommand, self).__init__()
+        self.edit = None
+
+    @staticmethod
+    def creator():
+        return PickerUndoCommand()
+
+    def doIt(self, args):
+        self.edit, applied = shared.pending.pop()
+        if not applied:
+            self.redoIt()
+
+    def redoIt(self):
+        redo = getattr(self.edit, 'redoIt', None) or self.edit.doIt
+        redo()
+
+    def undoIt(self):
+        self.edit.undoIt()
+
+    def isUndoable(self):
+        return True
+
+
+def initializePlugin(plugin):
+    OpenMaya.MFnPlugin(plugin, 'picker', '1.0').registerCommand(command_name, PickerUndoCommand.creator)
+
+
+def uninitializePlugin(plugin):
+    OpenMaya.MFnPlugin(plugin).deregisterCommand(command_name)
+
+
+def load_plugin():
+    """
+    Load this file as plugin if it is not loaded yet
+    """
+    if not cmds.pluginInfo(plugin_name, query=True, loaded=True):
+        cmds.loadPlugin(os.path.splitext(__file__)[0] + '.py', quiet=True)
+
+
+def count_commands(count=1):
+    """
+    Count the scene commands or API edits issued, the queries of values read from plugs are not counted
+    :param count: int
+    """
+    global command_count
+    command_count += count
+
+
+def commit(edit, applied=False):
+    """
+    Apply the edit given as a single undoable command
+    :param edit: object with doIt or redoIt and undoIt methods
+    :param applied: bool, the edit is already done and only has to be registered for undo
+    """
+    global undo_memory_size
+    load_plugin()
+    pending_edit = (edit, applied)
+    shared.pending.append(pending_edit)
+    count_commands()
+    try:
+        getattr(cmds, command_name)()
+    finally:
+        if pending_edit in shared.pending:
+            shared.pending.remove(pending_edit)
+
+    get_memory_size = getattr(edit, 'get_memory_size', None)
+    if get_memory_size is not None:
+        undo_memory_size += get_memory_size()
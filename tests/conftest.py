@@ -0,0 +1,28 @@
+"""
+The picker modules are imported against the simulated Maya of picker_fake_maya
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import picker_fake_maya  # noqa: E402
+
+picker_fake_maya.install()
+
+
+@pytest.fixture
+def scene():
+    """
+    Empty simulated scene, restored to the first frame
+    """
+    fake_scene = picker_fake_maya.scene
+    fake_scene.clear()
+    fake_scene.current_time = 1.0
+    fake_scene.context_time = None
+    fake_scene.refresh_suspended = False
+    fake_scene.evaluation_mode = 'parallel'
+    fake_scene.reset_calls()
+    return fake_scene
@@ -0,0 +1,36 @@
+import pytest
+
+import picker_fake_maya
+import picker_guard
+
+
+def test_guard_restores_the_scene_state(scene):
+    with picker_guard.EditGuard('bind_pose', evaluation_mode='off'):
+        assert scene.refresh_suspended
+        assert scene.evaluation_mode == 'off'
+        with picker_guard.EditGuard('flip_pose'):
+            assert picker_guard.EditGuard.depth == 2
+    assert picker_guard.EditGuard.depth == 0
+    assert not scene.refresh_suspended
+    assert scene.evaluation_mode == 'parallel'
+
+
+def test_failing_setup_does_not_keep_the_depth(scene, monkeypatch):
+    evaluation_manager = picker_fake_maya.cmds.evaluationManager
+
+    def failing_evaluation_manager(query=False, mode=None, **kwargs):
+        if not query:
+            raise RuntimeError('evaluation manager failed')
+        return evaluation_manager(query=query, mode=mode, **kwargs)
+    monkeypatch.setattr(picker_fake_maya.cmds, 'evaluationManager', failing_evaluation_manager)
+
+    with pytest.raises(RuntimeError):
+        with picker_guard.EditGuard('bind_pose', evaluation_mode='off'):
+            pass
+    assert picker_guard.EditGuard.depth == 0
+    assert not scene.refresh_suspended
+
+    # The next guard is not taken as nested
+    with picker_guard.EditGuard('flip_pose'):
+        assert scene.refresh_suspended
+    assert not scene.refresh_suspended
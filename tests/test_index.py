@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('PySide2')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide2 import QtCore, QtWidgets  # noqa: E402
+
+import picker_index  # noqa: E402
+
+
+@pytest.fixture
+def tabs():
+    """
+    Root widget with a body and a face tab holding a few controls
+    """
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    root_widget = QtWidgets.QWidget()
+    root_widget.resize(400, 200)
+    controls = dict()
+    for tab_name, tab_x in (('body_tab', 0), ('face_tab', 200)):
+        tab = QtWidgets.QWidget(root_widget)
+        tab.setObjectName(tab_name)
+        tab.setGeometry(tab_x, 0, 200, 200)
+        for name, rect in (('a', (10, 10, 20, 20)), ('b', (60, 10, 20, 20)), ('c', (10, 100, 90, 20))):
+            control = QtWidgets.QPushButton(tab)
+            control.setObjectName('{}_{}'.format(tab_name, name))
+            control.setGeometry(*rect)
+            controls[control.objectName()] = control
+    yield root_widget, controls
+    root_widget.deleteLater()
+    app.processEvents()
+
+
+def get_names(widgets):
+    return set(x.objectName() for x in widgets)
+
+
+@pytest.mark.parametrize('cell_size', [8, 32, 256])
+def test_control_index_hits(tabs, cell_size):
+    root_widget, controls = tabs
+    control_index = picker_index.ControlIndex()
+    control_index.build(root_widget, list(controls.values()), cell_size=cell_size)
+
+    # The rects are in root widget coordinates, the face tab is shifted by its position
+    assert control_index.control_rects[controls['face_tab_a']] == QtCore.QRect(210, 10, 20, 20)
+    assert get_names(control_index.query(QtCore.QRect(0, 0, 35, 35))) == {'body_tab_a'}
+    assert get_names(control_index.query(QtCore.QRect(25, 5, 40, 10))) == {'body_tab_a', 'body_tab_b'}
+    # A rect touching the last pixel of a control hits it, the next pixel does not
+    assert get_names(control_index.query(QtCore.QRect(99, 119, 5, 5))) == {'body_tab_c'}
+    assert not control_index.query(QtCore.QRect(100, 120, 5, 5))
+    # A rect over both tabs only returns the controls of the tab asked
+    rect = QtCore.QRect(0, 0, 400, 200)
+    assert len(control_index.query(rect)) == 6
+    assert get_names(control_index.query(rect, 'face_tab')) == {'face_tab_a', 'face_tab_b', 'face_tab_c'}
+    assert not control_index.query(QtCore.QRect())
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('PySide2')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide2 import QtWidgets  # noqa: E402
+from maya.api import OpenMaya  # noqa: E402
+
+import picker_jobs  # noqa: E402
+import picker_pose  # noqa: E402
+
+
+@pytest.fixture
+def start_job(scene):
+    QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    scene.build_rig(0)
+
+    def start(finish):
+        """
+        Start a job whose chunks set the userAttr0 of jaw_c_ctr to the last item of the chunk
+        :return: tuple, (ChunkedJob, list of the finished signal values)
+        """
+        selection = OpenMaya.MSelectionList()
+        selection.add('jaw_c_ctr.userAttr0')
+        plug = selection.getPlug(0)
+
+        def process_chunk(chunk):
+            edit = picker_pose.PlugValueEdit([plug], ['double'], [chunk[-1]])
+            edit.doIt()
+            return edit
+
+        job = picker_jobs.ChunkedJob('Test job', list(range(1, 101)), process_chunk, finish)
+        finished = list()
+        job.finished.connect(finished.append)
+        job.start()
+        return job, finished
+    return start
+
+
+def test_job_commits_its_edits_once(start_job, scene):
+    job, finished = start_job(lambda: None)
+    while job.running:
+        job.step()
+    assert finished == [True]
+    assert not job.failed
+    assert scene.get_attribute('jaw_c_ctr.userAttr0').value == 100
+    assert scene.calls['pickerUndo'] == 1
+    assert scene.calls['undo'] == 0
+
+
+def test_failing_finish_reverts_the_job_edits_only(start_job, scene):
+    def finish():
+        raise RuntimeError('finish failed')
+
+    job, finished = start_job(finish)
+    job.step()
+    # An edit of the user between two chunks is not part of the job
+    scene.get_attribute('jaw_c_ctr.userAttr1').value = 2
+    with pytest.raises(RuntimeError):
+        while job.running:
+            job.step()
+    assert finished == [False]
+    assert job.failed
+    assert not job.timer.isActive()
+    assert scene.get_attribute('jaw_c_ctr.userAttr0').value == 0
+    assert scene.get_attribute('jaw_c_ctr.userAttr1').value == 2
+    assert scene.calls['pickerUndo'] == 0
+    assert scene.calls['undo'] == 0
+
+
+def test_cancel_reverts_the_job_edits(start_job, scene):
+    job, finished = start_job(None)
+    job.step()
+    assert scene.get_attribute('jaw_c_ctr.userAttr0').value != 0
+    job.cancel()
+    assert finished == [False]
+    assert scene.get_attribute('jaw_c_ctr.userAttr0').value == 0
@@ -0,0 +1,74 @@
+import pytest
+from maya.api import OpenMaya
+
+import picker_key
+import picker_manifest
+import picker_pose
+import picker_registry
+
+
+@pytest.fixture
+def rig(scene):
+    """
+    Rig set to its bind pose
+    """
+    scene.build_rig(0)
+    picker_registry.get_registry().invalidate()
+    picker_manifest.manifests.clear()
+    picker_key.key_tables.clear()
+    picker_key.snapshots.clear()
+    control_list = picker_registry.get_registry().get_controls('', 'all')
+    picker_pose.bind_pose(control_list)
+    yield control_list
+    picker_key.snapshots.clear()
+
+
+def test_first_smart_key_keys_only_the_channels_away_from_the_bind_pose(rig, scene):
+    scene.get_attribute('general_c_ctr.translateY').value += 2.0
+
+    report = picker_key.smart_key('', rig)
+    assert report.set_count == 1
+    assert scene.get_node('general_c_ctr').keys['translateY']
+
+
+def test_reset_snapshot_starts_again_from_the_bind_pose(rig, scene):
+    scene.get_attribute('general_c_ctr.translateY').value += 2.0
+    picker_key.take_snapshot('', rig)
+    assert picker_key.smart_key('', rig).set_count == 0
+
+    picker_key.reset_snapshot('')
+    assert picker_key.smart_key('', rig).set_count == 1
+
+
+def test_key_edit_reverts_its_keys_only(rig, scene):
+    general_ctr = scene.get_node('general_c_ctr')
+    scene.get_attribute('general_c_ctr.translateX').curve = {0.0: 1.0, 10.0: 3.0}
+    general_ctr.keys['translateX'].update((0.0, 10.0))
+    scene.get_attribute('general_c_ctr.translateY').value += 2.0
+    scene.current_time = 10.0
+
+    key_edit = picker_key.KeyEdit()
+    report = picker_key.smart_key_rigs([('', rig)], key_edit)
+    assert report.set_count == key_edit.key_count == 2
+    assert general_ctr.keys['translateY'] == {10.0}
+    assert scene.calls['setKeyframe'] == 0
+
+    # The curve created is removed and the key set on the existing curve gets its value back
+    key_edit.undoIt()
+    assert not general_ctr.keys['translateY']
+    assert scene.get_attribute('general_c_ctr.translateY').curve is None
+    assert scene.get_attribute('general_c_ctr.translateX').curve == {0.0: 1.0, 10.0: 3.0}
+
+
+def test_rig_load_resets_the_smart_key_snapshot(rig, scene, tmp_path):
+    scene.build_rig(0, namespace='hulk:')
+    rig_path = str(tmp_path / 'hulk.ma')
+    scene.get_node('hulk:{}'.format(picker_registry.group_names['all'])).reference_file = rig_path
+    picker_key.snapshots[''] = {'general_c_ctr.translateY': 5.0}
+    picker_key.snapshots['hulk:'] = {'hulk:general_c_ctr.translateY': 5.0}
+
+    # Only the rig of the reference loaded starts from its bind pose
+    picker_registry.get_registry().reference_loaded(OpenMaya.MFileObject(rig_path))
+    assert set(picker_key.snapshots) == {''}
+    picker_registry.get_registry().scene_loaded()
+    assert not picker_key.snapshots
@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+pytest.importorskip('PySide2')
+
+import picker_fake_maya  # noqa: E402
+import picker_library  # noqa: E402
+
+
+def test_default_library_is_in_the_user_folder(monkeypatch):
+    monkeypatch.delenv('PICKER_POSE_LIBRARY', raising=False)
+    library_path = picker_library.get_library_path()
+    assert library_path.startswith(picker_fake_maya.cmds.internalVar(userAppDir=True))
+    assert os.path.dirname(os.path.abspath(picker_library.__file__)) != os.path.dirname(library_path)
+
+
+def test_library_path_override(monkeypatch, tmp_path):
+    library_path = str(tmp_path / 'poses.pklib')
+    monkeypatch.setenv('PICKER_POSE_LIBRARY', library_path)
+    assert picker_library.get_library_path() == library_path
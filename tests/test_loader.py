@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+pytest.importorskip('PySide2')
+
+import picker_cache  # noqa: E402
+import picker_loader  # noqa: E402
+
+
+ui_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'picker.ui')
+
+
+@pytest.fixture
+def cache_folder(tmp_path, monkeypatch):
+    folder = tmp_path / 'cache'
+    monkeypatch.setenv('PICKER_CACHE_DIR', str(folder))
+    monkeypatch.setattr(picker_loader, 'compiled_modules', dict())
+    return folder
+
+
+def test_cache_folder_is_private(cache_folder):
+    folder = picker_cache.get_cache_folder()
+    assert folder == str(cache_folder)
+    assert picker_cache.is_private_folder(folder)
+    if hasattr(os, 'getuid'):
+        os.chmod(folder, 0o777)
+        assert not picker_cache.is_private_folder(folder)
+        assert picker_loader.get_compiled_module(ui_path) is None
+
+
+def test_tampered_module_does_not_run(cache_folder, monkeypatch):
+    folder = picker_cache.get_cache_folder()
+    py_path = os.path.join(folder, 'picker_ui_{}.py'.format(picker_cache.get_file_hash(ui_path)))
+    code = 'raise RuntimeError("tampered")\n'
+    with open(py_path, 'w') as py_file:
+        py_file.write('# sha256: {}\n'.format(picker_loader.get_source_hash('class Ui_Form(object): pass\n')))
+        py_file.write(code)
+    assert picker_loader.read_compiled_module(py_path) is None
+
+    # The module is compiled again instead
+    monkeypatch.setattr(picker_loader, 'compile_ui', lambda ui_path, py_path: 'class Ui_Form(object): pass\n')
+    module = picker_loader.get_compiled_module(ui_path)
+    assert module.Ui_Form.__name__ == 'Ui_Form'
+
+
+def test_compiled_module_round_trip(cache_folder):
+    folder = picker_cache.get_cache_folder()
+    py_path = os.path.join(folder, 'picker_ui_test.py')
+    code = 'value = 1\n'
+    with open(py_path, 'w') as py_file:
+        py_file.write('# sha256: {}\n'.format(picker_loader.get_source_hash(code)))
+        py_file.write(code)
+    assert picker_loader.read_compiled_module(py_path) == code
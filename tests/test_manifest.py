@@ -0,0 +1,95 @@
+import pytest
+
+import picker_manifest
+import picker_operations
+import picker_registry
+
+
+@pytest.fixture
+def rig(scene):
+    scene.build_rig(0)
+    picker_registry.get_registry().invalidate()
+    picker_manifest.manifests.clear()
+    yield scene
+    picker_manifest.manifests.clear()
+
+
+def test_manifest_round_trip(rig, monkeypatch):
+    control_list = picker_registry.get_registry().get_controls('', 'all')
+    data = picker_manifest.build_manifest_data('', control_list)
+    assert picker_manifest.decode_manifest(picker_manifest.encode_manifest(data)) == data
+
+    picker_manifest.write_manifest('')
+    picker_manifest.manifests.clear()
+
+    # The manifest is read from the modules group, not built again
+    def build_manifest_data(namespace, control_list, rig_key=None):
+        raise AssertionError('The manifest was built again')
+    monkeypatch.setattr(picker_manifest, 'build_manifest_data', build_manifest_data)
+    manifest = picker_manifest.get_manifest('')
+    assert manifest.controls == data['controls']
+    assert manifest.get_group('all') == control_list
+    entry = manifest.get_entry('general_c_ctr')
+    assert 'visControls' in [x[0] for x in entry['user']]
+
+
+def test_manifest_with_changed_data_is_rebuilt(rig):
+    control_list = picker_registry.get_registry().get_controls('', 'all')
+    picker_manifest.write_manifest('')
+    modules_grp = picker_registry.group_names['all']
+    data = picker_manifest.decode_manifest(rig.get_attribute('{}.pickerManifest'.format(modules_grp)).value)
+    data['controls']['general_c_ctr']['keyable'] = list()
+    rig.get_attribute('{}.pickerManifest'.format(modules_grp)).value = picker_manifest.encode_manifest(data)
+    assert not picker_manifest.is_valid_manifest(data, '', control_list)
+
+    picker_manifest.manifests.clear()
+    manifest = picker_manifest.get_manifest('')
+    assert manifest.get_entry('general_c_ctr')['keyable']
+
+
+def test_referenced_rig_groups_are_read_from_the_manifest(rig, tmp_path, monkeypatch):
+    monkeypatch.setenv('PICKER_CACHE_DIR', str(tmp_path / 'cache'))
+    body_controls = list(picker_registry.get_registry().get_controls('', 'body'))
+    picker_manifest.write_manifest('')
+    rig_path = tmp_path / 'rig.ma'
+    rig_path.write_text('')
+    rig.get_node(picker_registry.group_names['all']).reference_file = str(rig_path)
+    picker_registry.get_registry().invalidate()
+    rig.reset_calls()
+
+    control_list = picker_operations.get_controls('', 'body')
+    assert control_list == body_controls
+    assert picker_operations.get_controls('', 'body') is control_list
+    assert rig.calls['listRelatives'] == 0
+
+    # The manifest is loaded again when the registry is invalidated
+    manifest = picker_manifest.get_manifest('')
+    picker_registry.get_registry().invalidate()
+    assert picker_manifest.get_manifest('') is not manifest
+
+
+def test_sidecar_of_another_rig_file_is_rebuilt(rig, tmp_path, monkeypatch):
+    monkeypatch.setenv('PICKER_CACHE_DIR', str(tmp_path / 'cache'))
+    rig_path = tmp_path / 'rig.ma'
+    rig_path.write_text('')
+    fn_node = picker_manifest.get_modules_node('')
+    rig.get_node(picker_registry.group_names['all']).reference_file = str(rig_path)
+    picker_manifest.get_manifest('')
+    rig_key = picker_manifest.get_rig_key(fn_node)
+    sidecar_path = picker_manifest.get_sidecar_path(rig_key)
+    assert picker_manifest.read_sidecar(sidecar_path)['rig'] == rig_key
+
+    # A sidecar with a valid hash built for an older rig file is not used
+    data = picker_manifest.build_manifest_data('', picker_registry.get_registry().get_controls('', 'all'),
+                                               'old|0.0')
+    data['controls']['general_c_ctr']['keyable'] = list()
+    data['hash'] = picker_manifest.get_data_hash(data)
+    picker_manifest.write_sidecar(sidecar_path, data)
+    picker_manifest.manifests.clear()
+    assert picker_manifest.get_manifest('').get_entry('general_c_ctr')['keyable']
+    assert picker_manifest.read_sidecar(sidecar_path)['rig'] == rig_key
+
+
+def test_write_manifest_without_modules_group(scene):
+    report = picker_manifest.write_manifest('missing:')
+    assert 'not written' in report
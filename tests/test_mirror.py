@@ -0,0 +1,71 @@
+import math
+
+import pytest
+
+import picker_manifest
+import picker_mirror
+import picker_registry
+
+
+transform_values = {'tx': 1.0, 'ty': 2.0, 'tz': 3.0, 'rx': 0.1, 'ry': 0.2, 'rz': 0.3}
+
+
+@pytest.fixture
+def rig(scene):
+    scene.build_rig(0)
+    picker_registry.get_registry().invalidate()
+    picker_manifest.manifests.clear()
+    picker_mirror.mirror_tables.clear()
+    yield scene
+    picker_mirror.mirror_tables.clear()
+
+
+def set_values(scene, ctr, values):
+    for attr, value in values.items():
+        scene.get_attribute('{}.{}'.format(ctr, attr)).value = value
+
+
+def get_values(scene, ctr, attrs):
+    return dict((x, scene.get_attribute('{}.{}'.format(ctr, x)).value) for x in attrs)
+
+
+@pytest.mark.parametrize('mirror_axis, negated_attrs', [('x', ('tx', 'ry', 'rz')),
+                                                        ('y', ('ty', 'rx', 'rz')),
+                                                        ('z', ('tz', 'rx', 'ry'))])
+def test_flip_negates_the_mirror_axis_channels_of_center_controls(rig, mirror_axis, negated_attrs):
+    set_values(rig, 'jaw_c_ctr', transform_values)
+    set_values(rig, 'jaw_c_ctr', {'userAttr0': 4.0})
+
+    picker_mirror.flip_pose(['jaw_c_ctr'], mirror_axis)
+    values = get_values(rig, 'jaw_c_ctr', transform_values)
+    for attr, value in transform_values.items():
+        assert math.isclose(values[attr], -value if attr in negated_attrs else value)
+    # The user attributes of the center controls are not flipped
+    assert rig.get_attribute('jaw_c_ctr.userAttr0').value == 4.0
+
+
+def test_flip_swaps_opposite_controls_with_the_side_sign_rules(rig):
+    set_values(rig, 'cheekUp01_l_ctr', {'tx': 1.0, 'rx': 0.5, 'userAttr0': 2.0})
+    set_values(rig, 'cheekUp01_r_ctr', {'tx': -2.0, 'rx': 0.0, 'userAttr0': 3.0})
+
+    report = picker_mirror.flip_pose(['cheekUp01_l_ctr', 'cheekUp01_r_ctr'], side_sign_rules={'tx': -1})
+    assert get_values(rig, 'cheekUp01_l_ctr', ('tx', 'rx', 'userAttr0')) == {'tx': 2.0, 'rx': 0.0, 'userAttr0': 3.0}
+    assert get_values(rig, 'cheekUp01_r_ctr', ('tx', 'rx', 'userAttr0')) == {'tx': -1.0, 'rx': 0.5, 'userAttr0': 2.0}
+    # The pair is flipped once and the locked scaleZ of both controls is skipped
+    assert report.skipped_count == 2
+
+
+def test_mirror_copies_the_selected_side_only(rig):
+    set_values(rig, 'cheekUp01_l_ctr', {'tx': 1.0, 'ry': 0.5})
+    set_values(rig, 'cheekUp01_r_ctr', {'tx': -2.0, 'ry': 0.25})
+
+    picker_mirror.mirror_pose(['cheekUp01_l_ctr'], side_sign_rules={'ry': -1})
+    assert get_values(rig, 'cheekUp01_l_ctr', ('tx', 'ry')) == {'tx': 1.0, 'ry': 0.5}
+    assert get_values(rig, 'cheekUp01_r_ctr', ('tx', 'ry')) == {'tx': 1.0, 'ry': -0.5}
+
+
+def test_mirror_table_reads_the_channels_of_a_control_at_once(rig):
+    set_values(rig, 'cheekUp01_l_ctr', {'tx': 1.0, 'rz': 0.5, 'sy': 2.0, 'userAttr1': 3.0})
+    mirror_table = picker_mirror.get_mirror_table('')
+    channels = mirror_table.get_channels('cheekUp01_l_ctr')
+    assert mirror_table.read_values('cheekUp01_l_ctr') == [x.asDouble() for x, kind in channels.values()]
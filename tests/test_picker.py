@@ -0,0 +1,107 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('PySide2')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide2 import QtWidgets  # noqa: E402
+import shiboken2  # noqa: E402
+
+import picker_fake_maya  # noqa: E402
+import picker_key  # noqa: E402
+
+
+@pytest.fixture
+def picker_window(scene):
+    """
+    Picker built on a rig with the picker controls only, small enough for the actions to run synchronously
+    """
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    main_window = QtWidgets.QWidget()
+    picker_fake_maya.MQtUtil.main_window_ptr = shiboken2.getCppPointer(main_window)[0]
+
+    import picker
+    import picker_manifest
+    import picker_mirror
+    import picker_registry
+    scene.build_rig(0)
+    picker_registry.get_registry().invalidate()
+    picker_mirror.mirror_tables.clear()
+    picker_manifest.manifests.clear()
+    picker_key.snapshots.clear()
+
+    picker_window = picker.openWindow(1.0, warm=False)
+    app.processEvents()
+    yield picker_window
+    picker.closeWindow()
+    app.processEvents()
+
+
+def test_buttons_run_recorded_actions(picker_window, monkeypatch):
+    # The exceptions of the Qt slots are only printed, they are collected instead
+    errors = list()
+    monkeypatch.setattr(sys, 'excepthook', lambda *args: errors.append(args[1]))
+    recorder = picker_window.action_recorder
+    recorder.clear()
+    recorder.set_enabled(True)
+    try:
+        for button_name in ('bindPose_pushButton', 'flipPose_pushButton', 'mirrorPose_pushButton',
+                            'selectAll_pushButton', 'keyAll_pushButton', 'armSnap_l_pushButton'):
+            picker_window.ui_widgets[button_name].click()
+        picker_window.control_widgets['general_c_ctr'].click()
+    finally:
+        recorder.set_enabled(False)
+
+    assert errors == list()
+    summary = dict((x['action'], x) for x in recorder.get_summary())
+    assert set(summary) == {'bind_pose', 'flip_pose', 'mirror_pose', 'select_all_controls', 'key_all_controls',
+                            'snap_fk_ik', 'select_control'}
+    assert summary['select_all_controls']['commands'] > 0
+    # The API edits are counted, the bind pose sets the plugs with a modifier committed as one undo step
+    assert summary['bind_pose']['commands'] >= 2
+
+
+def test_actions_return_and_show_their_reports(picker_window, scene, capsys):
+    report = picker_window.bind_pose()
+    assert report.set_count > 0
+    assert scene.messages[-1] == str(report)
+    assert capsys.readouterr().out == ''
+
+
+def test_picker_open_keeps_the_smart_key_snapshot(picker_window):
+    picker_key.snapshots[''] = {'general_c_ctr.translateY': 5.0}
+    # A picker opened again finds the rigs of the scene without a snapshot reset
+    picker_window.session.namespaces = list()
+    picker_window.session.refresh()
+    assert picker_key.snapshots[''] == {'general_c_ctr.translateY': 5.0}
+
+
+@pytest.mark.parametrize('smart', [False, True])
+def test_chunked_actions_commit_their_edits_once(picker_window, scene, monkeypatch, smart):
+    import picker_jobs
+    monkeypatch.setattr(picker_jobs, 'job_threshold', 1)
+    picker_window.smart_key_action.setChecked(smart)
+    scene.get_attribute('general_c_ctr.translateY').value += 2.0
+    control_count = len(picker_key.get_key_table('').control_list)
+
+    recorder = picker_window.action_recorder
+    recorder.clear()
+    recorder.set_enabled(True)
+    try:
+        for action in (picker_window.select_all_controls, picker_window.key_all_controls):
+            action()
+            # The action is recorded when its job finishes
+            assert not recorder.samples
+            job = picker_window.job_progress.job
+            while job.running:
+                job.step()
+            assert recorder.samples
+            recorder.clear()
+    finally:
+        recorder.set_enabled(False)
+    assert len(scene.selection) == control_count
+    assert scene.get_node('general_c_ctr').keys['translateY']
+    assert scene.calls['pickerUndo'] == 2
+    assert scene.calls['select'] == scene.calls['setKeyframe'] == 0
@@ -0,0 +1,70 @@
+import pytest
+from maya.api import OpenMaya
+
+import picker_manifest
+import picker_pose
+import picker_registry
+import picker_undo
+
+
+@pytest.fixture
+def rig(scene):
+    scene.build_rig(0)
+    picker_registry.get_registry().invalidate()
+    picker_manifest.manifests.clear()
+    yield scene
+    picker_manifest.manifests.clear()
+
+
+def test_bind_pose_engine_skips_the_locked_plugs(rig):
+    for attr, value in (('translateX', 5.0), ('translateY', 5.0), ('userAttr0', 5.0), ('userAttr2', 5.0)):
+        rig.get_attribute('jaw_c_ctr.{}'.format(attr)).value = value
+    # The locks are read from the plugs, not from the rig manifest
+    picker_manifest.write_manifest('')
+    for attr in ('translateY', 'userAttr0'):
+        rig.get_attribute('jaw_c_ctr.{}'.format(attr)).locked = True
+
+    engine = picker_pose.BindPoseEngine(['jaw_c_ctr'])
+    report = engine.apply()
+    assert report.skipped_count == 3
+    assert all(not x.isLocked for x in engine.plugs)
+    skin_pose_data = picker_pose.parse_skin_pose_data(rig.get_attribute('jaw_c_ctr.skinPoseData').value)
+    assert rig.get_attribute('jaw_c_ctr.translateX').value == skin_pose_data[12]
+    assert rig.get_attribute('jaw_c_ctr.userAttr2').value == 0.0
+    assert rig.get_attribute('jaw_c_ctr.translateY').value == 5.0
+    assert rig.get_attribute('jaw_c_ctr.userAttr0').value == 5.0
+
+
+def test_bind_pose_sets_the_channels_unlocked_after_the_manifest(rig):
+    rig.get_attribute('jaw_c_ctr.scaleZ').value = 2.0
+    picker_manifest.write_manifest('')
+    rig.get_attribute('jaw_c_ctr.scaleZ').locked = False
+
+    report = picker_pose.BindPoseEngine(['jaw_c_ctr']).apply()
+    assert report.skipped_count == 0
+    assert rig.get_attribute('jaw_c_ctr.scaleZ').value == 1.0
+
+
+def test_plug_value_edit_undo_and_redo(rig):
+    selection = OpenMaya.MSelectionList()
+    selection.add('jaw_c_ctr')
+    fn_node = OpenMaya.MFnDependencyNode(selection.getDependNode(0))
+    attrs = ('translateX', 'userAttr1', 'userAttr2')
+    plugs = [fn_node.findPlug(x, False) for x in attrs]
+    rig.get_attribute('jaw_c_ctr.translateX').value = 1.5
+
+    def get_values():
+        return [rig.get_attribute('jaw_c_ctr.{}'.format(x)).value for x in attrs]
+
+    edit = picker_pose.PlugValueEdit(plugs, ['double', 'int', 'bool'], [-2.5, 3, 1])
+    picker_undo.commit(edit)
+    assert get_values() == [-2.5, 3, True]
+    edit.undoIt()
+    assert get_values() == [1.5, 0, False]
+    # The values before the edit are packed once, redo after undo writes the edit again
+    edit.doIt()
+    assert get_values() == [-2.5, 3, True]
+    edit.undoIt()
+    assert get_values() == [1.5, 0, False]
+    # A kind byte and the values before and after the edit per plug
+    assert edit.get_memory_size() == len(attrs) * (1 + 8 + 8)
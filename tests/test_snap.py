@@ -0,0 +1,69 @@
+import math
+
+import pytest
+
+import picker_fake_maya
+import picker_snap
+
+
+def add_chain(scene, names, parent, node_type='joint'):
+    """
+    Add a chain of nodes, each one the child of the previous one
+    :return: list, [Node, ...]
+    """
+    nodes = list()
+    for name in names:
+        nodes.append(scene.add_node(name, node_type, parent))
+        parent = name
+    return nodes
+
+
+def set_values(node, **values):
+    for attr, value in values.items():
+        node.get_attribute(attr).value = value
+
+
+def assert_matrices_equal(a, b):
+    for x, y in zip(a.values, b.values):
+        assert math.isclose(x, y, abs_tol=1e-6)
+
+
+def set_keys(node, attr, curve):
+    node.get_attribute(attr).curve = dict(curve)
+    node.keys[attr].update(curve)
+
+
+@pytest.mark.parametrize('keys_only, frames', [(False, (1.0, 2.0, 3.0, 4.0, 5.0)), (True, (1.0, 3.0, 5.0))])
+def test_bake_fk_chain_matches_snap_world_matrices(scene, keys_only, frames):
+    offset = scene.add_node('armFk_l_grp')
+    set_values(offset, translateX=2.0, rotateY=0.3)
+    controls = add_chain(scene, ['upArmFk_l_ctr', 'lowArmFk_l_ctr', 'handArmFk_l_ctr'], 'armFk_l_grp')
+    for node, joint_orient in zip(controls, ((0.1, 0.2, 0.0), (0.0, -0.4, 0.3), (0.5, 0.0, 0.1))):
+        set_values(node, jointOrientX=joint_orient[0], jointOrientY=joint_orient[1], jointOrientZ=joint_orient[2])
+        set_values(node, translateX=3.0)
+
+    # The snap chain is animated with orients and offsets that differ from the FK chain
+    snaps = add_chain(scene, ['upArm_l_jnt', 'lowArm_l_jnt', 'handArm_l_skn'], None)
+    for i, node in enumerate(snaps):
+        set_values(node, translateX=2.5 + i, translateY=0.5 * i, jointOrientZ=0.2 * i)
+        node.get_attribute('rotateX').curve = {1.0: 0.1 * i, 5.0: 0.8 - 0.1 * i}
+        node.get_attribute('rotateZ').curve = {1.0: -0.3, 5.0: 0.4 + 0.2 * i}
+
+    for name in ('armPoleVector_l_ctr', 'handArmIk_l_ctr', 'armPoleVector_l_snap'):
+        scene.add_node(name)
+    settings = scene.add_node('armSettings_l_ctr')
+    settings.add_attribute(picker_fake_maya.Attribute('fkIk', 'enum', 1, user=True))
+
+    # Keys of the animator inside and outside the baked range
+    set_keys(controls[0], 'rotateY', {3.0: 0.2, 10.0: 0.7})
+
+    picker_snap.bake_fk_ik('', [('arm', 'l')], 1.0, 5.0, keys_only)
+
+    for frame in frames:
+        scene.current_time = frame
+        for control, snap in zip(controls, snaps):
+            assert_matrices_equal(control.get_world_matrix(), snap.get_world_matrix())
+    # The keys of the range are replaced by the sampled frames, the key after it is kept
+    curve = controls[0].get_attribute('rotateY').curve
+    assert sorted(curve) == list(frames) + [10.0]
+    assert curve[10.0] == 0.7